@@ -0,0 +1,393 @@
+"""Scale benchmarks for the user, vehicle, insurance and maintenance services.
+
+Usage:
+    python benchmark.py [--scales 1000 10000 100000 1000000]
+                        [--backends json journal sqlite] [--ops 100]
+                        [--output results.jsonl] [--memory] [--stress 1 2 4 8]
+
+Each run generates a deterministic fleet of the given size in a scratch
+directory, then times load, save, lookup, create, update, delete and
+cleanup through the service layer. With --memory it instead compares the
+heap used by plain dict records against the slotted models. With --stress
+it runs that many writer processes creating vehicles in the same files at
+once, reporting throughput and checking that no write was lost. Every
+measurement is printed as one JSON line so results can be diffed between
+commits.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import vehicles as vehicles_module
+from common_function import close_stores, commit_stores
+from credentials import CredentialVerifier
+from fleet_report import FleetReport
+from insurance import InsuranceService
+from maintainance import MaintenanceService, format_maintenance_id
+from models import InsurancePolicy, MaintenanceRecord, User, Vehicle
+from user_management import UserService
+from vehicles import VehicleService, format_vehicle_id
+
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+STATES = ["MH", "KA", "DL", "TN", "GJ", "RJ", "UP", "WB", "AP", "HR"]
+ANCHOR = date(2026, 1, 1)  # "today" for generated dates and cleanup
+# Storage is what is being measured, so password hashing is kept trivial
+FAST_KDF = ("pbkdf2_sha256", 1)
+
+
+# -----------------------------
+# Synthetic Fleet Generator
+# -----------------------------
+class FleetGenerator:
+    """Deterministic users, vehicles, insurance and maintenance records."""
+
+    def __init__(self, seed=42):
+        self.rng = random.Random(seed)
+        self.password = CredentialVerifier(FAST_KDF, workers=1).hash("Abcdef1!")
+
+    def letters(self, n):
+        return "".join(self.rng.choice(string.ascii_uppercase) for _ in range(n))
+
+    def mobile(self, i):
+        return str(6000000000 + i)
+
+    def vehicle_number(self, i):
+        # Unique per i: the running number and series encode i, the state is random
+        series, number = divmod(i, 10000)
+        series, pair = divmod(series, 676)
+        district = series % 100
+        return (f"{self.rng.choice(STATES)}{district:02d}"
+                f"{string.ascii_uppercase[pair // 26]}{string.ascii_uppercase[pair % 26]}{number:04d}")
+
+    def engine_number(self):
+        return f"{self.letters(1)}{self.rng.randint(0, 999):03d}{self.letters(4)}{self.rng.randint(0, 99999):05d}"
+
+    def chassis_number(self):
+        return "".join(self.rng.choice(VIN_CHARS) for _ in range(17))
+
+    def users(self, n):
+        users = {}
+        for i in range(n):
+            roll = self.rng.random()
+            position = "Manager" if roll < 0.05 else "Owner" if roll < 0.07 else "Driver" if roll < 0.77 else "Bluecollar"
+            age = self.rng.randint(20, 58)
+            users[f"user{i}"] = {
+                "name": f"User {self.letters(6).title()}",
+                "mobile": self.mobile(i),
+                "email": f"user{i}@fleet.example",
+                "gender": self.rng.choice(["Male", "Female", "Other"]),
+                "dob": f"{self.rng.randint(1, 28):02d}-{self.rng.randint(1, 12):02d}-{ANCHOR.year - age}",
+                "age": age,
+                "position": position,
+                "password": self.password,
+            }
+        return users
+
+    def vehicles(self, n, users):
+        managers = [(uid, u["name"]) for uid, u in users.items() if u["position"] == "Manager"]
+        drivers = [(uid, u["name"]) for uid, u in users.items() if u["position"] == "Driver"]
+        fleet = []
+        for i in range(n):
+            manager = self.rng.choice(managers) if managers else ("", "Not Assigned")
+            driver = self.rng.choice(drivers) if drivers and self.rng.random() < 0.9 else (None, "Not Assigned")
+            fleet.append({
+                "vehicle_id": format_vehicle_id(i + 1),
+                "vehicle_number": self.vehicle_number(i),
+                "engine_number": self.engine_number(),
+                "chassis_number": self.chassis_number(),
+                "manager_name": manager[1],
+                "manager_id": manager[0] or None,
+                "driver_assigned": driver[1],
+                "driver_id": driver[0],
+                "model": "TATA Prima E.28K",
+            })
+        return fleet
+
+    def insurance(self, fleet):
+        policies = []
+        for i, v in enumerate(fleet):
+            issue = ANCHOR - timedelta(days=self.rng.randint(0, 729))  # about half expired
+            policies.append({
+                "Insurance ID": str(10000000000 + i),
+                "Vehicle ID": v["vehicle_id"],
+                "Insurance Type": self.rng.choice(InsuranceService.TYPES),
+                "Issue Date": issue.isoformat(),
+                "Expiry Date": (issue + timedelta(days=365)).isoformat(),
+                "Status": "ACTIVE",
+            })
+        return policies
+
+    def maintenance(self, fleet):
+        records = []
+        for i, v in enumerate(fleet):
+            status = "not ok" if self.rng.random() < 0.1 else "ok"
+            records.append({
+                "maintenance_id": format_maintenance_id(i + 1),
+                "vehicle_id": v["vehicle_id"],
+                "maintenance_type": self.rng.choice(MaintenanceService.TYPES),
+                "last_date_of_maintenance": (ANCHOR - timedelta(days=self.rng.randint(0, 365))).isoformat(),
+                "maintenance_status": status,
+                "problem_description": "Brake wear" if status == "not ok" else "",
+            })
+        return records
+
+    def write_files(self, n):
+        users = self.users(n)
+        fleet = self.vehicles(n, users)
+        for path, data in [("users.json", users), ("vehicles.json", fleet),
+                           ("insurance.json", self.insurance(fleet)),
+                           ("maintenance_data.json", self.maintenance(fleet))]:
+            with open(path, "w") as f:
+                json.dump(data, f)
+        return users, fleet
+
+
+# -----------------------------
+# Timing
+# -----------------------------
+class Recorder:
+    def __init__(self, output=None, **meta):
+        self.meta = meta
+        self.output = output
+
+    def write(self, **fields):
+        result = dict(self.meta, **fields)
+        line = json.dumps(result)
+        print(line)
+        if self.output:
+            self.output.write(line + "\n")
+        return result
+
+    def emit(self, entity, op, count, elapsed):
+        return self.write(entity=entity, op=op, ops=count, total_s=round(elapsed, 6),
+                          per_op_us=round(elapsed / max(count, 1) * 1e6, 2))
+
+    def time(self, entity, op, func, items=(None,)):
+        items = list(items)
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        return self.emit(entity, op, len(items), time.perf_counter() - start)
+
+
+def fresh_services():
+    """Drop every cached store so the services load from disk again."""
+    close_stores()
+    vehicles_module.UserManagement._shared = None
+
+
+def run_scale(scale, backend, ops, output):
+    rec = Recorder(output, backend=backend, scale=scale)
+    rng = random.Random(7)
+    workdir = tempfile.mkdtemp(prefix="tipper-bench-")
+    cwd = os.getcwd()
+    os.environ["TIPPER_STORAGE"] = backend
+    try:
+        os.chdir(workdir)
+        gen = FleetGenerator()
+        users, fleet = gen.write_files(scale)
+        fresh_services()
+        # One-off import into SQLite and split into shards, timed on its own
+        rec.time("all", "migrate", lambda _: (UserService(credentials=CredentialVerifier(FAST_KDF, 1)),
+                                              VehicleService(), InsuranceService(), MaintenanceService()))
+        fresh_services()
+
+        verifier = CredentialVerifier(FAST_KDF, workers=1)
+        box = {}
+        rec.time("users", "load", lambda _: box.update(users=UserService(credentials=verifier)))
+        rec.time("vehicles", "load", lambda _: box.update(vehicles=VehicleService()))
+        rec.time("insurance", "load", lambda _: box.update(insurance=InsuranceService()))
+        rec.time("maintenance", "load", lambda _: box.update(maintenance=MaintenanceService()))
+        us, vs, ins, ms = box["users"], box["vehicles"], box["insurance"], box["maintenance"]
+        # Sharded collections read only their manifest on load; time reading every shard once
+        rec.time("insurance", "read_shards", lambda _: sum(1 for _ in ins.records.values()))
+        rec.time("maintenance", "read_shards", lambda _: sum(1 for _ in ms.data.values()))
+
+        n = min(ops, scale)
+        user_ids = rng.sample(list(users), n)
+        vehicle_ids = rng.sample([v["vehicle_id"] for v in fleet], n)
+        insurance_ids = rng.sample(list(ins.records), n)
+        maintenance_ids = rng.sample(list(ms.data), n)
+        manager_id = next(uid for uid, u in users.items() if u["position"] == "Manager")
+
+        # Lookups
+        rec.time("users", "lookup", us.get_user, user_ids)
+        rec.time("vehicles", "lookup", vs.get_vehicle, vehicle_ids)
+        rec.time("insurance", "lookup", ins.get_insurance, insurance_ids)
+        rec.time("insurance", "status", ins.get_status, vehicle_ids)
+        rec.time("maintenance", "lookup", ms.get_maintenance, maintenance_ids)
+
+        # Every page of a listing, 1000 records at a time; each page resumes from its cursor by bisect
+        def walk(page):
+            cursor = None
+            while True:
+                _, cursor = page(after=cursor, limit=1000)
+                if cursor is None:
+                    return
+        rec.time("vehicles", "page_walk", lambda _: walk(vs.page_vehicles))
+        rec.time("insurance", "page_walk", lambda _: walk(ins.page_insurance))
+
+        # Updates
+        rec.time("users", "update", lambda uid: us.update_user(uid, name="Renamed User"), user_ids)
+        rec.time("vehicles", "update", lambda vid: vs.update_vehicle(vid, manager_id=manager_id), vehicle_ids)
+        rec.time("insurance", "update", lambda iid: ins.update_issue_date(iid, ANCHOR.isoformat()), insurance_ids)
+        rec.time("maintenance", "update", lambda mid: ms.update_maintenance(mid, status="ok"), maintenance_ids)
+
+        # Creates
+        rec.time("users", "create", lambda i: us.create_user(
+            "Bench User", gen.mobile(scale + i), f"new{i}@fleet.example", "Male", "01-01-1990", "Driver", "Abcdef1!"),
+            range(n))
+        rec.time("vehicles", "create", lambda i: vs.create_vehicle(
+            gen.vehicle_number(scale + i), gen.engine_number(), gen.chassis_number(), manager_id), range(n))
+        rec.time("insurance", "create", lambda vid: ins.create_insurance(vid, "Comprehensive", ANCHOR.isoformat()),
+                 vehicle_ids)
+        rec.time("maintenance", "create", lambda vid: ms.create_maintenance(vid, "regular", ANCHOR.isoformat(), "ok"),
+                 vehicle_ids)
+
+        # Deletes
+        rec.time("users", "delete", us.delete_user, user_ids)
+        rec.time("vehicles", "delete", vs.delete_vehicle, vehicle_ids)
+        rec.time("maintenance", "delete", ms.delete_maintenance, maintenance_ids)
+
+        # Whatever the 11 change batches above left dirty, then the disk writes they cost
+        stores = [us.repo.store, vs.store, ins.store, ms.store]
+        rec.time("all", "commit", lambda _: commit_stores())
+        rec.write(entity="all", op="disk_writes", ops=11 * n, writes=sum(s.commits for s in stores))
+
+        # Full saves
+        for entity, store in [("users", us.repo.store), ("vehicles", vs.store),
+                              ("insurance", ins.store), ("maintenance", ms.store)]:
+            rec.time(entity, "save", lambda _: store.replace_all(store.records))
+
+        # Joined fleet status report
+        rec.time("fleet", "report", lambda _: sum(1 for _ in FleetReport().rows(ANCHOR)))
+
+        # Cleanup of expired policies
+        rec.time("insurance", "cleanup", lambda _: ins.delete_expired(ANCHOR))
+    finally:
+        fresh_services()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def heap_size(build):
+    """Bytes still allocated by whatever `build()` returns."""
+    tracemalloc.start()
+    try:
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def run_memory(scale, output):
+    """Heap cost of dict records versus slotted models, per entity."""
+    rec = Recorder(output, scale=scale)
+    gen = FleetGenerator()
+    users = gen.users(scale)
+    fleet = gen.vehicles(scale, users)
+    samples = [("users", User, list(users.values())), ("vehicles", Vehicle, fleet),
+               ("insurance", InsurancePolicy, gen.insurance(fleet)),
+               ("maintenance", MaintenanceRecord, gen.maintenance(fleet))]
+    for entity, model, rows in samples:
+        # Parse from JSON text, as the stores do, so neither side shares
+        # strings with `rows` and repeated keys are interned like json.load
+        text = json.dumps(rows)
+        as_dicts = heap_size(lambda: json.loads(text))
+        as_models = heap_size(lambda: [model.from_dict(r) for r in json.loads(text)])
+        rec.write(entity=entity, op="memory", dict_bytes=as_dicts, slots_bytes=as_models,
+                  dict_per_record=round(as_dicts / scale, 1), slots_per_record=round(as_models / scale, 1),
+                  saving=round(1 - as_models / as_dicts, 3))
+
+
+def stress_writer(workdir, backend, seed, ops, manager_id):
+    """One writer process: create `ops` vehicles, return (IDs, seconds, rebases)."""
+    os.chdir(workdir)
+    os.environ["TIPPER_STORAGE"] = backend
+    gen = FleetGenerator(seed)
+    service = VehicleService()
+    start = time.perf_counter()
+    ids = [service.create_vehicle(gen.vehicle_number(seed * ops + i), gen.engine_number(),
+                                  gen.chassis_number(), manager_id).vehicle_id
+           for i in range(ops)]
+    commit_stores()  # pool workers skip atexit, so commit before reporting
+    return ids, time.perf_counter() - start, getattr(service.store, "rebases", 0)
+
+
+def run_stress(scale, backend, writers, ops, output):
+    """`writers` processes creating vehicles concurrently against one fleet."""
+    rec = Recorder(output, backend=backend, scale=scale)
+    workdir = tempfile.mkdtemp(prefix="tipper-stress-")
+    cwd = os.getcwd()
+    os.environ["TIPPER_STORAGE"] = backend
+    try:
+        os.chdir(workdir)
+        users, fleet = FleetGenerator().write_files(scale)
+        manager_id = next(uid for uid, u in users.items() if u["position"] == "Manager")
+        # Spawned, not forked, so no writer inherits another's lock handles
+        with multiprocessing.get_context("spawn").Pool(writers) as pool:
+            VehicleService()  # import (sqlite) and any migration happen once, up front
+            fresh_services()
+            start = time.perf_counter()
+            # Seeds start past the generated fleet so vehicle numbers never clash
+            results = pool.starmap(stress_writer, [(workdir, backend, scale + w + 1, ops, manager_id)
+                                                   for w in range(writers)])
+            elapsed = time.perf_counter() - start
+
+        fresh_services()
+        stored = VehicleService().store.records
+        created = [vid for ids, _, _ in results for vid in ids]
+        rec.write(entity="vehicles", op="stress", writers=writers, ops=len(created),
+                  total_s=round(elapsed, 6), ops_per_sec=round(len(created) / elapsed, 1),
+                  rebases=sum(r for _, _, r in results),
+                  duplicate_ids=len(created) - len(set(created)),
+                  lost=sum(vid not in stored for vid in created),
+                  final_count=len(stored), expected_count=len(fleet) + len(created))
+    finally:
+        fresh_services()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backends", nargs="+", default=["json", "journal", "sqlite"])
+    parser.add_argument("--ops", type=int, default=100, help="operations timed per measurement")
+    parser.add_argument("--output", help="also append JSON lines to this file")
+    parser.add_argument("--memory", action="store_true", help="compare dict and slotted record memory")
+    parser.add_argument("--stress", type=int, nargs="+", metavar="WRITERS",
+                        help="concurrent writer counts to stress (each does --ops creates)")
+    args = parser.parse_args(argv)
+
+    output = open(args.output, "a") if args.output else None
+    try:
+        for scale in args.scales:
+            if args.memory:
+                run_memory(scale, output)
+                continue
+            for backend in args.backends:
+                print(f"# {backend} @ {scale}", file=sys.stderr)
+                if args.stress:
+                    for writers in args.stress:
+                        run_stress(scale, backend, writers, args.ops, output)
+                    continue
+                run_scale(scale, backend, args.ops, output)
+    finally:
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
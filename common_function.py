@@ -1 +1,1682 @@
+import atexit
+import csv
+import json
+import os
+import sched
+import sqlite3
+import threading
+import sys
+import time
+from bisect import bisect_right
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from itertools import count, islice
 
+try:
+    import fcntl
+except ImportError:  # no advisory locks on Windows; writes stay atomic
+    fcntl = None
+
+
+class ServiceError(Exception):
+    """Structured failure raised by the service layer.
+
+    `code` is one of "invalid", "duplicate", "not_found", "auth", "busy",
+    "conflict" or "corrupt"; `field` names the offending input when there
+    is one. Menus print the message,
+    scripted callers can use to_dict().
+    """
+
+    def __init__(self, code, message, field=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.field = field
+
+    def to_dict(self):
+        return {"code": self.code, "message": self.message, "field": self.field}
+
+
+def json_default(value):
+    # Slotted records serialize through to_dict(); anything else as text
+    return value.to_dict() if hasattr(value, "to_dict") else str(value)
+
+
+def file_signature(path):
+    """(inode, mtime, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+# -----------------------------
+# File Access
+# -----------------------------
+class FileLock:
+    """Exclusive advisory lock on `<path>.lock`, shared by all processes.
+
+    Writers hold it around every read-modify-write of a data file so they
+    queue up instead of overwriting each other. It is re-entrant within a
+    process (one instance per path, see for_path()), which lets a store
+    method that holds the lock call another one that takes it again.
+    """
+
+    _locks = {}
+
+    def __init__(self, path):
+        self.path = path + ".lock"
+        self.depth = 0
+        self._fd = None
+        self._thread_lock = threading.RLock()
+
+    @classmethod
+    def for_path(cls, path):
+        key = os.path.abspath(path)
+        lock = cls._locks.get(key)
+        if lock is None:
+            lock = cls._locks[key] = cls(key)
+        return lock
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self.depth == 0 and fcntl is not None:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def close(self):
+        if self._fd is not None and self.depth == 0:
+            os.close(self._fd)
+            self._fd = None
+
+
+def write_atomic(path, write):
+    """Write `path` through `write(f)` into a temp file renamed over it.
+
+    Readers see either the old or the new file, never a half-written one,
+    and a crash mid-write leaves the old file in place.
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_json(path, data, **options):
+    write_atomic(path, lambda f: json.dump(data, f, indent=4, **options))
+
+
+def read_json(path, default=None):
+    """Parsed contents of `path`, or `default` if it does not exist.
+
+    A file that exists but does not parse is an error rather than empty
+    data; treating it as empty would let the next save wipe it.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError as e:
+        raise ServiceError("corrupt", f"{path} is not valid JSON ({e}); restore it before continuing.")
+
+
+# -----------------------------
+# Record Stores
+# -----------------------------
+# Seconds a change may wait in memory before its group commit; 0 writes through
+COMMIT_SECONDS = 1.0
+
+
+class JsonStore:
+    """Keeps a JSON file in memory and rewrites the whole file on every change.
+
+    Records are held in `records`, a dict keyed by record ID. Files that hold
+    a JSON object (users.json) are used as-is; files that hold a JSON list
+    are keyed by `key_field` of each record. Given a `model` from models.py,
+    records are held as instances of it instead of plain dicts.
+
+    `refresh()` only re-reads the file when its signature changed, and
+    `version` is bumped on every change so callers can tell when derived
+    indexes need rebuilding.
+
+    Writes are optimistic: records are read and edited without a lock, and
+    only commits take the file lock. If the file's signature no longer
+    matches what this process last read or wrote, another process got there
+    first, so the file is reloaded and the change applied on top of it
+    (counted in `rebases`) before the new file is renamed into place.
+    Changes made through update() carry the values they replaced, so a
+    rebase keeps the other process's edits to the record's other fields
+    and only a clash on the same field is a "conflict". Fields named in
+    the model's UNIQUE are re-checked against the reloaded records. A
+    change that fails either check is dropped in favour of the file, and
+    the next commit raises it as a ServiceError. put() replaces the whole
+    record, last writer wins.
+
+    Changes are group-committed. put() and delete() update `records` at
+    once and mark the key dirty; every dirty key then reaches disk in a
+    single change() `commit_seconds` after the first of them
+    (TIPPER_COMMIT_SECONDS), on commit() or close(), and at exit. A
+    commit with nothing dirty writes nothing. For each field update()
+    changes, the group keeps the value from before its first change, so a
+    record updated several times while another process wrote is still
+    merged field by field. A timed commit reports dropped changes on
+    stderr.
+    """
+
+    def __init__(self, path, key_field=None, model=None):
+        self.path = path
+        self.key_field = key_field
+        self.model = model
+        self.records = {}
+        self.version = 0
+        self.rebases = 0
+        self.lock = FileLock.for_path(path)
+        self._signature = None
+        self.dirty = {}  # key -> record to write, or None to delete
+        self.bases = {}  # key -> {attribute: value before update()} for dirty records
+        self.conflicts = []  # ServiceErrors for dropped changes, raised by the next commit
+        self.unique = getattr(model, "UNIQUE", ())
+        self.commits = 0
+        self.commit_seconds = float(os.environ.get("TIPPER_COMMIT_SECONDS", COMMIT_SECONDS))
+        self._timer = None
+        self._sorted = (None, [])  # (version, sorted keys)
+        self._folded = (None, {})  # (version, {upper-cased key: key}), see folded_keys()
+
+    def read_snapshot(self):
+        data = read_json(self.path)
+        if data is None:
+            return {}
+        decode = self.decode
+        if self.key_field is None:
+            return {key: decode(rec) for key, rec in data.items()}
+        records = {}
+        for i, rec in enumerate(data):
+            # Legacy rows without an ID get a placeholder key until re-keyed
+            records[rec.get(self.key_field) or f"#{i}"] = decode(rec)
+        return records
+
+    def decode(self, data):
+        return self.model.from_dict(data) if self.model else data
+
+    def snapshot_data(self):
+        if self.key_field is None:
+            return self.records
+        return list(self.records.values())
+
+    def write_snapshot(self):
+        write_json(self.path, self.snapshot_data(), default=json_default)
+        self.written()
+
+    def signature(self):
+        return file_signature(self.path)
+
+    def written(self):
+        # Our own writes must not look like an outside change
+        self._signature = self.signature()
+
+    def load(self):
+        with self.lock:
+            self._signature = self.signature()
+            self.records = self.read_snapshot()
+            self.apply_dirty()
+        self.version += 1
+        return self.records
+
+    def apply_dirty(self):
+        # Uncommitted changes stay on top of whatever was just read
+        theirs = {}
+        for key, record in list(self.dirty.items()):
+            if record is None:
+                self.records.pop(key, None)
+                continue
+            theirs[key] = self.records.get(key)
+            base = self.bases.get(key)
+            if base is not None and theirs[key] is not record:
+                problem = self.merge(record, theirs[key], base)
+                if problem:
+                    self.drop_change(key, theirs[key], ServiceError("conflict", f"{key}: {problem}"))
+                    continue
+            self.records[key] = record
+        if self.unique and theirs:
+            self.check_unique(theirs)
+
+    def merge(self, ours, theirs, base):
+        """Fold another process's version of a record into ours; returns a problem or None.
+
+        `base` holds the values our update() replaced. Every other field
+        takes their value; a field both sides changed to different values
+        is a clash.
+        """
+        if theirs is None:
+            return "it was deleted by another process."
+        for attr, before in base.items():
+            value = getattr(theirs, attr)
+            if value != before and value != getattr(ours, attr):
+                return f"{attr} was changed by another process."
+        for attr, _, _ in ours._layout:
+            if attr not in base:
+                setattr(ours, attr, getattr(theirs, attr))
+        if "extra" not in base:
+            ours.extra = theirs.extra
+        return None
+
+    def check_unique(self, theirs):
+        # A UNIQUE value our change set must not have been taken by another record meanwhile
+        defaults = {attr: default for attr, _, default in self.model._layout}
+        for attr in self.unique:
+            claimed = {}
+            for key, old in theirs.items():
+                record = self.dirty.get(key)
+                value = getattr(record, attr, None)
+                if (record is not None and value not in (None, "", defaults[attr])
+                        and (old is None or getattr(old, attr) != value)):
+                    claimed[value] = key
+            if not claimed:
+                continue
+            for key, value in self.holders(attr, claimed):
+                owner = claimed.get(value)
+                if owner is not None and owner != key and key not in self.dirty:
+                    self.drop_change(owner, theirs[owner], ServiceError(
+                        "duplicate", f"{attr} {value} was registered by another process first.", attr))
+                    del claimed[value]
+
+    def holders(self, attr, values):
+        # (key, value) for every record whose `attr` is one of `values`
+        return [(key, getattr(record, attr)) for key, record in list(self.records.items())
+                if getattr(record, attr) in values]
+
+    def drop_change(self, key, theirs, error):
+        # The file wins: forget our change to `key` and report it at the next commit
+        self.dirty.pop(key, None)
+        self.bases.pop(key, None)
+        if theirs is None:
+            self.records.pop(key, None)
+        else:
+            self.records[key] = theirs
+        self.conflicts.append(error)
+
+    def refresh(self):
+        """Reload only if the data changed on disk since the last load or write."""
+        if self.signature() != self._signature:
+            self.load()
+        return self.records
+
+    def rebase(self):
+        # Called under the lock: pick up other writers' changes before ours
+        if self.signature() != self._signature:
+            self.load()
+            self.rebases += 1
+
+    def change(self, puts=(), deletes=()):
+        """Apply puts and deletes on top of the latest file and write it out."""
+        with self.lock:
+            self.rebase()
+            self.records.update(puts)
+            for key in deletes:
+                self.records.pop(key, None)
+            self.write_snapshot()
+
+    def mark(self, puts=(), deletes=(), bases=None):
+        """Apply puts and deletes in memory and queue them for the next commit.
+
+        `bases` maps keys of `puts` to the {attribute: old value} their
+        update() replaced; a put without one replaces the whole record.
+        """
+        bases = bases or {}
+        with self.lock:
+            for key, record in puts:
+                self.records[key] = record
+                self.dirty[key] = record
+                if key in bases:
+                    # The oldest value is the one the file still holds
+                    kept = self.bases.setdefault(key, {})
+                    for attr, value in bases[key].items():
+                        kept.setdefault(attr, value)
+                else:
+                    self.bases.pop(key, None)
+            for key in deletes:
+                self.records.pop(key, None)
+                self.dirty[key] = None
+                self.bases.pop(key, None)
+            version, folded = self._folded
+            self.version += 1
+            if version == self.version - 1:
+                # Keep the case-folded keys current rather than rebuild them
+                for key, _ in puts:
+                    if key != key.upper():
+                        folded[key.upper()] = key
+                for key in deletes:
+                    if folded.get(key.upper()) == key:
+                        del folded[key.upper()]
+                self._folded = (self.version, folded)
+            if self.commit_seconds <= 0:
+                self.commit()
+            else:
+                self.schedule_commit()
+
+    def schedule_commit(self):
+        if self._timer is None and self.dirty:
+            self._timer = threading.Timer(self.commit_seconds, self.timed_commit)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def timed_commit(self):
+        try:
+            self.commit()
+        except ServiceError as e:
+            # Committed, except for changes another process got to first
+            print(f"[store] Change to {self.path} dropped: {e.message}", file=sys.stderr)
+        except Exception as e:
+            # The changes are still dirty; try again after another interval
+            print(f"[store] Commit to {self.path} failed: {e}", file=sys.stderr)
+            with self.lock:
+                self.schedule_commit()
+
+    def commit(self):
+        """Write every dirty record in one change(); returns how many there were.
+
+        Changes dropped by a rebase (see merge() and check_unique()) are
+        raised here as a ServiceError, after the rest have been written.
+        """
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            count = 0
+            if self.dirty:
+                self.rebase()  # merges our changes into other writers' first
+                dirty, self.dirty = self.dirty, {}
+                bases, self.bases = self.bases, {}
+                try:
+                    self.change(puts=[(k, r) for k, r in dirty.items() if r is not None],
+                                deletes=[k for k, r in dirty.items() if r is None])
+                except BaseException:
+                    # Keep them for the next attempt
+                    self.dirty = dict(dirty, **self.dirty)
+                    self.bases = dict(bases, **self.bases)
+                    raise
+                self.commits += 1
+                count = len(dirty)
+            self.raise_conflicts()
+            return count
+
+    def raise_conflicts(self):
+        if not self.conflicts:
+            return
+        errors, self.conflicts = self.conflicts, []
+        if len(errors) == 1:
+            raise errors[0]
+        raise ServiceError(errors[0].code, f"{len(errors)} changes to {self.path} were dropped: "
+                           + " ".join(e.message for e in errors), errors[0].field)
+
+    def folded_keys(self):
+        """{upper-cased key: key} for the keys not stored in upper case; used by find_key().
+
+        Rebuilt after a load; mark() keeps it current for our own writes.
+        """
+        version, folded = self._folded
+        if version != self.version:
+            folded = {key.upper(): key for key in self.records if key != key.upper()}
+            self._folded = (self.version, folded)
+        return folded
+
+    def sorted_keys(self):
+        """Record keys in sorted order, re-sorted only after a change; used by iter_records()."""
+        version, keys = self._sorted
+        if version != self.version:
+            keys = sorted(self.records)
+            self._sorted = (self.version, keys)
+        return keys
+
+    def put(self, key, record):
+        self.mark(puts=[(key, record)])
+
+    def put_many(self, items, bases=None):
+        self.mark(puts=list(items), bases=bases)
+
+    def update(self, key, record, changes):
+        """Set `changes` ({attribute: value}) on `record` and queue it.
+
+        Only these attributes count as this process's change: if another
+        process changed the record first, its other fields are kept.
+        """
+        self.update_many([(key, record, changes)])
+
+    def update_many(self, items):
+        """update() for each (key, record, changes), queued together."""
+        puts, bases = [], {}
+        for key, record, changes in items:
+            bases[key] = {attr: getattr(record, attr) for attr in changes}
+            for attr, value in changes.items():
+                setattr(record, attr, value)
+            puts.append((key, record))
+        self.put_many(puts, bases)
+
+    def delete(self, key):
+        self.mark(deletes=[key])
+
+    def delete_many(self, keys):
+        self.mark(deletes=list(keys))
+
+    def replace_all(self, records):
+        with self.lock:
+            self.dirty.clear()
+            self.bases.clear()
+            self.records = records
+            self.write_snapshot()
+            self.version += 1
+
+    def close(self):
+        self.commit()
+
+    # Small metadata (schema version, counters) lives next to the file
+    def read_meta(self):
+        return read_json(self.path + ".meta", {})
+
+    def get_meta(self, name, default=None):
+        return self.read_meta().get(name, default)
+
+    def set_meta(self, name, value):
+        with self.lock:
+            meta = self.read_meta()
+            meta[name] = value
+            write_json(self.path + ".meta", meta)
+
+
+class JournalStore(JsonStore):
+    """Snapshot plus append-only log; a write costs one log line.
+
+    Every mutation is appended to `<file>.log`. Once `compact_every` entries
+    have piled up the records are written out as a fresh snapshot and the
+    log is truncated. Loading replays the snapshot and then the log.
+    Appends and compaction happen under the file lock, after a rebase.
+    """
+
+    def __init__(self, path, key_field=None, model=None, compact_every=1000):
+        super().__init__(path, key_field, model)
+        self.log_path = path + ".log"
+        self.compact_every = compact_every
+        self.log_entries = 0
+        self._log = None
+
+    def signature(self):
+        return file_signature(self.path), file_signature(self.log_path)
+
+    def load(self):
+        # Under the lock, so a partial last line can only be left by a crash
+        with self.lock:
+            self._signature = self.signature()
+            self.records = self.read_snapshot()
+            self.version += 1
+            self.log_entries = 0
+            torn = False
+            try:
+                with open(self.log_path, "r") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            torn = True  # half-written tail from a crash
+                            break
+                        self.apply(entry)
+                        self.log_entries += 1
+            except FileNotFoundError:
+                pass
+            self.apply_dirty()
+            if torn:
+                self.compact()
+        return self.records
+
+    def apply(self, entry):
+        if entry["op"] == "put":
+            self.records[entry["key"]] = self.decode(entry["value"])
+        elif entry["op"] == "delete":
+            self.records.pop(entry["key"], None)
+
+    def append(self, entries):
+        if self._log is None:
+            self._log = open(self.log_path, "a")
+        self._log.write("".join(json.dumps(e, default=json_default) + "\n" for e in entries))
+        self._log.flush()
+        os.fsync(self._log.fileno())  # once per group commit, not per change
+        self.written()
+        self.log_entries += len(entries)
+        if self.log_entries >= self.compact_every:
+            self.compact()
+
+    def change(self, puts=(), deletes=()):
+        with self.lock:
+            self.rebase()
+            self.records.update(puts)
+            for key in deletes:
+                self.records.pop(key, None)
+            self.append([{"op": "put", "key": k, "value": r} for k, r in puts]
+                        + [{"op": "delete", "key": key} for key in deletes])
+
+    def replace_all(self, records):
+        with self.lock:
+            self.dirty.clear()
+            self.bases.clear()
+            self.records = records
+            self.compact()
+            self.version += 1
+
+    def compact(self):
+        # New snapshot first, then drop the log; replaying a stale log over
+        # the new snapshot is harmless because puts/deletes are idempotent.
+        with self.lock:
+            write_json(self.path, self.snapshot_data(), default=json_default)
+            self.close_log()
+            open(self.log_path, "w").close()
+            self.written()
+            self.log_entries = 0
+
+    def close(self):
+        self.commit()
+        self.close_log()
+
+    def close_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def column_name(field):
+    return field.lower().replace(" ", "_")
+
+
+class SqliteStore:
+    """One table per collection in a shared SQLite database.
+
+    Each row holds the record as JSON plus a few extracted columns with
+    their own indexes, so single-record writes and indexed lookups cost
+    O(log n) instead of a full-file rewrite. On first use the table is
+    filled from the collection's JSON file (snapshot plus journal).
+    Changes are group-committed as in JsonStore, one transaction each.
+    Every transaction bumps the table's row in `versions`, so a store
+    reloads only when its own table changed.
+    """
+
+    # Collection -> (key column, indexed fields)
+    TABLES = {
+        "users": ("user_id", ["mobile", "email"]),
+        "vehicles": ("vehicle_id", ["vehicle_number", "driver_id"]),
+        "insurance": ("insurance_id", ["Vehicle ID"]),
+        "maintenance_data": ("maintenance_id", ["vehicle_id"]),
+    }
+
+    _connections = {}
+    _conn_locks = {}
+
+    def __init__(self, path, key_field=None, model=None, db_path=None):
+        self.path = path
+        self.key_field = key_field
+        self.model = model
+        self.db_path = db_path or os.environ.get("TIPPER_DB", "tipper.db")
+        self.table = os.path.splitext(os.path.basename(path))[0]
+        default_key = column_name(key_field) if key_field else "id"
+        self.key_column, self.index_fields = self.TABLES.get(self.table, (default_key, []))
+        self.records = {}
+        self.version = 0
+        self._signature = None
+        self.dirty = {}
+        self.bases = {}
+        self.conflicts = []
+        self.unique = getattr(model, "UNIQUE", ())
+        self.rebases = 0
+        self.commits = 0
+        self.commit_seconds = float(os.environ.get("TIPPER_COMMIT_SECONDS", COMMIT_SECONDS))
+        self._timer = None
+        self._sorted = (None, [])
+        self._folded = (None, {})
+        # SQLite serializes writes itself; this guards ID allocation and commits
+        self.lock = FileLock.for_path(f"{self.db_path}.{self.table}")
+        self.conn = self.connect(self.db_path)
+        # Stores on one database share its connection, so their transactions take turns
+        self.conn_lock = self._conn_locks.setdefault(os.path.abspath(self.db_path), threading.RLock())
+        self.create_table()
+
+    @classmethod
+    def connect(cls, db_path):
+        key = os.path.abspath(db_path)
+        conn = cls._connections.get(key)
+        if conn is None:
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            cls._connections[key] = conn
+        return conn
+
+    def create_table(self):
+        columns = "".join(f', "{column_name(f)}" TEXT' for f in self.index_fields)
+        with self.conn_lock, self.conn:
+            self.conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.table}" '
+                f'("{self.key_column}" TEXT PRIMARY KEY, data TEXT NOT NULL{columns})'
+            )
+            for field in self.index_fields:
+                col = column_name(field)
+                self.conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{self.table}_{col}" ON "{self.table}" ("{col}")'
+                )
+
+    def row(self, key, record):
+        values = [key, json.dumps(record, default=json_default)]
+        for field in self.index_fields:
+            value = record.get(field)
+            values.append(None if value is None else str(value))
+        return values
+
+    def write_rows(self, items):
+        cols = [self.key_column, "data"] + [column_name(f) for f in self.index_fields]
+        names = ", ".join(f'"{c}"' for c in cols)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in cols[1:])
+        marks = ", ".join("?" for _ in cols)
+        # Upsert keeps the rowid, so records stay in insertion order
+        self.conn.executemany(
+            f'INSERT INTO "{self.table}" ({names}) VALUES ({marks}) '
+            f'ON CONFLICT("{self.key_column}") DO UPDATE SET {updates}',
+            (self.row(k, r) for k, r in items),
+        )
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, name, value):
+        with self.conn_lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, json.dumps(value))
+            )
+
+    def migrate(self):
+        """Import the JSON file into the table once."""
+        flag = f"migrated:{self.table}"
+        if self.get_meta(flag):
+            return None
+        records = JournalStore(self.path, self.key_field).load()
+        with self.conn_lock, self.conn:
+            self.write_rows(records.items())
+            self.bump()
+        self.set_meta(flag, True)
+        return len(records)
+
+    def signature(self):
+        # This table's version; writes to other tables leave it alone
+        row = self.conn.execute("SELECT version FROM versions WHERE name = ?", (self.table,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self):
+        # Inside the writing transaction, so no other writer's bump can slip in between
+        self.conn.execute("INSERT INTO versions (name, version) VALUES (?, 1) "
+                          "ON CONFLICT(name) DO UPDATE SET version = version + 1", (self.table,))
+        self._signature = self.signature()
+
+    def load(self):
+        self.migrate()
+        self._signature = self.signature()
+        rows = self.conn.execute(
+            f'SELECT "{self.key_column}", data FROM "{self.table}" ORDER BY rowid'
+        )
+        decode = self.decode
+        self.records = {key: decode(json.loads(data)) for key, data in rows}
+        self.apply_dirty()
+        self.version += 1
+        return self.records
+
+    def refresh(self):
+        if self.signature() != self._signature:
+            self.load()
+        return self.records
+
+    def close(self):
+        self.commit()  # the connection is shared; see close_stores()
+
+    def holders(self, attr, values):
+        # Indexed fields are looked up with one SELECT instead of a scan
+        field = self.model.KEYS.get(attr, attr)
+        if field not in self.index_fields:
+            return JsonStore.holders(self, attr, values)
+        col = column_name(field)
+        marks = ", ".join("?" for _ in values)
+        rows = self.conn.execute(f'SELECT "{self.key_column}" FROM "{self.table}" WHERE "{col}" IN ({marks})',
+                                 [str(v) for v in values])
+        return [(key, getattr(self.records[key], attr)) for key, in rows if key in self.records]
+
+    decode = JsonStore.decode
+    apply_dirty = JsonStore.apply_dirty
+    merge = JsonStore.merge
+    check_unique = JsonStore.check_unique
+    drop_change = JsonStore.drop_change
+    rebase = JsonStore.rebase
+    mark = JsonStore.mark
+    schedule_commit = JsonStore.schedule_commit
+    timed_commit = JsonStore.timed_commit
+    commit = JsonStore.commit
+    raise_conflicts = JsonStore.raise_conflicts
+    sorted_keys = JsonStore.sorted_keys
+    folded_keys = JsonStore.folded_keys
+    put = JsonStore.put
+    put_many = JsonStore.put_many
+    update = JsonStore.update
+    update_many = JsonStore.update_many
+    delete = JsonStore.delete
+    delete_many = JsonStore.delete_many
+
+    def change(self, puts=(), deletes=()):
+        with self.conn_lock, self.conn:
+            self.write_rows(puts)
+            self.conn.executemany(
+                f'DELETE FROM "{self.table}" WHERE "{self.key_column}" = ?', ((k,) for k in deletes)
+            )
+            self.bump()
+
+    def replace_all(self, records):
+        self.dirty.clear()
+        self.bases.clear()
+        self.records = records
+        with self.conn_lock, self.conn:
+            self.conn.execute(f'DELETE FROM "{self.table}"')
+            self.write_rows(records.items())
+            self.bump()
+        self.version += 1
+
+
+STORE_BACKENDS = {
+    "json": JsonStore,
+    "journal": JournalStore,
+    "sqlite": SqliteStore,
+}
+
+
+# -----------------------------
+# Sharded Stores
+# -----------------------------
+class ShardedRecords(Mapping):
+    """The records of a ShardedStore seen as one dict, without loading it all.
+
+    A lookup by key reads the key map and the one shard holding the key;
+    `in` reads only the key map; len() comes from the manifest. Iteration
+    goes shard by shard in name order, loading each as it is reached.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, key):
+        name = self.store.key_map().records.get(key)
+        if name is None:
+            raise KeyError(key)
+        return self.store.shard(name).records[key]
+
+    def __contains__(self, key):
+        return key in self.store.key_map().records
+
+    def get_many(self, keys):
+        """Records for `keys`, None where there is none; each shard involved is refreshed once."""
+        key_map = self.store.key_map().records
+        shards, found = {}, []
+        for key in keys:
+            name = key_map.get(key)
+            if name is not None and name not in shards:
+                shards[name] = self.store.shard(name).records
+            found.append(shards[name].get(key) if name is not None else None)
+        return found
+
+    def __len__(self):
+        return sum(self.store.manifest.refresh().values())
+
+    def __iter__(self):
+        for name in self.store.names():
+            yield from self.store.shard(name).records
+
+    def items(self):
+        for name in self.store.names():
+            yield from self.store.shard(name).records.items()
+
+    def values(self):
+        for name in self.store.names():
+            yield from self.store.shard(name).records.values()
+
+
+class ShardedStore:
+    """A collection split into shards that are read only when an operation needs them.
+
+    `shard_of(record)` names the shard a record belongs in. Next to `path`,
+    the directory `<name>.shards` holds one store of the configured
+    backend per shard, plus two small stores of its own: the manifest
+    (shard name -> record count), which is all that is read on open, and
+    the key map (record key -> shard name), read on the first lookup or
+    write by key. Each of these locks, rebases and group-commits on its
+    own. `records` is a ShardedRecords view, so callers that only look up
+    a few keys never load the rest. side_store() adds further small stores
+    of the caller's own, such as indexes, committed along with the rest.
+
+    The first open splits the records of `path` into shards, under the
+    manifest's lock; `path` itself is left as it was. `layout` names the
+    shard function; when it differs from the one the shards were written
+    with, the records are moved to their new shards on open.
+    """
+
+    def __init__(self, path, key_field, model, shard_of, backend, layout=True):
+        self.path = path
+        self.key_field = key_field
+        self.model = model
+        self.shard_of = shard_of
+        self.backend = backend
+        self.layout = layout
+        stem = os.path.splitext(path)[0]
+        self.directory = stem + ".shards"
+        self.prefix = os.path.basename(stem)
+        os.makedirs(self.directory, exist_ok=True)
+        self.shards = {}  # name -> store, for the shards loaded so far
+        self.sides = {}   # name -> store, see side_store()
+        self.records = ShardedRecords(self)
+        self.manifest = backend(self.part_path("manifest"))
+        self.lock = self.manifest.lock
+        self._keys = None
+        with self.lock:
+            self.manifest.load()
+            written_with = self.manifest.get_meta(f"sharded:{self.prefix}")
+            if not written_with:
+                self.split()
+            elif written_with != layout:
+                self.reshard()
+
+    def part_path(self, name):
+        return os.path.join(self.directory, f"{self.prefix}.{name}.json")
+
+    def split(self):
+        # One-off: spread the unsharded collection over its shards
+        legacy = self.backend(self.path, self.key_field, self.model)
+        groups = {}
+        for key, record in legacy.load().items():
+            groups.setdefault(self.shard_of(record), {})[key] = record
+        for name, group in groups.items():
+            self.open_shard(name).replace_all(group)
+        self.key_map().replace_all({key: name for name, group in groups.items() for key in group})
+        self.manifest.replace_all({name: len(group) for name, group in groups.items()})
+        if hasattr(legacy, "read_meta"):  # SQLite keeps its ID counters database-wide
+            for name, value in legacy.read_meta().items():
+                self.manifest.set_meta(name, value)
+        self.manifest.set_meta(f"sharded:{self.prefix}", self.layout)  # SQLite meta is shared
+        legacy.close()
+
+    def reshard(self):
+        # One-off after the shard function changed: move every record to its new shard
+        records = {}
+        for name in self.names():
+            records.update(self.shard(name).records)
+        self.replace_all(records)
+        self.manifest.set_meta(f"sharded:{self.prefix}", self.layout)
+
+    def open_shard(self, name):
+        store = self.shards[name] = self.backend(self.part_path(name), self.key_field, self.model)
+        return store
+
+    def shard(self, name):
+        """The store for shard `name`, read on first use and refreshed after."""
+        store = self.shards.get(name)
+        if store is None:
+            store = self.open_shard(name)
+            store.load()
+        else:
+            store.refresh()
+        return store
+
+    def key_map(self):
+        if self._keys is None:
+            self._keys = self.backend(self.part_path("keys"))
+            self._keys.load()
+        else:
+            self._keys.refresh()
+        return self._keys
+
+    def side_store(self, name):
+        """Plain store `name` next to the manifest, read on first use and refreshed after."""
+        store = self.sides.get(name)
+        if store is None:
+            store = self.sides[name] = self.backend(self.part_path(name))
+            store.load()
+        else:
+            store.refresh()
+        return store
+
+    def sorted_keys(self):
+        # From the key map, so no shard needs reading
+        return self.key_map().sorted_keys()
+
+    def names(self):
+        """Names of the non-empty shards, in order."""
+        return sorted(self.manifest.refresh())
+
+    @property
+    def version(self):
+        # Changes when any part read so far changes, or another shard gets read
+        parts = [self.manifest, self._keys, *self.shards.values()]
+        return sum(part.version for part in parts if part is not None)
+
+    @property
+    def commits(self):
+        parts = [self.manifest, self._keys, *self.shards.values(), *self.sides.values()]
+        return sum(part.commits for part in parts if part is not None)
+
+    def refresh(self):
+        """Pick up shards other processes added or emptied; loaded shards refresh on access."""
+        self.manifest.refresh()
+        return self.records
+
+    def recount(self, names):
+        counts = {name: len(self.shard(name).records) for name in names}
+        changed = [(name, n) for name, n in counts.items() if n and self.manifest.records.get(name) != n]
+        emptied = [name for name, n in counts.items() if not n and name in self.manifest.records]
+        if changed:
+            self.manifest.put_many(changed)
+        if emptied:
+            self.manifest.delete_many(emptied)
+
+    def put(self, key, record):
+        self.put_many([(key, record)])
+
+    def put_many(self, items, bases=None):
+        """Write records to their shards, moving any whose shard changed.
+
+        `bases` is as for JsonStore.mark(); a moved record arrives in its
+        new shard as a whole record.
+        """
+        bases = bases or {}
+        key_map = self.key_map().records
+        groups, moved = {}, {}
+        for key, record in items:
+            name = self.shard_of(record)
+            old = key_map.get(key)
+            if old is not None and old != name:
+                moved.setdefault(old, []).append(key)
+            groups.setdefault(name, []).append((key, record))
+        for name, keys in moved.items():
+            self.shard(name).delete_many(keys)
+        for name, group in groups.items():
+            self.shard(name).put_many(group, {key: bases[key] for key, _ in group
+                                              if key in bases and key_map.get(key) == name})
+        placed = [(key, name) for name, group in groups.items() for key, _ in group if key_map.get(key) != name]
+        if placed:
+            self._keys.put_many(placed)
+        self.recount(groups.keys() | moved.keys())
+
+    update = JsonStore.update
+    update_many = JsonStore.update_many
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        key_map = self.key_map().records
+        groups = {}
+        for key in keys:
+            name = key_map.get(key)
+            if name is not None:
+                groups.setdefault(name, []).append(key)
+        for name, group in groups.items():
+            self.shard(name).delete_many(group)
+        if groups:
+            self._keys.delete_many([key for group in groups.values() for key in group])
+            self.recount(groups)
+
+    def drop_shard(self, name):
+        """Delete every record in shard `name`; returns them as a dict."""
+        store = self.shard(name)
+        removed = dict(store.records)
+        store.replace_all({})
+        self.key_map().delete_many(list(removed))
+        self.recount([name])
+        return removed
+
+    def replace_all(self, records):
+        groups = {}
+        for key, record in list(records.items()):
+            groups.setdefault(self.shard_of(record), {})[key] = record
+        for name in set(self.names()) | groups.keys():
+            self.shard(name).replace_all(groups.get(name, {}))
+        self.key_map().replace_all({key: name for name, group in groups.items() for key in group})
+        self.manifest.replace_all({name: len(group) for name, group in groups.items()})
+
+    # ID counters live with the manifest
+    def get_meta(self, name, default=None):
+        return self.manifest.get_meta(name, default)
+
+    def set_meta(self, name, value):
+        self.manifest.set_meta(name, value)
+
+    def commit(self):
+        count, errors = 0, []
+        for part in [self.manifest, self._keys, *self.shards.values(), *self.sides.values()]:
+            if part is not None:
+                try:
+                    count += part.commit()
+                except ServiceError as e:
+                    errors.append(e)  # the other parts still get written
+        if errors:
+            raise errors[0]
+        return count
+
+    def close(self):
+        for part in [*self.sides.values(), *self.shards.values(), self._keys, self.manifest]:
+            if part is not None:
+                part.close()
+
+
+class ShardView:
+    """The records of one shard of a SqliteShardedStore; `version` changes with them."""
+    __slots__ = ("records", "version")
+
+    def __init__(self, records, version):
+        self.records = records
+        self.version = version
+
+
+class SqliteShardedStore(SqliteStore):
+    """open_sharded() on the SQLite backend: one indexed table, grouped into shards in memory.
+
+    A table already gives O(log n) writes and indexed lookups, so it is
+    not split. Records are grouped by `shard_of` in memory instead, and
+    names(), shard(), drop_shard() and side_store() behave as on
+    ShardedStore. Tables left by the per-shard layout are folded back into
+    the collection's table and dropped on open.
+    """
+
+    def __init__(self, path, key_field, model, shard_of):
+        super().__init__(path, key_field, model)
+        self.shard_of = shard_of
+        self.sides = {}
+        self.groups = {}   # shard name -> ShardView
+        self.placed = {}   # key -> shard name
+        self._grouped = None
+        self._shard_versions = count(1)
+        with self.lock:
+            self.unshard()
+        self.load()
+
+    def unshard(self):
+        # One-off: merge the tables of the per-shard layout back into ours
+        flag = f"sharded:{self.table}"
+        if not self.get_meta(flag):
+            return
+        manifest = f"{self.table}.manifest"
+        tables = {name for name, in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        names = [name for name, in self.conn.execute(f'SELECT id FROM "{manifest}"')] if manifest in tables else []
+        parts = [f"{self.table}.{name}" for name in names if f"{self.table}.{name}" in tables]
+        records = {}
+        for part in parts:
+            key_column = self.conn.execute(f'PRAGMA table_info("{part}")').fetchone()[1]
+            for key, data in self.conn.execute(f'SELECT "{key_column}", data FROM "{part}"'):
+                records[key] = self.decode(json.loads(data))
+        with self.conn_lock, self.conn:
+            self.conn.execute(f'DELETE FROM "{self.table}"')
+            self.write_rows(records.items())
+            self.bump()
+            for part in [*parts, manifest, f"{self.table}.keys"]:
+                self.conn.execute(f'DROP TABLE IF EXISTS "{part}"')
+            self.conn.execute("DELETE FROM meta WHERE name = ?", (flag,))
+            # The JSON file is older than these records; never import it again
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, 'true')",
+                              (f"migrated:{self.table}",))
+
+    def grouped(self):
+        """{shard name: ShardView}, regrouped only after a load."""
+        if self._grouped != self.version:
+            groups, placed = {}, {}
+            for key, record in self.records.items():
+                name = placed[key] = self.shard_of(record)
+                groups.setdefault(name, {})[key] = record
+            version = next(self._shard_versions)
+            self.groups = {name: ShardView(group, version) for name, group in groups.items()}
+            self.placed = placed
+            self._grouped = self.version
+        return self.groups
+
+    def mark(self, puts=(), deletes=(), bases=None):
+        current = self._grouped == self.version
+        version = self.version
+        SqliteStore.mark(self, puts, deletes, bases)
+        if not current or self.version != version + 1:
+            return  # reloaded meanwhile; grouped() starts over
+        # Our own writes: move just these records between groups
+        touched = set()
+        for key in [*(key for key, _ in puts), *deletes]:
+            old = self.placed.pop(key, None)
+            if old is not None:
+                self.groups[old].records.pop(key, None)
+                touched.add(old)
+            record = self.records.get(key)
+            if record is not None:
+                name = self.placed[key] = self.shard_of(record)
+                if name not in self.groups:
+                    self.groups[name] = ShardView({}, 0)
+                self.groups[name].records[key] = record
+                touched.add(name)
+        for name in touched:
+            self.groups[name].version = next(self._shard_versions)
+        self._grouped = self.version
+
+    def names(self):
+        """Names of the non-empty shards, in order."""
+        self.refresh()
+        return sorted(name for name, view in self.grouped().items() if view.records)
+
+    def shard(self, name):
+        self.refresh()
+        return self.grouped().get(name) or ShardView({}, 0)
+
+    def drop_shard(self, name):
+        removed = dict(self.shard(name).records)
+        self.delete_many(list(removed))
+        return removed
+
+    def side_store(self, name):
+        store = self.sides.get(name)
+        if store is None:
+            side_path = os.path.join(os.path.dirname(self.path), f"{self.table}.{name}.json")
+            store = self.sides[name] = SqliteStore(side_path)
+            store.load()
+        else:
+            store.refresh()
+        return store
+
+    def commit(self):
+        count, errors = 0, []
+        for part in [super(), *self.sides.values()]:
+            try:
+                count += part.commit()
+            except ServiceError as e:
+                errors.append(e)  # the other parts still get written
+        if errors:
+            raise errors[0]
+        return count
+
+    def close(self):
+        for side in self.sides.values():
+            side.close()
+        super().close()
+
+_stores = {}
+
+
+def open_store(path, key_field=None, model=None, lazy=False):
+    """Return the process-wide store for `path`.
+
+    The backend comes from the TIPPER_STORAGE environment variable:
+    "json" (default), "journal" for the append-only log, or "sqlite" for
+    the shared database named by TIPPER_DB. A `lazy` store is not read
+    until its first refresh().
+    """
+    key = os.path.abspath(path)
+    store = _stores.get(key)
+    if store is None:
+        backend = os.environ.get("TIPPER_STORAGE", "json")
+        store = STORE_BACKENDS[backend](path, key_field, model)
+        _stores[key] = store
+    if not lazy and not store.version:
+        store.load()
+    return store
+
+
+def open_sharded(path, key_field, model, shard_of, layout=True):
+    """Return the process-wide sharded store for `path`; backend as in open_store().
+
+    SQLite keeps the collection in one indexed table (SqliteShardedStore);
+    the file backends get a ShardedStore.
+    """
+    key = os.path.abspath(path)
+    store = _stores.get(key)
+    if store is None:
+        backend = STORE_BACKENDS[os.environ.get("TIPPER_STORAGE", "json")]
+        if backend is SqliteStore:
+            store = _stores[key] = SqliteShardedStore(path, key_field, model, shard_of)
+        else:
+            store = _stores[key] = ShardedStore(path, key_field, model, shard_of, backend, layout)
+    return store
+
+
+def commit_stores():
+    """Write out the pending changes of every open store.
+
+    Every store is committed even when one of them drops a change; those
+    ServiceErrors are raised afterwards, the first one carrying the rest
+    in `others`.
+    """
+    errors = []
+    for store in list(_stores.values()):
+        try:
+            store.commit()
+        except ServiceError as e:
+            errors.append(e)
+    if errors:
+        errors[0].others = errors[1:]
+        raise errors[0]
+
+
+def commit_at_exit():
+    # Nothing marked dirty is lost on a normal exit, Ctrl-C included
+    try:
+        commit_stores()
+    except ServiceError as e:
+        for error in [e, *e.others]:
+            print(f"[store] Change dropped on exit: {error.message}", file=sys.stderr)
+    except Exception as e:
+        print(f"[store] Commit on exit failed: {e!r}", file=sys.stderr)
+
+
+atexit.register(commit_at_exit)
+
+
+def close_stores():
+    """Commit, close and forget every open store so the next open_store() reloads from disk."""
+    for store in _stores.values():
+        store.close()
+    _stores.clear()
+    for conn in SqliteStore._connections.values():
+        conn.close()
+    SqliteStore._connections.clear()
+    for lock in FileLock._locks.values():
+        lock.close()
+    FileLock._locks.clear()
+
+
+# -----------------------------
+# Bulk Input
+# -----------------------------
+def read_rows(path):
+    """Stream (line number, row dict) pairs from a .csv or .jsonl file.
+
+    Lines that are not valid JSON objects come through as (line number, None)
+    so the caller can report them without aborting the whole file.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        return
+    with open(path, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                row = None
+            yield line_no, row if isinstance(row, dict) else None
+
+
+# -----------------------------
+# Listing and Export
+# -----------------------------
+PAGE_SIZE = 20
+
+
+def parse_filters(args):
+    """{"field": "value"} from command-line "field=value" arguments."""
+    filters = {}
+    for arg in args:
+        field, sep, value = arg.partition("=")
+        if not sep or not field:
+            raise ServiceError("invalid", f"Filter '{arg}' is not field=value.")
+        filters[field] = value
+    return filters
+
+
+def iter_records(records, filters=None, after=None, keys=None):
+    """Yield (key, record) pairs lazily, in key order.
+
+    `filters` maps field names to values compared case-insensitively as text.
+    `after` is a cursor: iteration resumes with the first key sorting after
+    it, found by bisect, so a page costs O(log n + page) and a cursor whose
+    record was deleted in the meantime still resumes in the right place.
+    `keys` is the sorted key list to walk, normally the store's
+    sorted_keys(); records deleted since it was taken are skipped.
+    """
+    if keys is None:
+        keys = sorted(records)
+    start = 0 if after is None else bisect_right(keys, after)
+    yield from filter_pairs(live_pairs(records, keys, start), filters)
+
+
+def live_pairs(records, keys, start=0):
+    """(key, record) for keys[start:] that still have a record.
+
+    Keys are fetched in growing batches, through records.get_many() where
+    the mapping has one (ShardedRecords reads each shard once per batch).
+    """
+    get_many = getattr(records, "get_many", None) or (lambda batch: [records.get(k) for k in batch])
+    size = 32
+    while start < len(keys):
+        batch = keys[start:start + size]
+        for key, record in zip(batch, get_many(batch)):
+            if record is not None:
+                yield key, record
+        start += size
+        size = min(size * 2, 1024)
+
+
+def find_key(store, key):
+    """Key of `store` equal to `key` ignoring case, or None.
+
+    An exact match is a plain dict lookup; otherwise the store's
+    folded_keys() finds legacy records saved under lower-case IDs, so a
+    miss costs two lookups rather than a scan.
+    """
+    records = store.records
+    if key in records:
+        return key
+    folded = key.upper()
+    if folded in records:
+        return folded
+    stored = store.folded_keys().get(folded)
+    return stored if stored in records else None
+
+
+def filter_pairs(pairs, filters=None):
+    """Lazily keep the (key, record) pairs whose fields match `filters`, as in iter_records."""
+    wanted = [(field, str(value).lower()) for field, value in (filters or {}).items()]
+    for key, record in pairs:
+        if all(str(record.get(field, "")).lower() == value for field, value in wanted):
+            yield key, record
+
+
+def take_page(pairs, limit=PAGE_SIZE):
+    """(records, cursor) for the first `limit` pairs; cursor is None on the last page."""
+    page = list(islice(pairs, limit + 1))
+    if len(page) > limit:
+        return [record for _, record in page[:limit]], page[limit - 1][0]
+    return [record for _, record in page], None
+
+
+class JsonlWriter:
+    """One JSON object per line, written out in blocks of `buffer_rows`."""
+
+    def __init__(self, out, buffer_rows=500):
+        self.out = out
+        self.buffer_rows = buffer_rows
+        self.lines = []
+
+    def header(self):
+        pass
+
+    def write(self, record):
+        self.lines.append(json.dumps(record, default=json_default) + "\n")
+        if len(self.lines) >= self.buffer_rows:
+            self.flush()
+
+    def write_all(self, records):
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self):
+        if self.lines:
+            self.out.write("".join(self.lines))
+            self.lines = []
+        self.out.flush()
+
+
+class TableWriter(JsonlWriter):
+    """Fixed-width text table; `columns` is a list of (title, field, width)."""
+
+    def __init__(self, out, columns, buffer_rows=500):
+        super().__init__(out, buffer_rows)
+        self.columns = columns
+        self.rule = "-" * (sum(width + 1 for _, _, width in columns) - 1)
+
+    def header(self):
+        titles = " ".join(f"{title:<{width}}" for title, _, width in self.columns)
+        self.lines += [self.rule + "\n", titles.rstrip() + "\n", self.rule + "\n"]
+
+    def write(self, record):
+        row = " ".join(f"{str(record.get(field) or '-'):<{width}}" for _, field, width in self.columns)
+        self.lines.append(row.rstrip() + "\n")
+        if len(self.lines) >= self.buffer_rows:
+            self.flush()
+
+
+def show_pages(records, writer, page_size=PAGE_SIZE):
+    """Print records a page at a time, asking before each further page.
+
+    Returns the number of records shown.
+    """
+    writer.header()
+    shown = 0
+    for record in records:
+        if shown and shown % page_size == 0:
+            writer.flush()
+            if input("-- Enter for more, q to stop: ").strip().lower() == "q":
+                break
+        writer.write(record)
+        shown += 1
+    writer.flush()
+    return shown
+
+
+def export_records(records, path, columns):
+    """Stream records to `path` ("-" for stdout) and return how many were written.
+
+    A .jsonl path gets JSON lines, anything else a text table.
+    """
+    out = sys.stdout if path == "-" else open(path, "w")
+    try:
+        if path.lower().endswith(".jsonl"):
+            writer = JsonlWriter(out)
+        else:
+            writer = TableWriter(out, columns)
+            writer.header()
+        return writer.write_all(records)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def export_command(args, iterate, columns, noun):
+    """Handle `export <file> [field=value ...]`; `iterate(**filters)` yields (key, record)."""
+    try:
+        pairs = iterate(**parse_filters(args[1:]))
+    except ServiceError as e:
+        sys.exit(e.message)
+    count = export_records((record for _, record in pairs), args[0], columns)
+    print(f"Exported {count} {noun}.", file=sys.stderr)
+
+
+# -----------------------------
+# ID Allocation
+# -----------------------------
+ID_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def base36(n, width):
+    digits = ""
+    while n:
+        n, r = divmod(n, 36)
+        digits = ID_ALPHABET[r] + digits
+    return digits.rjust(width, "0")
+
+
+class IdAllocator:
+    """Hands out unique IDs from a counter kept in the store's metadata.
+
+    `format_id` turns the counter into an ID string. Candidates that are
+    already taken (legacy IDs in the store, or IDs reserved but not yet
+    saved) are skipped with a set lookup, so allocation is O(1) amortised
+    and never needs to look at the whole collection. The counter is read
+    and bumped under the store's file lock.
+    """
+
+    def __init__(self, store, name, format_id, start=1):
+        self.store = store
+        self.counter = f"next_id:{name}"
+        self.format_id = format_id
+        self.start = start
+        self.issued = set()
+
+    def taken(self, candidate):
+        return candidate in self.store.records or candidate in self.issued
+
+    def reserve(self, count):
+        """Reserve a block of `count` IDs with a single counter write."""
+        if count <= 0:
+            return []
+        # Under the store lock, against the latest records, so two processes
+        # never hand out the same ID
+        with self.store.lock:
+            self.store.refresh()
+            n = self.store.get_meta(self.counter, self.start)
+            ids = []
+            while len(ids) < count:
+                candidate = self.format_id(n)
+                n += 1
+                if not self.taken(candidate):
+                    ids.append(candidate)
+            self.issued.update(ids)
+            self.store.set_meta(self.counter, n)
+        return ids
+
+    def next_id(self):
+        return self.reserve(1)[0]
+
+
+# -----------------------------
+# Scheduler
+# -----------------------------
+def daily_at(hhmm):
+    """Schedule rule: every day at local time "HH:MM"."""
+    hour, minute = map(int, hhmm.split(":"))
+
+    def next_run(after):
+        run = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run <= after:
+            run += timedelta(days=1)
+        return run
+    return next_run
+
+
+def every(seconds):
+    """Schedule rule: every `seconds` seconds."""
+    def next_run(after):
+        return after + timedelta(seconds=seconds)
+    return next_run
+
+
+class Scheduler:
+    """Runs periodic jobs on a background thread.
+
+    The thread sleeps until the next deadline instead of polling. The time
+    of each job's last run is kept in `state_file`; if a deadline passed
+    while the program was not running, the job runs once at start-up.
+    """
+
+    def __init__(self, state_file="scheduler_state.json"):
+        self.state_file = state_file
+        self.jobs = {}
+        self._wake = threading.Event()
+        self._stopped = False
+        self._sched = sched.scheduler(time.time, self._delay)
+        self._thread = None
+
+    def _delay(self, seconds):
+        # Woken early by add()/stop() so new deadlines are picked up
+        if self._wake.wait(seconds):
+            self._wake.clear()
+
+    def read_state(self):
+        return read_json(self.state_file, {})
+
+    def mark_run(self, name, when):
+        with FileLock.for_path(self.state_file):
+            state = self.read_state()
+            state[name] = when.isoformat()
+            write_json(self.state_file, state)
+
+    def add(self, name, rule, func):
+        """Register `func` to run whenever `rule` (daily_at/every) says so."""
+        self.jobs[name] = (rule, func)
+        now = datetime.now()
+        last_run = self.read_state().get(name)
+        if last_run and rule(datetime.fromisoformat(last_run)) <= now:
+            self._enter(name, now)  # missed while we were down: catch up once
+        else:
+            self._enter(name, rule(now))
+        self._wake.set()
+
+    def _enter(self, name, when):
+        self._sched.enterabs(when.timestamp(), 0, self._run, (name, when))
+
+    def _run(self, name, deadline):
+        rule, func = self.jobs[name]
+        try:
+            func()
+        except Exception as e:
+            print(f"[scheduler] Job '{name}' failed: {e}")
+        now = datetime.now()
+        self.mark_run(name, now)
+        # Next deadline strictly after the one just served, never in the past
+        self._enter(name, rule(max(deadline, now)))
+
+    def _loop(self):
+        while not self._stopped:
+            self._sched.run()
+            if not self._stopped:
+                self._delay(None)  # queue empty: wait for add()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+        for event in list(self._sched.queue):
+            self._sched.cancel(event)
+        self._wake.set()
+
+
+# Collection files and the field each list is keyed by
+COLLECTION_FILES = [
+    ("users.json", None),
+    ("vehicles.json", "vehicle_id"),
+    ("insurance.json", "Insurance ID"),
+    ("maintenance_data.json", "maintenance_id"),
+]
+
+
+def migrate_json_to_sqlite(db_path=None):
+    """One-shot import of every JSON collection into the SQLite database."""
+    for path, key_field in COLLECTION_FILES:
+        count = SqliteStore(path, key_field, db_path=db_path).migrate()
+        if count is None:
+            print(f"{path}: already migrated.")
+        else:
+            print(f"{path}: {count} records migrated.")
+
+
+if __name__ == "__main__":
+    migrate_json_to_sqlite()
@@ -1 +1,237 @@
+import re
+from datetime import date
+from types import MappingProxyType
 
+from common_function import ServiceError
+
+# -----------------------------
+# Allowed Values
+# -----------------------------
+# Tuples, so no module can change them at runtime
+GENDERS = ("Male", "Female", "Other")
+POSITIONS = ("Manager", "Owner", "Driver", "Bluecollar")
+MANAGER_POSITIONS = ("Manager", "Owner")
+DRIVER_POSITIONS = ("Driver", "Bluecollar")
+# (min, max) age per position
+POSITION_AGES = MappingProxyType({"Manager": (18, 120), "Owner": (18, 120),
+                                  "Driver": (18, 60), "Bluecollar": (18, 60)})
+INSURANCE_TYPES = ("Third Party", "Comprehensive", "Zero Depreciation")
+MAINTENANCE_TYPES = ("regular", "docker")
+MAINTENANCE_STATUSES = ("ok", "not ok")
+INCIDENT_TYPES = ("breakdown", "accident", "violation")
+SEVERITIES = ("low", "medium", "high")
+
+# -----------------------------
+# Patterns
+# -----------------------------
+# Compiled once; callers use fullmatch, so no anchors are needed
+NAME = re.compile(r"[A-Za-z ]{1,50}")
+EMAIL = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+MOBILE = re.compile(r"[6-9]\d{9}")
+VEHICLE_NUMBER = re.compile(r"[A-Z]{2}\d{2}[A-Z]{2}\d{4}")
+ENGINE_NUMBER = re.compile(r"[A-Z]\d{3}[A-Z]{4}\d{5}")
+CHASSIS_NUMBER = re.compile(r"[A-HJ-NPR-Z0-9]{17}")  # VIN: no I, O or Q
+DMY_DATE = re.compile(r"(\d{1,2})-(\d{1,2})-(\d{4})")
+ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+PASSWORD_CHECKS = (
+    (re.compile(r"[A-Z]"), "Password must contain an uppercase letter."),
+    (re.compile(r"[a-z]"), "Password must contain a lowercase letter."),
+    (re.compile(r"\d"), "Password must contain a digit."),
+    (re.compile(r"[!@#$%^&*(),.?\":{}|<>]"), "Password must contain a special character."),
+)
+
+
+def password_problem(password):
+    """First rule `password` breaks, or None."""
+    if len(password) < 8:
+        return "Password must be at least 8 characters long."
+    for pattern, message in PASSWORD_CHECKS:
+        if not pattern.search(password):
+            return message
+    return None
+
+
+def parse_dmy(text):
+    """date for "DD-MM-YYYY", or None."""
+    m = DMY_DATE.fullmatch(text)
+    if not m:
+        return None
+    day, month, year = map(int, m.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_iso(text):
+    """date for "YYYY-MM-DD", or None."""
+    m = ISO_DATE.fullmatch(text)
+    if not m:
+        return None
+    try:
+        return date(*map(int, m.groups()))
+    except ValueError:
+        return None
+
+
+def age_on(born, today):
+    return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+
+# -----------------------------
+# Validation Engine
+# -----------------------------
+class Rule:
+    """How to clean and check one field.
+
+    The value is turned into text, stripped (unless `strip` is False) and
+    passed through `normalize` (e.g. str.upper). It must then fullmatch
+    `pattern`, be one of `choices` and/or pass `test`, which returns a
+    problem message (or just True) when the value is bad.
+    """
+    __slots__ = ("field", "message", "normalize", "match", "choices", "test", "required", "strip")
+
+    def __init__(self, field, message, pattern=None, choices=None, normalize=None, test=None,
+                 required=True, strip=True):
+        self.field = field
+        self.message = message
+        self.normalize = normalize
+        self.match = pattern.fullmatch if pattern is not None else None
+        self.choices = frozenset(choices) if choices is not None else None
+        self.test = test
+        self.required = required
+        self.strip = strip
+
+    def check(self, value):
+        """(cleaned value, problem message or None)."""
+        value = "" if value is None else str(value)
+        if self.strip:
+            value = value.strip()
+        if not value:
+            return value, (f"{self.field} is required." if self.required else None)
+        if self.normalize is not None:
+            value = self.normalize(value)
+        if self.match is not None and self.match(value) is None:
+            return value, self.message
+        if self.choices is not None and value not in self.choices:
+            return value, self.message
+        if self.test is not None:
+            problem = self.test(value)
+            if problem:
+                return value, problem if isinstance(problem, str) else self.message
+        return value, None
+
+    def clean(self, value):
+        """Cleaned value, or ServiceError("invalid") naming the field."""
+        value, problem = self.check(value)
+        if problem:
+            raise ServiceError("invalid", problem, self.field)
+        return value
+
+
+class Validator:
+    """A set of Rules applied to whole records, one at a time or in bulk.
+
+    `row_checks` are functions of the cleaned record that return
+    (field, message) for cross-field problems, or None.
+    """
+
+    def __init__(self, *rules, row_checks=()):
+        self.rules = {rule.field: rule for rule in rules}
+        self.row_checks = row_checks
+
+    def __getitem__(self, field):
+        return self.rules[field]
+
+    def validate(self, row):
+        """(cleaned record, {field: message}); fields without a rule pass through."""
+        clean, errors = dict(row), {}
+        for field, rule in self.rules.items():
+            value, problem = rule.check(row.get(field))
+            clean[field] = value
+            if problem:
+                errors[field] = problem
+        if not errors:
+            for row_check in self.row_checks:
+                problem = row_check(clean)
+                if problem:
+                    errors[problem[0]] = problem[1]
+        return clean, errors
+
+    def validate_many(self, rows):
+        """Check every record; returns (valid, errors).
+
+        valid is [(position, cleaned record)], errors is
+        [{"row": position, "field": ..., "message": ...}], positions
+        counting from 0 in the order `rows` yielded them.
+        """
+        valid, errors = [], []
+        validate = self.validate
+        for i, row in enumerate(rows):
+            clean, problems = validate(row)
+            if problems:
+                errors.extend({"row": i, "field": f, "message": m} for f, m in problems.items())
+            else:
+                valid.append((i, clean))
+        return valid, errors
+
+
+def group_errors(errors):
+    """{row: [message, ...]} from validate_many() errors."""
+    grouped = {}
+    for error in errors:
+        grouped.setdefault(error["row"], []).append(error["message"])
+    return grouped
+
+
+def dob_problem(text):
+    born = parse_dmy(text)
+    if born is None:
+        return "Invalid date format or date."
+    if age_on(born, date.today()) < 18:
+        return "User must be at least 18 years old."
+    return None
+
+
+def age_for_position(user):
+    low, high = POSITION_AGES[user["position"]]
+    if not low <= age_on(parse_dmy(user["dob"]), date.today()) <= high:
+        group = "Manager/Owner" if user["position"] in MANAGER_POSITIONS else "Driver/Bluecollar"
+        return "dob", f"For {group}, age must be between {low} and {high}."
+    return None
+
+
+USER = Validator(
+    Rule("name", "Invalid name! Use only alphabets and spaces (max 50 chars).", NAME),
+    Rule("mobile", "Invalid mobile number.", MOBILE),
+    Rule("email", "Invalid email format.", EMAIL),
+    Rule("gender", "Invalid gender.", choices=GENDERS, normalize=str.title),
+    Rule("dob", "Invalid date format or date.", test=dob_problem),
+    Rule("position", "Invalid position!", choices=POSITIONS, normalize=str.title),
+    Rule("password", "Invalid password.", test=password_problem, strip=False),
+    row_checks=(age_for_position,),
+)
+
+VEHICLE = Validator(
+    Rule("vehicle_number", "Invalid format! Must match 'MH12AB1234'.", VEHICLE_NUMBER, normalize=str.upper),
+    Rule("engine_number", "Invalid engine number! Must be 13 chars.", ENGINE_NUMBER, normalize=str.upper),
+    Rule("chassis_number", "Invalid chassis number! Must be 17 chars VIN.", CHASSIS_NUMBER, normalize=str.upper),
+)
+
+INSURANCE = Validator(
+    Rule("Insurance Type", f"Insurance Type must be one of {', '.join(INSURANCE_TYPES)}.", choices=INSURANCE_TYPES),
+    Rule("Issue Date", "Invalid date. Please enter a valid date (YYYY-MM-DD).",
+         test=lambda text: parse_iso(text) is None),
+)
+
+MAINTENANCE = Validator(
+    Rule("maintenance_type", "Invalid maintenance type.", choices=MAINTENANCE_TYPES, normalize=str.lower),
+    Rule("last_date_of_maintenance", "Invalid date. Please use YYYY-MM-DD.",
+         test=lambda text: parse_iso(text) is None),
+    Rule("maintenance_status", "Invalid maintenance status.", choices=MAINTENANCE_STATUSES, normalize=str.lower),
+)
+
+INCIDENT = Validator(
+    Rule("incident_type", "Invalid incident type.", choices=INCIDENT_TYPES, normalize=str.lower),
+    Rule("severity", "Invalid severity.", choices=SEVERITIES, normalize=str.lower, required=False),
+)
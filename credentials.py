@@ -0,0 +1,165 @@
+import base64
+import hashlib
+import hmac
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------
+# KDF Settings
+# -----------------------------
+# ("scrypt", n, r, p) or ("pbkdf2_sha256", iterations)
+KDF_PRESETS = {
+    "low": ("scrypt", 2 ** 12, 8, 1),
+    "default": ("scrypt", 2 ** 14, 8, 1),
+    "high": ("scrypt", 2 ** 15, 8, 1),
+    "pbkdf2": ("pbkdf2_sha256", 600000),
+}
+
+
+def parse_params(spec=None):
+    """KDF parameters from a preset name or "scrypt:n:r:p" / "pbkdf2_sha256:iterations".
+
+    Defaults to the TIPPER_KDF environment variable, then the "default" preset.
+    """
+    spec = spec or os.environ.get("TIPPER_KDF", "default")
+    if spec in KDF_PRESETS:
+        return KDF_PRESETS[spec]
+    name, *numbers = spec.split(":")
+    if name not in ("scrypt", "pbkdf2_sha256"):
+        raise ValueError(f"Unknown KDF '{name}'")
+    return (name, *map(int, numbers))
+
+
+def b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def derive(password, salt, params):
+    if params[0] == "scrypt":
+        _, n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024)
+    _, iterations = params
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+# -----------------------------
+# Stored Hash Format
+# -----------------------------
+# scrypt$n$r$p$salt$hash  or  pbkdf2_sha256$iterations$salt$hash
+def hash_password(password, params=None):
+    params = params or parse_params()
+    salt = os.urandom(16)
+    fields = [str(x) for x in params] + [b64(salt), b64(derive(password, salt, params))]
+    return "$".join(fields)
+
+
+def split_hash(stored):
+    """(params, salt, digest) for a stored hash, or None for legacy plaintext."""
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            params = ("scrypt", int(parts[1]), int(parts[2]), int(parts[3]))
+        elif parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            params = ("pbkdf2_sha256", int(parts[1]))
+        else:
+            return None
+        return params, base64.b64decode(parts[-2]), base64.b64decode(parts[-1])
+    except ValueError:
+        return None
+
+
+def check_password(stored, password):
+    """Compare a password with a stored hash (or legacy plaintext) in constant time."""
+    parsed = split_hash(stored)
+    if parsed is None:
+        return hmac.compare_digest(stored.encode(), password.encode())
+    params, salt, digest = parsed
+    return hmac.compare_digest(derive(password, salt, params), digest)
+
+
+# -----------------------------
+# Verifier
+# -----------------------------
+class CredentialVerifier:
+    """Hashes and verifies passwords on a thread pool.
+
+    hashlib releases the GIL while running the KDF, so concurrent logins
+    are verified in parallel instead of queueing behind each other.
+    `verify()` also returns a replacement hash whenever the stored value is
+    plaintext or uses different KDF parameters, so callers can upgrade it.
+    """
+
+    def __init__(self, params=None, workers=None):
+        self.params = params or parse_params()
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4,
+                                       thread_name_prefix="kdf")
+        # Checked for unknown users so they take as long as real ones
+        self._dummy = hash_password("dummy-password", self.params)
+
+    def hash(self, password):
+        return hash_password(password, self.params)
+
+    def needs_rehash(self, stored):
+        parsed = split_hash(stored)
+        return parsed is None or parsed[0] != self.params
+
+    def verify(self, stored, password):
+        """Return (ok, new_hash); new_hash is None unless the stored value should be replaced."""
+        if stored is None:
+            check_password(self._dummy, password)
+            return False, None
+        if not check_password(stored, password):
+            return False, None
+        return True, self.hash(password) if self.needs_rehash(stored) else None
+
+    def submit(self, stored, password):
+        """Run verify() on the pool; returns a Future of (ok, new_hash)."""
+        return self.pool.submit(self.verify, stored, password)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+# -----------------------------
+# Login Latency Benchmark
+# -----------------------------
+def benchmark(presets=("low", "default", "high", "pbkdf2"), logins=64, concurrency=8):
+    """Time `logins` concurrent verifications per preset; returns result dicts."""
+    results = []
+    for name in presets:
+        verifier = CredentialVerifier(KDF_PRESETS[name], workers=concurrency)
+        stored = verifier.hash("Abcdef1!")
+
+        def timed_login(_):
+            start = time.perf_counter()
+            verifier.verify(stored, "Abcdef1!")
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            latencies = sorted(clients.map(timed_login, range(logins)))
+        elapsed = time.perf_counter() - start
+        verifier.close()
+
+        cuts = statistics.quantiles(latencies, n=100)
+        results.append({
+            "kdf": name,
+            "params": list(KDF_PRESETS[name]),
+            "logins": logins,
+            "concurrency": concurrency,
+            "p50_ms": round(cuts[49], 2),
+            "p99_ms": round(cuts[98], 2),
+            "logins_per_sec": round(logins / elapsed, 1),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(f"{'KDF':<10} {'p50 ms':>10} {'p99 ms':>10} {'logins/s':>10}")
+    for r in benchmark(concurrency=concurrency):
+        print(f"{r['kdf']:<10} {r['p50_ms']:>10} {r['p99_ms']:>10} {r['logins_per_sec']:>10}")
@@ -0,0 +1,119 @@
+"""Fleet status report: one row per vehicle with insurance, maintenance and driver.
+
+Usage:
+    python fleet_report.py [out.jsonl|out.txt|-] [--date YYYY-MM-DD] [field=value ...]
+
+Writes a text table (JSON lines for a .jsonl path) to the given file or
+stdout, e.g. `python fleet_report.py - roadworthy=no` lists every vehicle
+that should not be on the road today.
+"""
+import sys
+from datetime import date
+
+from common_function import ServiceError, export_records, filter_pairs, open_store, parse_filters
+from insurance import open_policies
+from maintainance import open_maintenance
+from models import Vehicle
+
+
+class FleetReport:
+    """Hash-joins vehicles, insurance and maintenance on vehicle ID.
+
+    Insurance and maintenance are each read once into a dict holding only
+    the latest policy / record per vehicle; vehicles are then streamed
+    past both, so the whole report is O(V + I + M) and rows can be
+    written out as they are produced.
+    """
+    VEHICLE_FILE = "vehicles.json"
+    INSURANCE_FILE = "insurance.json"
+    MAINTENANCE_FILE = "maintenance_data.json"
+
+    def __init__(self):
+        self.vehicles = open_store(self.VEHICLE_FILE, "vehicle_id", Vehicle)
+        self.insurance = open_policies(self.INSURANCE_FILE)
+        self.maintenance = open_maintenance(self.MAINTENANCE_FILE)
+
+    def latest_policies(self):
+        # Vehicle ID -> policy expiring last; ISO dates compare as strings
+        latest = {}
+        for policy in self.insurance.refresh().values():
+            current = latest.get(policy.vehicle_id)
+            if current is None or (policy.expiry_date or "") > (current.expiry_date or ""):
+                latest[policy.vehicle_id] = policy
+        return latest
+
+    def latest_services(self):
+        # Vehicle ID -> most recent maintenance record; older records may hold lower-case IDs
+        latest = {}
+        for record in self.maintenance.refresh().values():
+            vid = (record.vehicle_id or "").upper()
+            current = latest.get(vid)
+            if current is None or (record.last_date_of_maintenance or "") >= (current.last_date_of_maintenance or ""):
+                latest[vid] = record
+        return latest
+
+    def rows(self, today=None):
+        """Yield (vehicle ID, row dict) for every vehicle, in store order.
+
+        A vehicle is roadworthy when its latest policy is still active and
+        its latest maintenance record is not "not ok".
+        """
+        today = (today or date.today()).isoformat()
+        policies = self.latest_policies()
+        services = self.latest_services()
+        for vid, v in self.vehicles.refresh().items():
+            policy = policies.get(vid)
+            service = services.get(vid.upper())
+            insured = policy is not None and (policy.expiry_date or "") > today
+            serviceable = service is None or service.maintenance_status != "not ok"
+            yield vid, {
+                "vehicle_id": vid,
+                "vehicle_number": v.vehicle_number,
+                "driver_id": v.driver_id,
+                "driver_assigned": v.driver_assigned,
+                "insurance_status": "ACTIVE" if insured else "INACTIVE",
+                "insurance_type": policy.insurance_type if policy else None,
+                "insurance_expiry": policy.expiry_date if policy else None,
+                "maintenance_status": service.maintenance_status if service else None,
+                "maintenance_type": service.maintenance_type if service else None,
+                "last_maintenance": service.last_date_of_maintenance if service else None,
+                "roadworthy": "yes" if insured and serviceable else "no",
+            }
+
+    # Lazily yield (vehicle ID, row) pairs matching field=value filters
+    def iter_report(self, today=None, **filters):
+        return filter_pairs(self.rows(today), filters)
+
+
+COLUMNS = [("Vehicle ID", "vehicle_id", 12), ("Number", "vehicle_number", 12), ("Driver", "driver_assigned", 15),
+           ("Insurance", "insurance_status", 9), ("Expiry", "insurance_expiry", 10),
+           ("Maint.", "maintenance_status", 7), ("Last Service", "last_maintenance", 12),
+           ("Roadworthy", "roadworthy", 10)]
+
+
+def main(args):
+    path = "-"
+    if args and "=" not in args[0] and not args[0].startswith("--"):
+        path, args = args[0], args[1:]
+    today = None
+    if "--date" in args:
+        i = args.index("--date")
+        today = date.fromisoformat(args[i + 1])
+        args = args[:i] + args[i + 2:]
+    try:
+        pairs = FleetReport().iter_report(today, **parse_filters(args))
+    except ServiceError as e:
+        sys.exit(e.message)
+    counts = {"yes": 0, "no": 0}
+
+    def counted():
+        for _, row in pairs:
+            counts[row["roadworthy"]] += 1
+            yield row
+
+    export_records(counted(), path, COLUMNS)
+    print(f"Reported {counts['yes'] + counts['no']} vehicles, {counts['no']} not roadworthy.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
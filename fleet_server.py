@@ -0,0 +1,402 @@
+"""Local HTTP/JSON service for users, vehicles, insurance and maintenance.
+
+Usage:
+    python fleet_server.py [--host 127.0.0.1] [--port 8080]
+    python fleet_server.py load [--url http://127.0.0.1:8080] [--clients 32] [--requests 5000]
+
+The server keeps every collection loaded for its whole life and serves
+many clients at once on one asyncio event loop. It has no authentication,
+so bind it to localhost only.
+
+    GET    /users  /vehicles  /insurance  /maintenance   ?after=&limit=&field=value
+    GET    /<collection>/<id>
+    POST   /<collection>                  JSON body as the service's create call
+    PATCH  /<collection>/<id>             JSON body with the fields to change
+    DELETE /users/<id>  /vehicles/<id>  /maintenance/<id>
+    POST   /login                         {"identifier", "password"}
+    GET    /users/<id>/vehicles  /vehicles/<id>/insurance  /vehicles/<id>/maintenance
+
+Changes are persisted in the background: the stores group-commit them
+every TIPPER_COMMIT_SECONDS and on shutdown. The daily insurance cleanup
+and maintenance due check run while the server is up, and a run missed
+while it was down runs at start-up.
+
+`load` runs a load generator against a running server and reports
+requests/sec and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qsl, urlsplit
+
+from common_function import PAGE_SIZE, Scheduler, ServiceError, daily_at, json_default
+from constant_data import parse_iso
+from insurance import InsuranceService
+from maintainance import MaintenanceManager, MaintenanceService
+from user_management import UserService
+from vehicles import VehicleService
+
+# ServiceError code -> HTTP status
+STATUS = {"invalid": 400, "auth": 401, "not_found": 404, "duplicate": 409, "conflict": 409, "corrupt": 500,
+          "busy": 503}
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+MAX_BODY = 1024 * 1024
+
+
+def fields(body, required=(), optional=()):
+    """The known fields of a JSON body; missing or unknown ones are an "invalid" error."""
+    if not isinstance(body, dict):
+        raise ServiceError("invalid", "Request body must be a JSON object.")
+    missing = [f for f in required if f not in body]
+    unknown = [f for f in body if f not in required and f not in optional]
+    if missing:
+        raise ServiceError("invalid", f"Missing field(s): {', '.join(missing)}.", missing[0])
+    if unknown:
+        raise ServiceError("invalid", f"Unknown field(s): {', '.join(unknown)}.", unknown[0])
+    return body
+
+
+def page(result):
+    items, cursor = result
+    return {"items": items, "next": cursor}
+
+
+# -----------------------------
+# Application
+# -----------------------------
+class FleetApp:
+    """Routes JSON requests to the service layer.
+
+    Service calls run on a single worker thread. The event loop never
+    waits on a disk write or a password hash, and the services, which are
+    not thread-safe, only ever see one caller at a time. A login does only
+    its lookup and hash upgrade there; the loop awaits the KDF on the
+    credential pool, so slow hashes never hold up other requests.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fleet-store")
+        self.users = UserService()
+        self.vehicles = VehicleService()
+        self.insurance = InsuranceService()
+        self.maintenance = MaintenanceService()
+        self.scheduler = Scheduler()
+        self.routes = []
+        for method, pattern, handler in [
+            ("GET", "/health", lambda q: {"ok": True}),
+            ("POST", "/login", None),  # served on the loop by login(); listed for the 405
+            ("GET", "/users", lambda q: page(self.users.page_users(**self.listing(q)))),
+            ("POST", "/users", self.create_user),
+            ("GET", "/users/{id}", lambda q, uid: self.user_view(*self.users.get_user(uid))),
+            ("PATCH", "/users/{id}", self.update_user),
+            ("DELETE", "/users/{id}", self.delete_user),
+            ("GET", "/users/{id}/vehicles", lambda q, uid: self.vehicles.vehicles_for_user(uid, q.get("role"))),
+            ("GET", "/vehicles", lambda q: page(self.vehicles.page_vehicles(**self.listing(q)))),
+            ("POST", "/vehicles", lambda q, body: self.vehicles.create_vehicle(**fields(
+                body, ("vehicle_number", "engine_number", "chassis_number"), ("manager_id", "driver_id", "model")))),
+            ("GET", "/vehicles/{id}", lambda q, vid: self.vehicles.get_vehicle(vid)),
+            ("PATCH", "/vehicles/{id}", lambda q, vid, body: self.vehicles.update_vehicle(vid, **fields(
+                body, optional=("manager_id", "driver_id")))),
+            ("DELETE", "/vehicles/{id}", lambda q, vid: self.vehicles.delete_vehicle(vid)),
+            ("GET", "/vehicles/{id}/insurance", self.insurance_status),
+            ("GET", "/vehicles/{id}/maintenance", lambda q, vid: self.maintenance.vehicle_history(vid)),
+            ("GET", "/insurance", lambda q: page(self.insurance.page_insurance(**self.listing(q)))),
+            ("POST", "/insurance", lambda q, body: self.insurance.create_insurance(**fields(
+                body, ("vehicle_id", "insurance_type", "issue_date")))),
+            ("GET", "/insurance/{id}", lambda q, iid: self.insurance.get_insurance(iid)),
+            ("PATCH", "/insurance/{id}", lambda q, iid, body: self.insurance.update_issue_date(
+                iid, fields(body, ("issue_date",))["issue_date"])),
+            ("GET", "/maintenance", lambda q: page(self.maintenance.page_maintenance(**self.listing(q)))),
+            ("POST", "/maintenance", lambda q, body: self.maintenance.create_maintenance(**fields(
+                body, ("vehicle_id", "maintenance_type", "last_date", "status"), ("problem_description",)))),
+            ("GET", "/maintenance/{id}", lambda q, mid: self.maintenance.get_maintenance(mid)),
+            ("PATCH", "/maintenance/{id}", lambda q, mid, body: self.maintenance.update_maintenance(mid, **fields(
+                body, optional=("maintenance_type", "last_date", "status", "problem_description")))),
+            ("DELETE", "/maintenance/{id}", lambda q, mid: self.maintenance.delete_maintenance(mid)),
+        ]:
+            regex = re.compile(pattern.replace("{id}", "([^/]+)"))
+            self.routes.append((method, regex, handler, method in ("POST", "PATCH")))
+
+    def start_jobs(self):
+        """Run the periodic jobs on the worker thread, like any request."""
+        def on_worker(func):
+            return lambda: self.executor.submit(func).result()
+
+        def cleanup():
+            removed = self.insurance.delete_expired()
+            print(f"[fleet_server] Insurance cleanup removed {len(removed)} expired policies.", file=sys.stderr)
+
+        def due_check():
+            print(f"[fleet_server] {self.maintenance.due_check()}", file=sys.stderr)
+
+        self.scheduler.add("insurance-cleanup", daily_at("00:00"), on_worker(cleanup))
+        self.scheduler.add("maintenance-due", daily_at(MaintenanceManager.DUE_CHECK_AT), on_worker(due_check))
+        self.scheduler.start()
+
+    def listing(self, query):
+        """page_*() arguments from ?after=&limit=&field=value."""
+        query = dict(query)
+        after = query.pop("after", None)
+        try:
+            limit = int(query.pop("limit", PAGE_SIZE))
+        except ValueError:
+            raise ServiceError("invalid", "limit must be a number.", "limit")
+        if limit < 0:
+            raise ServiceError("invalid", "limit must not be negative.", "limit")
+        return dict(query, after=after, limit=min(max(limit, 1), 1000))
+
+    def user_view(self, uid, user):
+        return dict(user_id=uid, **self.users.public_view(user))
+
+    def create_user(self, query, body):
+        uid, user = self.users.create_user(**fields(
+            body, ("name", "mobile", "email", "gender", "dob", "position", "password")))
+        return self.user_view(uid, user)
+
+    def update_user(self, query, uid, body):
+        uid, _ = self.users.get_user(uid)
+        self.users.update_user(uid, **fields(body, optional=("name", "mobile", "email", "gender", "dob", "position")))
+        return self.user_view(*self.users.get_user(uid))
+
+    def delete_user(self, query, uid):
+        uid, _ = self.users.get_user(uid)
+        return self.user_view(uid, self.users.delete_user(uid))
+
+    def insurance_status(self, query, vehicle_id):
+        today = None
+        if "date" in query:
+            today = parse_iso(query["date"])
+            if today is None:
+                raise ServiceError("invalid", "date must be a valid YYYY-MM-DD date.", "date")
+        status, policy = self.insurance.get_status(vehicle_id, today)
+        return {"vehicle_id": vehicle_id, "status": status, "policy": policy}
+
+    def call(self, method, path, query, body):
+        """(status, payload) for one request; runs on the worker thread."""
+        allowed = False
+        for route_method, regex, handler, takes_body in self.routes:
+            match = regex.fullmatch(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                args = [query, *match.groups()]
+                if takes_body:
+                    try:
+                        args.append(json.loads(body or b"{}"))
+                    except ValueError:
+                        raise ServiceError("invalid", "Request body is not valid JSON.")
+                return (201 if method == "POST" else 200), handler(*args)
+            except Exception as e:
+                return self.failure(method, path, e)
+        if allowed:
+            return 405, {"code": "invalid", "message": f"{method} is not supported here."}
+        return 404, {"code": "not_found", "message": f"No such resource: {path}"}
+
+    def failure(self, method, path, error):
+        """(status, payload) for an exception raised while serving a request."""
+        if isinstance(error, ServiceError):
+            return STATUS.get(error.code, 400), error.to_dict()
+        print(f"[fleet_server] {method} {path} failed: {error!r}", file=sys.stderr)
+        return 500, {"code": "error", "message": "Internal error."}
+
+    async def login(self, body):
+        """(status, payload) for POST /login; runs on the event loop."""
+        loop = asyncio.get_running_loop()
+        users = self.users
+        try:
+            try:
+                body = fields(json.loads(body or b"{}"), ("identifier", "password"))
+            except ValueError:
+                raise ServiceError("invalid", "Request body is not valid JSON.")
+            uid, user, future = await loop.run_in_executor(
+                self.executor, users.begin_login, body["identifier"], body["password"])
+            try:
+                ok, new_hash = await asyncio.wait_for(asyncio.wrap_future(future), users.LOGIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise ServiceError("busy", "Login is taking too long. Please try again.")
+            await loop.run_in_executor(self.executor, users.finish_login, uid, ok, new_hash)
+            return 200, self.user_view(uid, user)
+        except Exception as e:
+            return self.failure("POST", "/login", e)
+
+    # -----------------------------
+    # HTTP
+    # -----------------------------
+    async def handle(self, reader, writer):
+        """Serve one keep-alive connection."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ")
+                    headers = {}
+                    for line in header_lines:
+                        if line:
+                            name, _, value = line.partition(":")
+                            headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self.respond(writer, 400, {"code": "invalid", "message": "Malformed request."}, False)
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {"code": "invalid", "message": "Request body too large."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                url = urlsplit(target)
+                method, path = method.upper(), url.path.rstrip("/") or "/"
+                if (method, path) == ("POST", "/login"):
+                    status, payload = await self.login(body)
+                else:
+                    status, payload = await loop.run_in_executor(
+                        self.executor, self.call, method, path, dict(parse_qsl(url.query)), body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, default=json_default).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                + ("" if keep_alive else "Connection: close\r\n") + "\r\n")
+        writer.write(head.encode() + data)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        self.start_jobs()
+        print(f"Fleet service on http://{host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.scheduler.stop()
+        self.executor.shutdown(wait=True)
+
+
+# -----------------------------
+# Load Generator
+# -----------------------------
+async def request(reader, writer, method, path, body=None):
+    """Send one request on a keep-alive connection; returns (status, payload)."""
+    data = b"" if body is None else json.dumps(body).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: fleet\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length:"))
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_load(url, clients, total, write_share, seed=7):
+    """Drive `total` requests over `clients` connections; returns a result dict.
+
+    The mix is vehicle lookups, page listings, insurance status checks and,
+    for `write_share` of requests, new maintenance records.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    reader, writer = await asyncio.open_connection(host, port)
+    _, first = await request(reader, writer, "GET", "/vehicles?limit=1000")
+    writer.close()
+    vehicle_ids = [v["vehicle_id"] for v in first["items"]]
+    if not vehicle_ids:
+        raise SystemExit("The server has no vehicles to load-test against.")
+    rng = random.Random(seed)
+    today = date.today().isoformat()
+    latencies, errors = [], []
+
+    def next_request():
+        vid = rng.choice(vehicle_ids)
+        roll = rng.random()
+        if roll < write_share:
+            return "POST", "/maintenance", {"vehicle_id": vid, "maintenance_type": "regular",
+                                            "last_date": today, "status": "ok"}
+        if roll < write_share + 0.1:
+            return "GET", "/vehicles?limit=20", None
+        if roll < write_share + 0.3:
+            return "GET", f"/vehicles/{vid}/insurance", None
+        return "GET", f"/vehicles/{vid}", None
+
+    async def client(count):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(count):
+                method, path, body = next_request()
+                start = time.perf_counter()
+                status, _ = await request(reader, writer, method, path, body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status >= 400:
+                    errors.append(status)
+        finally:
+            writer.close()
+
+    counts = [total // clients + (i < total % clients) for i in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in counts if n))
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(sorted(latencies), n=100)
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "write_share": write_share,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49], 2),
+        "p90_ms": round(cuts[89], 2),
+        "p99_ms": round(cuts[98], 2),
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "load":
+        parser = argparse.ArgumentParser(description="Load generator for fleet_server.py")
+        parser.add_argument("--url", default="http://127.0.0.1:8080")
+        parser.add_argument("--clients", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--writes", type=float, default=0.1, help="share of requests that write")
+        args = parser.parse_args(argv[1:])
+        print(json.dumps(asyncio.run(run_load(args.url, args.clients, args.requests, args.writes))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+    app = FleetApp()
+    try:
+        asyncio.run(app.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        app.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,474 @@
+import atexit
+import json
+import os
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import groupby
 
+from common_function import (FileLock, ServiceError, TableWriter, export_command, filter_pairs, find_key,
+                             live_pairs, open_store, read_rows, show_pages)
+from constant_data import INCIDENT, INCIDENT_TYPES, SEVERITIES, group_errors
+from models import Incident, Vehicle
+
+
+def segment_name(n):
+    return f"segment-{n:06d}.jsonl"
+
+
+def format_incident_id(segment, line):
+    # The ID is the incident's position in the log, so it needs no counter
+    return f"INC-{segment:04d}-{line:06d}"
+
+
+def parse_time(text, end_of_day=False):
+    """"YYYY-MM-DD HH:MM[:SS]" (or ISO with a T) -> ISO string to the second.
+
+    A bare date means midnight, or 23:59:59 with `end_of_day`.
+    """
+    text = text.strip()
+    try:
+        when = datetime.fromisoformat(text)  # far cheaper than strptime on bulk imports
+    except ValueError:
+        when = None
+    if when is not None and when.tzinfo is None:
+        if end_of_day and len(text) == 10:
+            when = when.replace(hour=23, minute=59, second=59)
+        return when.isoformat(timespec="seconds")
+    raise ServiceError("invalid", "Invalid time. Please use YYYY-MM-DD HH:MM.", "occurred_at")
+
+
+class TimeIndex:
+    """Incident IDs kept sorted by time, for range queries with bisect.
+
+    Incidents mostly arrive in time order, so an insert is usually an
+    append; late arrivals are slotted into place.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.ids = []
+
+    def add(self, when, incident_id):
+        if not self.times or when >= self.times[-1]:
+            self.times.append(when)
+            self.ids.append(incident_id)
+        else:
+            i = bisect_right(self.times, when)
+            self.times.insert(i, when)
+            self.ids.insert(i, incident_id)
+
+    def between(self, start=None, end=None):
+        """IDs with start <= time <= end (ISO strings; None means open)."""
+        lo = 0 if start is None else bisect_left(self.times, start)
+        hi = len(self.times) if end is None else bisect_right(self.times, end)
+        return self.ids[lo:hi]
+
+    def position_after(self, when, incident_id):
+        """Index just past `incident_id`, which is indexed at time `when`."""
+        i = bisect_left(self.times, when)
+        while i < len(self.ids) and self.times[i] == when:
+            i += 1
+            if self.ids[i - 1] == incident_id:
+                break
+        return i
+
+    def __len__(self):
+        return len(self.ids)
+
+
+# -----------------------------
+# Incident Log
+# -----------------------------
+class IncidentLog:
+    """Append-only incident log split into numbered JSONL segments.
+
+    Each incident is one line in `<directory>/segment-NNNNNN.jsonl`; a new
+    segment starts every `segment_records` lines, and older segments are
+    never touched again. Appends take the directory's file lock, first
+    reading any lines other processes appended (`follow()`), so IDs
+    (segment and line number) stay unique across processes. Lines reach
+    the OS on every append, but are only fsynced every `fsync_every`
+    incidents or `fsync_seconds` seconds, and on close.
+    """
+    SEGMENT_RECORDS = 100000
+    FSYNC_EVERY = 200
+    FSYNC_SECONDS = 1.0
+
+    def __init__(self, directory="incidents", segment_records=SEGMENT_RECORDS,
+                 fsync_every=FSYNC_EVERY, fsync_seconds=FSYNC_SECONDS):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        os.makedirs(directory, exist_ok=True)
+        self.lock = FileLock.for_path(os.path.join(directory, "incidents"))
+        self.segment = 1   # segment being read / appended to
+        self.offset = 0    # bytes of it already read
+        self.lines = 0     # complete lines in it so far
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self._fd = None
+        self._fd_segment = None
+
+    def path(self, segment):
+        return os.path.join(self.directory, segment_name(segment))
+
+    def follow(self):
+        """Yield incidents appended since the last call, oldest first."""
+        while True:
+            path = self.path(self.segment)
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                return
+            if size > self.offset:
+                with open(path, "rb") as f:
+                    f.seek(self.offset)
+                    chunk = f.read(size - self.offset)
+                # A line without its newline is still being written (or was
+                # torn by a crash); leave it for the next call
+                end = chunk.rfind(b"\n") + 1
+                for line in chunk[:end].splitlines():
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        raise ServiceError("corrupt", f"{path} line {self.lines + 1} is not valid JSON.")
+                    self.lines += 1
+                    yield Incident.from_dict(data)
+                self.offset += end
+            if not os.path.exists(self.path(self.segment + 1)):
+                return
+            self.segment += 1
+            self.offset = self.lines = 0
+
+    def append(self, make_incidents, count):
+        """Append `count` incidents built by make_incidents(ids) in one write per segment.
+
+        Returns (incidents appended by other processes since the last
+        read, the new incidents), both oldest first.
+        """
+        with self.lock:
+            others = list(self.follow())
+            path = self.path(self.segment)
+            if os.path.exists(path) and os.path.getsize(path) > self.offset:
+                # Under the lock nobody is mid-write, so this is a crash's torn tail
+                os.truncate(path, self.offset)
+            placed, segment, lines = [], self.segment, self.lines
+            for _ in range(count):
+                if lines >= self.segment_records:
+                    segment, lines = segment + 1, 0
+                lines += 1
+                placed.append((segment, format_incident_id(segment, lines)))
+            incidents = make_incidents([incident_id for _, incident_id in placed])
+            for segment, group in groupby(zip(placed, incidents), key=lambda pair: pair[0][0]):
+                self.write(segment, [incident for _, incident in group])
+            return others, incidents
+
+    def write(self, segment, incidents):
+        if segment != self.segment:
+            self.segment, self.offset, self.lines = segment, 0, 0
+        if self._fd_segment != segment:
+            self.close_segment()
+            self._fd = os.open(self.path(segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._fd_segment = segment
+        data = "".join(json.dumps(i.to_dict()) + "\n" for i in incidents).encode()
+        written = 0
+        while written < len(data):
+            written += os.write(self._fd, data[written:])
+        # Our own lines need not be read back by follow()
+        self.offset += len(data)
+        self.lines += len(incidents)
+        self.unsynced += len(incidents)
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def sync(self):
+        if self._fd is not None and self.unsynced:
+            os.fsync(self._fd)
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close_segment(self):
+        if self._fd is not None:
+            self.sync()
+            os.close(self._fd)
+            self._fd = self._fd_segment = None
+
+    def close(self):
+        self.close_segment()
+
+
+class IncidentService:
+    """Non-interactive incident operations; failures raise ServiceError.
+
+    Every incident is held in memory by ID, with two indexes: all incidents
+    sorted by time, and each vehicle's incidents sorted by time. Range
+    queries bisect into those lists instead of scanning the history.
+    Vehicle IDs are checked against the vehicles store, as in maintenance.
+    """
+    VEHICLE_FILE = "vehicles.json"
+    TYPES = INCIDENT_TYPES
+    SEVERITIES = SEVERITIES
+
+    def __init__(self, directory="incidents", **log_options):
+        self.log = IncidentLog(directory, **log_options)
+        self.vehicles = open_store(self.VEHICLE_FILE, "vehicle_id", Vehicle)
+        self.incidents = {}
+        self.by_time = TimeIndex()
+        self.by_vehicle = {}  # vehicle ID -> TimeIndex
+        self.refresh()
+        atexit.register(self.close)
+
+    def index(self, incident):
+        self.incidents[incident.incident_id] = incident
+        self.by_time.add(incident.occurred_at, incident.incident_id)
+        vehicle = self.by_vehicle.get(incident.vehicle_id)
+        if vehicle is None:
+            vehicle = self.by_vehicle[incident.vehicle_id] = TimeIndex()
+        vehicle.add(incident.occurred_at, incident.incident_id)
+
+    # Pick up incidents logged by other processes
+    def refresh(self):
+        for incident in self.log.follow():
+            self.index(incident)
+
+    def close(self):
+        self.log.close()
+
+    # Checks return the cleaned value or raise ServiceError
+    def check_vehicle_id(self, vehicle_id, refresh=True):
+        vehicle_id = vehicle_id.strip().upper()
+        if refresh:
+            self.vehicles.refresh()
+        if find_key(self.vehicles, vehicle_id) is None:
+            raise ServiceError("not_found", "Vehicle ID not found in vehicles.json. Please enter a valid Vehicle ID.", "vehicle_id")
+        return vehicle_id
+
+    def check_type(self, incident_type):
+        return INCIDENT["incident_type"].clean(incident_type)
+
+    def check_severity(self, severity):
+        return INCIDENT["severity"].clean(severity) or "low"
+
+    def check_time(self, occurred_at):
+        if not occurred_at:
+            return datetime.now().isoformat(timespec="seconds")
+        return parse_time(occurred_at)
+
+    def check(self, vehicle_id, incident_type, severity="low", occurred_at=None, description=""):
+        """Cleaned field values for one incident (all but the ID)."""
+        return {
+            "vehicle_id": self.check_vehicle_id(vehicle_id),
+            "incident_type": self.check_type(incident_type),
+            "severity": self.check_severity(severity),
+            "occurred_at": self.check_time(occurred_at),
+            "description": (description or "").strip(),
+        }
+
+    def append(self, checked):
+        def make(ids):
+            return [Incident(incident_id=i, **fields) for i, fields in zip(ids, checked)]
+        others, new = self.log.append(make, len(checked))
+        for incident in others:
+            self.index(incident)
+        for incident in new:
+            self.index(incident)
+        return new
+
+    # Log one incident; occurred_at defaults to now
+    def report_incident(self, vehicle_id, incident_type, severity="low", occurred_at=None, description=""):
+        return self.append([self.check(vehicle_id, incident_type, severity, occurred_at, description)])[0]
+
+    def import_incidents(self, path):
+        """Log incidents from a CSV or JSONL file in a single append.
+
+        Columns: vehicle_id, incident_type, and optional severity,
+        occurred_at and description. Rows with problems are skipped and
+        reported. Returns (new incidents, errors) where errors is a list
+        of (line number, message).
+        """
+        rows = list(read_rows(path))
+        errors = [(line_no, "malformed row") for line_no, row in rows if row is None]
+        rows = [(line_no, row) for line_no, row in rows if row is not None]
+        valid, invalid = INCIDENT.validate_many(row for _, row in rows)
+        problems = group_errors(invalid)
+        self.vehicles.refresh()
+        checked = []
+        for i, clean in valid:
+            try:
+                checked.append({
+                    "vehicle_id": self.check_vehicle_id(str(clean.get("vehicle_id") or ""), refresh=False),
+                    "incident_type": clean["incident_type"],
+                    "severity": clean["severity"] or "low",
+                    "occurred_at": self.check_time(clean.get("occurred_at")),
+                    "description": str(clean.get("description") or "").strip(),
+                })
+            except ServiceError as e:
+                problems.setdefault(i, []).append(e.message)
+        errors += [(rows[i][0], "; ".join(messages)) for i, messages in problems.items()]
+        errors.sort()
+        return (self.append(checked) if checked else []), errors
+
+    def get_incident(self, incident_id):
+        self.refresh()
+        incident = self.incidents.get(incident_id.strip().upper())
+        if not incident:
+            raise ServiceError("not_found", "Incident not found.")
+        return incident
+
+    # Incidents of one vehicle between two times (inclusive), oldest first
+    def vehicle_incidents(self, vehicle_id, start=None, end=None):
+        self.refresh()
+        index = self.by_vehicle.get(vehicle_id.strip().upper())
+        if index is None:
+            return []
+        return [self.incidents[i] for i in index.between(start, end)]
+
+    # All incidents between two times (inclusive), oldest first
+    def incidents_between(self, start=None, end=None):
+        self.refresh()
+        return [self.incidents[i] for i in self.by_time.between(start, end)]
+
+    def recent_incidents(self, minutes=60, now=None):
+        now = now or datetime.now()
+        start = (now - timedelta(minutes=minutes)).isoformat(timespec="seconds")
+        return self.incidents_between(start, now.isoformat(timespec="seconds"))
+
+    # Lazily yield (incident ID, incident) pairs in time order matching field=value filters;
+    # the `after` cursor is found by bisecting on its time
+    def iter_incidents(self, after=None, **filters):
+        self.refresh()
+        start = 0
+        if after is not None:
+            cursor = self.incidents.get(after)
+            if cursor is None:
+                raise ServiceError("invalid", "Unknown incident cursor.", "after")
+            start = self.by_time.position_after(cursor.occurred_at, after)
+        return filter_pairs(live_pairs(self.incidents, self.by_time.ids, start), filters)
+
+
+class IncidentManager:
+    COLUMNS = [("Incident ID", "incident_id", 16), ("Vehicle ID", "vehicle_id", 12),
+               ("Type", "incident_type", 10), ("Occurred At", "occurred_at", 19),
+               ("Severity", "severity", 8), ("Description", "description", 30)]
+
+    def __init__(self, directory="incidents"):
+        self.service = IncidentService(directory)
+
+    def print_incidents(self, incidents, empty):
+        if not incidents:
+            print(empty)
+            return
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        show_pages(incidents, writer)
+        print(writer.rule)
+        print(f"{len(incidents)} incidents")
+
+    # Report a new incident
+    def report_incident(self):
+        service = self.service
+        while True:
+            vehicle_id = input("Enter Vehicle ID: ").strip()
+            try:
+                service.check_vehicle_id(vehicle_id)
+                break
+            except ServiceError as e:
+                print(e.message)
+        try:
+            incident_type = service.check_type(input("Enter Incident Type (breakdown/accident/violation): "))
+            severity = service.check_severity(input("Enter Severity (low/medium/high): "))
+            occurred_at = service.check_time(input("Enter Time (YYYY-MM-DD HH:MM, blank for now): "))
+        except ServiceError as e:
+            print(e.message)
+            return
+        description = input("Enter description: ").strip()
+        incident = service.report_incident(vehicle_id, incident_type, severity, occurred_at, description)
+        print(f"\nGenerated Incident ID: {incident.incident_id}")
+        print("Incident logged successfully.")
+
+    def read_range(self):
+        start = input("From (YYYY-MM-DD [HH:MM], blank for no limit): ").strip()
+        end = input("To (YYYY-MM-DD [HH:MM], blank for no limit): ").strip()
+        try:
+            start = parse_time(start) if start else None
+            end = parse_time(end, end_of_day=True) if end else None
+        except ServiceError as e:
+            print(e.message)
+            return None
+        return start, end
+
+    # Incidents of one vehicle, optionally within a date range
+    def get_vehicle_incidents(self):
+        vehicle_id = input("Enter Vehicle ID: ").strip()
+        window = self.read_range()
+        if window is None:
+            return
+        incidents = self.service.vehicle_incidents(vehicle_id, *window)
+        self.print_incidents(incidents, "No incidents found for this vehicle.")
+
+    def get_recent_incidents(self, minutes=60):
+        incidents = self.service.recent_incidents(minutes)
+        print(f"\nIncidents in the last {minutes} minutes:")
+        self.print_incidents(incidents, "No recent incidents.")
+
+    def get_incidents_between(self):
+        window = self.read_range()
+        if window is None:
+            return
+        self.print_incidents(self.service.incidents_between(*window), "No incidents in this range.")
+
+    def import_incidents_menu(self, path=None):
+        if path is None:
+            path = input("Enter path of CSV/JSONL file to import: ").strip()
+        try:
+            imported, errors = self.service.import_incidents(path)
+        except OSError as e:
+            print(f"Cannot read {path}: {e}")
+            return
+        for line_no, message in errors:
+            print(f"Line {line_no}: {message}")
+        print(f"\nImported {len(imported)} incidents, {len(errors)} rows rejected.")
+
+
+# Main program
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        IncidentManager().import_incidents_menu(sys.argv[2])
+        sys.exit()
+    if len(sys.argv) >= 3 and sys.argv[1] == "export":
+        # python incident.py export <file.jsonl|file.txt|-> [field=value ...]
+        export_command(sys.argv[2:], IncidentService().iter_incidents, IncidentManager.COLUMNS, "incidents")
+        sys.exit()
+    if len(sys.argv) >= 2 and sys.argv[1] == "recent":
+        # python incident.py recent [minutes]
+        IncidentManager().get_recent_incidents(int(sys.argv[2]) if len(sys.argv) > 2 else 60)
+        sys.exit()
+
+    manager = IncidentManager()
+    while True:
+        print("\nIncident Log Menu:")
+        print("1. Report Incident")
+        print("2. Vehicle Incidents")
+        print("3. Incidents in the Last Hour")
+        print("4. Incidents Between Dates")
+        print("5. Import Incidents")
+        print("6. Exit")
+
+        choice = input("Enter your choice: ").strip()
+        if choice == '1':
+            manager.report_incident()
+        elif choice == '2':
+            manager.get_vehicle_incidents()
+        elif choice == '3':
+            manager.get_recent_incidents()
+        elif choice == '4':
+            manager.get_incidents_between()
+        elif choice == '5':
+            manager.import_incidents_menu()
+        elif choice == '6':
+            print("Exiting the program.")
+            break
+        else:
+            print("Invalid choice. Please try again.")
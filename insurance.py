@@ -1,106 +1,434 @@
+import bisect
 import json
-import random
-import time
-from datetime import datetime, timedelta
-
-
-class InsuranceSystem:
+import sys
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # analytics fall back to the sorted expiry index
+    np = None
+
+from common_function import (PAGE_SIZE, IdAllocator, Scheduler, ServiceError, TableWriter, daily_at,
+                             export_command, iter_records, open_sharded, open_store, show_pages, take_page)
+from constant_data import INSURANCE, INSURANCE_TYPES, parse_iso
+from models import InsurancePolicy, Vehicle
+
+
+def expiry_month(policy):
+    """Shard of a policy: its expiry month, "YYYY-MM"."""
+    return (policy.expiry_date or "")[:7] or "undated"
+
+
+def open_policies(path="insurance.json"):
+    return open_sharded(path, "Insurance ID", InsurancePolicy, expiry_month)
+
+
+class VehiclePolicies:
+    """Each vehicle's policies and their expiry dates, kept next to the shard manifest.
+
+    The side store "vehicles" maps insurance ID -> [vehicle id, expiry
+    date]. It is built from every shard once and then kept up to date by
+    InsuranceService's writes. A status check finds the vehicle's latest
+    policy here and reads only the shard holding it. It grows with every
+    policy ever issued, so nothing is read until the first status check
+    or write needs it.
+    """
+    FLAG = "insurance:vehicle-index"
+
+    def __init__(self, store):
+        self.store = store
+        self.by_vehicle = {}  # vehicle id -> {insurance id: expiry date}
+        self._version = None
+        self._ready = False
+
+    def entries(self):
+        store = self.store
+        if not self._ready:
+            with store.lock:
+                entries = store.side_store("vehicles")
+                if not store.get_meta(self.FLAG):
+                    entries.replace_all({iid: [rec.vehicle_id, rec.expiry_date]
+                                         for iid, rec in store.records.items()})
+                    store.set_meta(self.FLAG, True)
+            self._ready = True
+        return store.side_store("vehicles")
+
+    def refresh(self):
+        entries = self.entries()
+        if self._version != entries.version:
+            by_vehicle = {}
+            for iid, (vehicle_id, expiry) in entries.records.items():
+                by_vehicle.setdefault(vehicle_id, {})[iid] = expiry
+            self.by_vehicle = by_vehicle
+            self._version = entries.version
+        return self.by_vehicle
+
+    def latest(self, vehicle_id):
+        """Insurance ID of the vehicle's policy that expires last, or None."""
+        policies = self.refresh().get(vehicle_id)
+        return max(policies, key=policies.get) if policies else None
+
+    def put(self, iid, policy):
+        by_vehicle = self.refresh()
+        entries = self.entries()
+        entries.put(iid, [policy.vehicle_id, policy.expiry_date])
+        # Our own write: patch the map rather than rebuild it
+        by_vehicle.setdefault(policy.vehicle_id, {})[iid] = policy.expiry_date
+        self._version = entries.version
+
+    def delete_many(self, iids):
+        by_vehicle = self.refresh()
+        entries = self.entries()
+        gone = [(iid, entries.records[iid][0]) for iid in iids if iid in entries.records]
+        if not gone:
+            return
+        entries.delete_many([iid for iid, _ in gone])
+        for iid, vehicle_id in gone:
+            policies = by_vehicle.get(vehicle_id, {})
+            policies.pop(iid, None)
+            if not policies:
+                by_vehicle.pop(vehicle_id, None)
+        self._version = entries.version
+
+
+class InsuranceIndex:
+    """Per-vehicle policy map plus policies sorted by expiry date, over every shard.
+
+    Only the analytics fallback without NumPy needs it. Expiry dates are
+    parsed once when a record is indexed. A policy counts as ACTIVE while
+    its expiry date is after today, so the expired ones are always a
+    prefix of `expiries` that a bisect can find.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.by_vehicle = {}   # vehicle id -> {insurance id: expiry date}
+        self.expiries = []     # sorted [(expiry date, insurance id)]
+        self._version = None
+
+    def refresh(self):
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        self.by_vehicle = {}
+        self.expiries = []
+        for iid, rec in self.store.records.items():
+            expiry = date.fromisoformat(rec.expiry_date)
+            self.by_vehicle.setdefault(rec.vehicle_id, {})[iid] = expiry
+            self.expiries.append((expiry, iid))
+        self.expiries.sort()
+        self._version = self.store.version
+
+    def expired_count(self, today):
+        return bisect.bisect_right(self.expiries, today, key=lambda e: e[0])
+
+
+class PolicyArrays:
+    """Column arrays over every policy for vectorized analytics.
+
+    Rebuilt only when the store changes. Each date column is converted to
+    datetime64 in a single call, and types and vehicles become integer codes.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.types = []
+        self.vehicles = None
+        self.type_codes = None
+        self.vehicle_codes = None
+        self.issue = None
+        self.expiry = None
+        self._version = None
+
+    def refresh(self):
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        records = list(self.store.records.values())
+        type_code, vehicle_code = {}, {}
+        self.type_codes = np.fromiter((type_code.setdefault(r.insurance_type, len(type_code)) for r in records),
+                                      dtype=np.int64, count=len(records))
+        self.vehicle_codes = np.fromiter((vehicle_code.setdefault(r.vehicle_id, len(vehicle_code)) for r in records),
+                                         dtype=np.int64, count=len(records))
+        self.types = list(type_code)
+        self.vehicles = np.array(list(vehicle_code), dtype=object)
+        self.issue = np.array([r.issue_date for r in records], dtype="datetime64[D]")
+        self.expiry = np.array([r.expiry_date for r in records], dtype="datetime64[D]")
+        self._version = self.store.version
+
+    def count_by_type(self, mask):
+        counts = np.bincount(self.type_codes[mask], minlength=len(self.types))
+        return dict(zip(self.types, counts.tolist()))
+
+    def summary(self, today, windows):
+        """(active, expired, expiring, renewed, insured vehicles); see InsuranceService.analytics."""
+        self.refresh()
+        today = np.datetime64(today, "D")
+        active = self.expiry > today
+        expiring = {w: self.count_by_type(active & (self.expiry <= today + np.timedelta64(w, "D")))
+                    for w in windows}
+        renewed = {w: self.count_by_type((self.issue <= today) & (self.issue > today - np.timedelta64(w, "D")))
+                   for w in windows}
+        insured = set(self.vehicles[np.unique(self.vehicle_codes[active])].tolist())
+        return self.count_by_type(active), self.count_by_type(~active), expiring, renewed, insured
+
+
+class InsuranceService:
+    """Non-interactive insurance operations; failures raise ServiceError.
+
+    Policies are sharded by expiry month (see open_policies()), and
+    nothing but the shard manifest and the per-vehicle index
+    (VehiclePolicies) is read up front: lookups by ID and status checks
+    read one shard each, a vehicle without policies reads none, and
+    cleanup drops whole expired months.
+    """
     FILE = "insurance.json"
+    VEHICLE_FILE = "vehicles.json"
+    TYPES = INSURANCE_TYPES
+    RENEWAL_WINDOWS = (7, 30, 90)
 
     def __init__(self):
-        try:
-            with open(self.FILE, "r") as f:
-                self.records = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.records = []
+        self.store = open_policies(self.FILE)
+        self.vehicles = open_store(self.VEHICLE_FILE, "vehicle_id", Vehicle, lazy=True)
+        self.ids = IdAllocator(self.store, "insurance", str, start=10000000000)
+        self.index = InsuranceIndex(self.store)
+        self.arrays = PolicyArrays(self.store) if np is not None else None
+        self.policies = VehiclePolicies(self.store)
+
+    # Insurance records keyed by Insurance ID
+    @property
+    def records(self):
+        return self.store.refresh()
+
+    def latest_policy(self, vehicle_id):
+        """(insurance id, policy) of the vehicle's policy that expires last, or (None, None)."""
+        while True:
+            iid = self.policies.latest(vehicle_id)
+            if iid is None:
+                return None, None
+            rec = self.store.records.get(iid)
+            if rec is not None:
+                return iid, rec
+            self.policies.delete_many([iid])  # removed without going through the index
+
+    def vehicle_ids(self):
+        return self.vehicles.refresh().keys()
+
+    # Checks return the cleaned value or raise ServiceError
+    def check_vehicle_id(self, vehicle_id):
+        if vehicle_id not in self.vehicles.refresh():
+            raise ServiceError("not_found", "Invalid Vehicle ID!", "Vehicle ID")
+        return vehicle_id
+
+    def check_type(self, insurance_type):
+        return INSURANCE["Insurance Type"].clean(insurance_type)
+
+    def parse_date(self, text):
+        return parse_iso(INSURANCE["Issue Date"].clean(text))
 
     # -------------------
-    # SAVE DATA
+    # OPERATIONS
     # -------------------
-    def save_data(self):
-        with open(self.FILE, "w") as f:
-            json.dump(self.records, f, indent=4, default=str)
+    def create_insurance(self, vehicle_id, insurance_type, issue_date):
+        """Insure a vehicle for one year from `issue_date` (YYYY-MM-DD)."""
+        vehicle_id = self.check_vehicle_id(vehicle_id)
+        insurance_type = self.check_type(insurance_type)
+        issue = self.parse_date(issue_date)
+        # Expiry date exactly 1 year later
+        expiry_date = issue + timedelta(days=365)
+
+        # Insurance ID: 11-digit numeric
+        insurance_id = self.ids.next_id()
+
+        record = InsurancePolicy(
+            insurance_id=insurance_id,
+            vehicle_id=vehicle_id,
+            insurance_type=insurance_type,
+            issue_date=issue.strftime("%Y-%m-%d"),
+            expiry_date=expiry_date.strftime("%Y-%m-%d"),
+            status="ACTIVE"
+        )
+
+        self.store.put(insurance_id, record)
+        self.policies.put(insurance_id, record)
+        return record
+
+    def get_insurance(self, insurance_id):
+        rec = self.records.get(insurance_id)
+        if not rec:
+            raise ServiceError("not_found", "No record found with this Insurance ID.")
+        return rec
+
+    def list_insurance(self):
+        return list(self.records.values())
+
+    def iter_insurance(self, after=None, **filters):
+        """Lazily yield (insurance id, record) pairs matching `filters`."""
+        return iter_records(self.records, filters, after, self.store.sorted_keys())
+
+    def page_insurance(self, after=None, limit=PAGE_SIZE, **filters):
+        """(records, cursor) for one page; pass the cursor back as `after`."""
+        return take_page(self.iter_insurance(after, **filters), limit)
+
+    def update_issue_date(self, insurance_id, issue_date):
+        """Move the issue date; expiry follows exactly 1 year later."""
+        matched = self.records.get(insurance_id)
+        if not matched:
+            raise ServiceError("not_found", "Invalid Insurance ID.")
+        issue = self.parse_date(issue_date)
+        expiry_date = issue + timedelta(days=365)
+        if matched.issue_date == issue.strftime("%Y-%m-%d") and matched.status == "ACTIVE":
+            return matched  # same date again: nothing to write
+
+        # Moves it to its new expiry month
+        self.store.update(insurance_id, matched, {"issue_date": issue.strftime("%Y-%m-%d"),
+                                                  "expiry_date": expiry_date.strftime("%Y-%m-%d"),
+                                                  "status": "ACTIVE"})
+        self.policies.put(insurance_id, matched)
+        return matched
+
+    def get_status(self, vehicle_id, today=None):
+        """Return ("ACTIVE"/"INACTIVE", policy or None) for a vehicle."""
+        self.store.refresh()
+        insurance_id, rec = self.latest_policy(vehicle_id)
+        if insurance_id is None:
+            return "INACTIVE", None
+        status = "ACTIVE" if rec.expiry_date > (today or date.today()).isoformat() else "INACTIVE"
+        # Only persist when the stored status is actually stale
+        if rec.status != status:
+            self.store.update(insurance_id, rec, {"status": status})
+        return status, rec
+
+    def analytics(self, today=None, windows=RENEWAL_WINDOWS, engine=None):
+        """Expiry buckets and counts per insurance type for the renewal team.
+
+        Returns a dict with active and expired counts per type, the number of
+        active policies expiring within each window (days, cumulative), the
+        number issued within each window, and vehicles with no active policy.
+        Every count dict lists the same types in the same order, zeros
+        included, whichever engine produced them.
+        """
+        today = today or date.today()
+        if engine is None:
+            engine = self.arrays.summary if np is not None else self.summary_from_index
+        active, expired, expiring, renewed, insured = engine(today, windows)
+        types = list(dict.fromkeys([*self.TYPES, *active, *expired]))
+
+        def by_types(counts):
+            return {t: counts.get(t, 0) for t in types}
+
+        return {
+            "today": today.isoformat(),
+            "total": sum(active.values()) + sum(expired.values()),
+            "active": sum(active.values()),
+            "by_type": {t: {"active": active.get(t, 0), "expired": expired.get(t, 0)} for t in types},
+            "expiring": {w: by_types(counts) for w, counts in expiring.items()},
+            "renewed": {w: by_types(counts) for w, counts in renewed.items()},
+            "uninsured_vehicles": sorted(self.vehicle_ids() - insured),
+        }
+
+    def summary_from_index(self, today, windows):
+        # Without NumPy: bisect the expiry-sorted index and count only the slices needed
+        self.index.refresh()
+        records = dict(self.store.records.items())  # one pass over the shards, then plain lookups
+        expiries = self.index.expiries
+        k = self.index.expired_count(today)
+
+        def count(iids):
+            return Counter(records[iid].insurance_type for iid in iids)
+
+        expiring = {}
+        for w in windows:
+            end = bisect.bisect_right(expiries, today + timedelta(days=w), key=lambda e: e[0])
+            expiring[w] = count(iid for _, iid in expiries[k:end])
+        # ISO dates compare correctly as strings, so issue dates are never parsed
+        now = today.isoformat()
+        renewed = {}
+        for w in windows:
+            since = (today - timedelta(days=w)).isoformat()
+            renewed[w] = Counter(r.insurance_type for r in records.values() if since < r.issue_date <= now)
+        insured = {vid for vid, policies in self.index.by_vehicle.items() if max(policies.values()) > today}
+        return (count(iid for _, iid in expiries[k:]), count(iid for _, iid in expiries[:k]),
+                expiring, renewed, insured)
+
+    def delete_expired(self, today=None):
+        """Remove every policy that expired by `today`; returns the removed records."""
+        today = (today or date.today()).isoformat()
+        removed = []
+        for name in self.store.names():
+            if name < today[:7]:
+                # Every policy in an earlier expiry month has expired
+                removed.extend(self.store.drop_shard(name).values())
+            elif name == today[:7]:
+                shard = self.store.shard(name).records
+                expired = [iid for iid, rec in shard.items() if rec.expiry_date <= today]
+                removed.extend(shard[iid] for iid in expired)
+                self.store.delete_many(expired)
+        self.policies.delete_many([rec.insurance_id for rec in removed])
+        return removed
+
+
+class InsuranceSystem:
+    COLUMNS = [("Insurance ID", "Insurance ID", 12), ("Vehicle ID", "Vehicle ID", 12),
+               ("Type", "Insurance Type", 18), ("Issue Date", "Issue Date", 11),
+               ("Expiry Date", "Expiry Date", 11), ("Status", "Status", 8)]
+
+    def __init__(self):
+        self.service = InsuranceService()
+        # Held by menu actions and background jobs so they never interleave
+        self.lock = threading.RLock()
+        self.scheduler = None
 
     # -------------------
     # CREATE INSURANCE
     # -------------------
     def create_insurance(self):
         print("\n--- CREATE INSURANCE ---")
+        service = self.service
 
-        # Load vehicles
-        try:
-            with open("vehicles.json", "r") as f:
-                vehicles = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            vehicles = []
-
-        vehicle_ids = [v.get("vehicle_id") for v in vehicles]
-
-        if not vehicle_ids:
+        if not service.vehicle_ids():
             print("No vehicles found in vehicles.json! Cannot create insurance.")
             return
 
         # Vehicle ID input with validation
         while True:
             vehicle_id = input("Enter Vehicle ID: ").strip()
-            if vehicle_id in vehicle_ids:
+            try:
+                service.check_vehicle_id(vehicle_id)
                 break
-            else:
+            except ServiceError:
                 print("\nInvalid Vehicle ID!")
                 print("Available Vehicle IDs:")
-                for vid in vehicle_ids:
+                for vid in service.vehicle_ids():
                     print(f"  - {vid}")
                 print("Please enter a valid Vehicle ID.\n")
 
         # Insurance type
         print("\nChoose Insurance Type:")
-        print("1. Third Party")
-        print("2. Comprehensive")
-        print("3. Zero Depreciation")
+        for number, name in enumerate(service.TYPES, 1):
+            print(f"{number}. {name}")
         while True:
             choice = input("Enter your choice (1/2/3): ").strip()
-            if choice == "1":
-                insurance_type = "Third Party"
-                break
-            elif choice == "2":
-                insurance_type = "Comprehensive"
-                break
-            elif choice == "3":
-                insurance_type = "Zero Depreciation"
+            if choice in ("1", "2", "3"):
+                insurance_type = service.TYPES[int(choice) - 1]
                 break
             else:
                 print("Invalid choice! Please enter 1, 2, or 3.")
 
         # Issue Date
         while True:
-            issue_date_input = input("Enter Issue Date (YYYY-MM-DD): ").strip()
+            issue_date = input("Enter Issue Date (YYYY-MM-DD): ").strip()
             try:
-                issue_date = datetime.strptime(issue_date_input, "%Y-%m-%d")
+                record = service.create_insurance(vehicle_id, insurance_type, issue_date)
                 break
-            except ValueError as e:
-                print(f"Invalid date: {e}. Please enter a valid date (YYYY-MM-DD).")
-
-        # Expiry date exactly 1 year later
-        expiry_date = issue_date + timedelta(days=365)
-
-        # Insurance ID: 11-digit numeric
-        insurance_id = str(random.randint(10000000000, 99999999999))
-
-        record = {
-            "Insurance ID": insurance_id,
-            "Vehicle ID": vehicle_id,
-            "Insurance Type": insurance_type,
-            "Issue Date": issue_date.strftime("%Y-%m-%d"),
-            "Expiry Date": expiry_date.strftime("%Y-%m-%d"),
-            "Status": "ACTIVE"
-        }
-
-        self.records.append(record)
-        self.save_data()
+            except ServiceError as e:
+                print(e.message)
 
         print("\n Insurance Created Successfully!")
-        print("Insurance ID:", insurance_id)
-        print("Expiry Date:", expiry_date.strftime("%Y-%m-%d"))
+        print("Insurance ID:", record.insurance_id)
+        print("Expiry Date:", record.expiry_date)
 
     # -------------------
     # UPDATE INSURANCE (Issue Date only)
@@ -108,9 +436,8 @@ class InsuranceSystem:
     def update_insurance(self):
         print("\n--- UPDATE INSURANCE ---")
         insurance_id = input("Enter Insurance ID to update: ").strip()
-        matched = next((r for r in self.records if r["Insurance ID"] == insurance_id), None)
 
-        if not matched:
+        if insurance_id not in self.service.records:
             print("Invalid Insurance ID.")
             return
 
@@ -118,20 +445,13 @@ class InsuranceSystem:
         while True:
             new_issue = input("Enter New Issue Date (YYYY-MM-DD): ").strip()
             try:
-                issue_date = datetime.strptime(new_issue, "%Y-%m-%d")
+                matched = self.service.update_issue_date(insurance_id, new_issue)
                 break
-            except ValueError as e:
-                print(f"Invalid date: {e}. Please enter a valid date (YYYY-MM-DD).")
+            except ServiceError as e:
+                print(e.message)
 
-        # Expiry exactly 1 year later
-        expiry_date = issue_date + timedelta(days=365)
-        matched["Issue Date"] = new_issue
-        matched["Expiry Date"] = expiry_date.strftime("%Y-%m-%d")
-        matched["Status"] = "ACTIVE"
-
-        self.save_data()
         print("\n Issue and Expiry Dates Updated Successfully!")
-        print(f"New Expiry Date: {expiry_date.strftime('%Y-%m-%d')}")
+        print(f"New Expiry Date: {matched.expiry_date}")
 
     # -------------------
     # CHECK INSURANCE STATUS
@@ -139,18 +459,11 @@ class InsuranceSystem:
     def insurance_status(self):
         print("\n--- CHECK INSURANCE STATUS ---")
         vehicle_id = input("Enter Vehicle ID: ").strip()
-        found = False
-        for rec in self.records:
-            if rec["Vehicle ID"] == vehicle_id:
-                found = True
-                expiry_date = datetime.strptime(rec["Expiry Date"], "%Y-%m-%d")
-                today = datetime.today()
-                rec["Status"] = "ACTIVE" if expiry_date >= today else "INACTIVE"
-                print(f"Vehicle ID: {vehicle_id} | Insurance Status: {rec['Status']}")
-                self.save_data()
-                return
-        if not found:
+        status, rec = self.service.get_status(vehicle_id)
+        if rec is None:
             print(f"No insurance found for Vehicle ID: {vehicle_id}. Status: INACTIVE")
+            return
+        print(f"Vehicle ID: {vehicle_id} | Insurance Status: {status}")
 
     # -------------------
     # GET INSURANCE BY ID
@@ -158,68 +471,100 @@ class InsuranceSystem:
     def get_insurance(self):
         print("\n--- GET INSURANCE BY ID ---")
         insurance_id = input("Enter Insurance ID: ").strip()
-        rec = next((r for r in self.records if r["Insurance ID"] == insurance_id), None)
-        if rec:
-            print(json.dumps(rec, indent=4))
-        else:
-            print("No record found with this Insurance ID.")
+        try:
+            print(json.dumps(self.service.get_insurance(insurance_id).to_dict(), indent=4))
+        except ServiceError as e:
+            print(e.message)
 
     # -------------------
     # GET INSURANCE LIST
     # -------------------
     def get_insurance_list(self):
         print("\n--- GET INSURANCE LIST ---")
-        if not self.records:
+        total = len(self.service.records)
+        if not total:
             print("No records found.")
             return
-        print(f"Total {len(self.records)} records:")
-        for rec in self.records:
-            print(json.dumps(rec, indent=4))
+        print(f"Total {total} records:")
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        show_pages((rec for _, rec in self.service.iter_insurance()), writer)
+        print(writer.rule)
+
+    # -------------------
+    # RENEWAL ANALYTICS
+    # -------------------
+    def print_analytics(self, today=None):
+        report = self.service.analytics(today)
+        windows = self.service.RENEWAL_WINDOWS
+        print(f"\n--- INSURANCE ANALYTICS ({report['today']}) ---")
+        print(f"Policies: {report['total']} total, {report['active']} active")
+        header = f"{'Type':<18} {'Active':>8} {'Expired':>8}" + "".join(f" {f'<={w}d':>7}" for w in windows)
+        print("-" * len(header))
+        print(header)
+        print("-" * len(header))
+        for t, counts in report["by_type"].items():
+            due = "".join(f" {report['expiring'][w].get(t, 0):>7}" for w in windows)
+            print(f"{t:<18} {counts['active']:>8} {counts['expired']:>8}{due}")
+        print("-" * len(header))
+        print("Issued in the last " + ", ".join(
+            f"{w} days: {sum(report['renewed'][w].values())}" for w in windows))
+        uninsured = report["uninsured_vehicles"]
+        print(f"Vehicles with no active policy: {len(uninsured)}")
+        for vid in uninsured[:PAGE_SIZE]:
+            print(f"  {vid}")
+        if len(uninsured) > PAGE_SIZE:
+            print(f"  ... and {len(uninsured) - PAGE_SIZE} more")
 
     # -------------------
     # AUTO CLEANER: DELETE INACTIVE INSURANCE
     # -------------------
     def check_and_delete_inactive(self):
         print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Checking insurance status...")
-
-        active_records = []
-        deleted_count = 0
-
-        for record in self.records:
-            expiry_date = datetime.strptime(record["Expiry Date"], "%Y-%m-%d")
-            today = datetime.today()
-
-            if expiry_date >= today:
-                record["Status"] = "ACTIVE"
-                active_records.append(record)
-            else:
-                record["Status"] = "INACTIVE"
-                deleted_count += 1
-                print(f" Deleted INACTIVE insurance: {record['Insurance ID']} (Vehicle: {record['Vehicle ID']})")
-
-        self.records = active_records
-        self.save_data()
-        print(f" Cleanup completed — {deleted_count} inactive insurances removed.\n")
+        removed = self.service.delete_expired()
+        for record in removed:
+            print(f" Deleted INACTIVE insurance: {record.insurance_id} (Vehicle: {record.vehicle_id})")
+        print(f" Cleanup completed — {len(removed)} inactive insurances removed.\n")
 
     # -------------------
     # RUN CLEANUP DAILY AT MIDNIGHT
     # -------------------
+    # Started with the menu, so a cleanup missed while it was closed runs at start-up
+    def cleanup_job(self):
+        with self.lock:
+            self.check_and_delete_inactive()
+
+    def register_jobs(self, scheduler):
+        scheduler.add("insurance-cleanup", daily_at("00:00"), self.cleanup_job)
+
+    def start_jobs(self):
+        if self.scheduler is None:
+            self.scheduler = Scheduler()
+            self.register_jobs(self.scheduler)
+            self.scheduler.start()
+
     def run_daily_at_midnight(self):
-        print("Insurance auto-cleaner started. It will check every minute and run cleanup at midnight (00:00).")
-        while True:
-            current_time = datetime.now().strftime("%H:%M")
-            if current_time == "00:00":
-                self.check_and_delete_inactive()
-                time.sleep(61)  # Avoid double runs
-            else:
-                time.sleep(60)
+        if self.scheduler is not None:
+            print("Insurance auto-cleaner is already running. Cleanup runs daily at midnight (00:00).")
+            return
+        self.start_jobs()
+        print("Insurance auto-cleaner started in the background. Cleanup runs daily at midnight (00:00).")
 
 
 # -------------------
 # MAIN MENU
 # -------------------
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "export":
+        # python insurance.py export <file.jsonl|file.txt|-> [field=value ...]
+        export_command(sys.argv[2:], InsuranceService().iter_insurance, InsuranceSystem.COLUMNS, "records")
+        sys.exit()
+    if len(sys.argv) >= 2 and sys.argv[1] == "analytics":
+        # python insurance.py analytics [YYYY-MM-DD]
+        InsuranceSystem().print_analytics(date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None)
+        sys.exit()
+
     system = InsuranceSystem()
+    system.start_jobs()
 
     while True:
         print("\n--- INSURANCE SYSTEM MENU ---")
@@ -229,26 +574,32 @@ if __name__ == "__main__":
         print("4. Get Insurance by ID")
         print("5. Get Insurance List")
         print("6. Run Cleanup Now")
-        print("7. Start Auto-Cleanup at Midnight")
-        print("8. Exit")
+        print("7. Auto-Cleanup at Midnight")
+        print("8. Insurance Analytics")
+        print("9. Exit")
 
         choice = input("Enter your choice: ").strip()
-        if choice == "1":
-            system.create_insurance()
-        elif choice == "2":
-            system.update_insurance()
-        elif choice == "3":
-            system.insurance_status()
-        elif choice == "4":
-            system.get_insurance()
-        elif choice == "5":
-            system.get_insurance_list()
-        elif choice == "6":
-            system.check_and_delete_inactive()
-        elif choice == "7":
-            system.run_daily_at_midnight()
-        elif choice == "8":
-            print("Exiting program... Goodbye!")
-            break
-        else:
-            print("Invalid choice, Try again.")
+        with system.lock:
+            if choice == "1":
+                system.create_insurance()
+            elif choice == "2":
+                system.update_insurance()
+            elif choice == "3":
+                system.insurance_status()
+            elif choice == "4":
+                system.get_insurance()
+            elif choice == "5":
+                system.get_insurance_list()
+            elif choice == "6":
+                system.check_and_delete_inactive()
+            elif choice == "7":
+                system.run_daily_at_midnight()
+            elif choice == "8":
+                system.print_analytics()
+            elif choice == "9":
+                if system.scheduler is not None:
+                    system.scheduler.stop()
+                print("Exiting program... Goodbye!")
+                break
+            else:
+                print("Invalid choice, Try again.")
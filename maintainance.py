@@ -1,73 +1,343 @@
-import json
 import os
-from datetime import datetime
+import sys
+import threading
+import zlib
+from datetime import date, timedelta
 
-class MaintenanceManager:
+try:
+    import numpy as np
+except ImportError:  # the due report falls back to plain Python
+    np = None
+
+from common_function import (PAGE_SIZE, IdAllocator, Scheduler, ServiceError, TableWriter, daily_at,
+                             export_command, find_key, iter_records, open_sharded, open_store, show_pages,
+                             take_page)
+from constant_data import MAINTENANCE, MAINTENANCE_STATUSES, MAINTENANCE_TYPES
+from models import MaintenanceRecord, Vehicle
+
+def format_maintenance_id(n):
+    return f"MNT{n:03d}"
+
+
+# Vehicle IDs are allocated in order, so their prefixes are all alike;
+# a hash of the whole ID spreads them evenly, about 1 in SHARD_COUNT each
+SHARD_COUNT = 256
+SHARD_LAYOUT = f"crc32/{SHARD_COUNT}"  # bump when vehicle_shard() changes; shards are rebuilt on open
+
+
+def vehicle_shard(vehicle_id):
+    """Shard of a vehicle's maintenance records: two hex digits of a hash of its ID."""
+    vehicle_id = (vehicle_id or "").strip().upper()
+    if not vehicle_id:
+        return "none"
+    return f"{zlib.crc32(vehicle_id.encode()) % SHARD_COUNT:02x}"
+
+
+def open_maintenance(path="maintenance_data.json"):
+    return open_sharded(path, "maintenance_id", MaintenanceRecord, lambda r: vehicle_shard(r.vehicle_id),
+                        SHARD_LAYOUT)
+
+
+# -----------------------------
+# Due Report Engine
+# -----------------------------
+# Both engines take the latest record per (vehicle, type), add that type's
+# service interval, and keep each vehicle's most overdue type. They return
+# (rows, not_ok): rows are (vehicle ID, type, last date, next due date, days
+# overdue) for vehicles at most `soon` days from being due, with ISO date
+# strings, and not_ok holds vehicles whose latest record is "not ok".
+def due_numpy(records, intervals, today, soon):
+    records = [r for r in records if r.maintenance_type in intervals and r.last_date_of_maintenance]
+    if not records:
+        return [], set()
+    types = list(intervals)
+    type_code = {t: i for i, t in enumerate(types)}
+    # One column per field; numpy parses every date in a single call
+    raw_ids = [r.vehicle_id or "" for r in records]
+    vehicle_code, canonical = {}, {}
+    for raw in dict.fromkeys(raw_ids):
+        canonical[raw] = vehicle_code.setdefault(raw.upper(), len(vehicle_code))
+    vids = np.fromiter(map(canonical.__getitem__, raw_ids), dtype=np.int64, count=len(records))
+    names = np.array(list(vehicle_code))
+    tcodes = np.fromiter(map(type_code.__getitem__, [r.maintenance_type for r in records]),
+                         dtype=np.int64, count=len(records))
+    dates = np.array([r.last_date_of_maintenance for r in records], dtype="datetime64[D]")
+    bad = np.fromiter((r.maintenance_status == "not ok" for r in records), dtype=bool, count=len(records))
+
+    # Latest record per (vehicle, type): sort by group then date, keep each group's last row
+    group = vids * len(types) + tcodes
+    order = np.lexsort((dates, group))
+    group = group[order]
+    latest = order[np.append(group[1:] != group[:-1], True)]
+
+    interval = np.array([intervals[t] for t in types], dtype="timedelta64[D]")
+    next_due = dates[latest] + interval[tcodes[latest]]
+    overdue = (np.datetime64(today, "D") - next_due).astype(int)
+
+    # Most overdue type per vehicle
+    lv = vids[latest]
+    pick = np.lexsort((tcodes[latest], -overdue, lv))
+    pick = pick[np.append(True, lv[pick][1:] != lv[pick][:-1])]
+
+    not_ok = set(names[np.unique(lv[bad[latest]])].tolist())
+    pick = pick[overdue[pick] >= -soon]
+    rows = zip(names[lv[pick]].tolist(), [types[t] for t in tcodes[latest][pick].tolist()],
+               dates[latest][pick].astype(str).tolist(), next_due[pick].astype(str).tolist(),
+               overdue[pick].tolist())
+    return list(rows), not_ok
+
+
+def due_python(records, intervals, today, soon):
+    latest = {}
+    for r in records:
+        if r.maintenance_type not in intervals or not r.last_date_of_maintenance:
+            continue
+        key = ((r.vehicle_id or "").upper(), r.maintenance_type)
+        current = latest.get(key)
+        # ISO dates compare correctly as strings, so nothing is parsed here
+        if current is None or r.last_date_of_maintenance >= current.last_date_of_maintenance:
+            latest[key] = r
+    order = list(intervals)
+    urgent, not_ok = {}, set()
+    for (vid, mtype), r in latest.items():
+        try:
+            last = date.fromisoformat(r.last_date_of_maintenance)
+        except ValueError:
+            continue
+        next_due = last + timedelta(days=intervals[mtype])
+        row = (vid, mtype, r.last_date_of_maintenance, next_due.isoformat(), (today - next_due).days)
+        current = urgent.get(vid)
+        if current is None or (row[4], -order.index(mtype)) > (current[4], -order.index(current[1])):
+            urgent[vid] = row
+        if r.maintenance_status == "not ok":
+            not_ok.add(vid)
+    return [row for row in urgent.values() if row[4] >= -soon], not_ok
+
+
+def parse_intervals(spec):
+    """{"regular": 90, ...} from "regular=90,docker=365"."""
+    intervals = {}
+    for part in spec.split(","):
+        mtype, _, days = part.partition("=")
+        intervals[mtype.strip().lower()] = int(days)
+    return intervals
+
+
+class MaintenanceService:
+    """Non-interactive maintenance operations; failures raise ServiceError.
+
+    Records are sharded by a hash of the vehicle ID (see vehicle_shard()) and
+    only the shard manifest is read up front. A vehicle's history comes
+    from its one shard, indexed by vehicle ID in `by_vehicle`. Vehicle IDs
+    are checked against the vehicles store, read on first use and re-read
+    only when vehicles.json changed on disk, so vehicles added by another
+    process are accepted straight away.
+    """
     VEHICLE_FILE = "vehicles.json"
+    TYPES = MAINTENANCE_TYPES
+    STATUSES = MAINTENANCE_STATUSES
+    # Days between services per type; override with TIPPER_SERVICE_INTERVALS="regular=90,docker=365"
+    SERVICE_INTERVALS = {'regular': 90, 'docker': 365}
+    DUE_SOON_DAYS = 14
 
-    def __init__(self, file_path='maintenance_data.json'):
+    def __init__(self, file_path='maintenance_data.json', intervals=None):
         self.file_path = file_path
-        self.data = self.load_data()
-        self.vehicles = self.load_vehicles()
-
-    # Load maintenance data
-    def load_data(self):
-        if not os.path.exists(self.file_path):
-            return []
-        with open(self.file_path, 'r') as file:
-            return json.load(file)
-
-    # Save maintenance data
-    def save_data(self):
-        with open(self.file_path, 'w') as file:
-            json.dump(self.data, file, indent=4)
-
-    # Load vehicles data
-    def load_vehicles(self):
-        if not os.path.exists(self.VEHICLE_FILE):
-            return []
-        with open(self.VEHICLE_FILE, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return []
+        env = os.environ.get("TIPPER_SERVICE_INTERVALS")
+        self.intervals = dict(self.SERVICE_INTERVALS, **(intervals or (parse_intervals(env) if env else {})))
+        self.store = open_maintenance(file_path)
+        self.vehicles = open_store(self.VEHICLE_FILE, "vehicle_id", Vehicle, lazy=True)
+        self.ids = IdAllocator(self.store, "maintenance", format_maintenance_id)
+        self.by_vehicle = {}  # shard name -> (shard version, {vehicle ID: {maintenance ID: record}})
+
+    # Maintenance records keyed by maintenance ID
+    @property
+    def data(self):
+        return self.store.refresh()
+
+    # Per-vehicle index of one shard, rebuilt only when that shard changed
+    def shard_vehicles(self, vehicle_id):
+        name = vehicle_shard(vehicle_id)
+        if name not in self.store.names():
+            return {}
+        shard = self.store.shard(name)
+        version, by_vehicle = self.by_vehicle.get(name, (None, None))
+        if version != shard.version:
+            by_vehicle = {}
+            for mid, record in shard.records.items():
+                # Older records may hold the ID as it was typed
+                by_vehicle.setdefault((record.vehicle_id or "").upper(), {})[mid] = record
+            self.by_vehicle[name] = (shard.version, by_vehicle)
+        return by_vehicle
 
     # Check if vehicle ID exists
     def is_valid_vehicle(self, vehicle_id):
-        for v in self.vehicles:
-            if v.get("vehicle_id", "").upper() == vehicle_id.upper():
-                return True
-        return False
+        self.vehicles.refresh()
+        return find_key(self.vehicles, vehicle_id.strip().upper()) is not None
+
+    # Checks return the cleaned value or raise ServiceError
+    def check_vehicle_id(self, vehicle_id):
+        if not self.is_valid_vehicle(vehicle_id):
+            raise ServiceError("not_found", "Vehicle ID not found in vehicles.json. Please enter a valid Vehicle ID.", "vehicle_id")
+        return vehicle_id.strip().upper()
+
+    def check_type(self, maintenance_type):
+        return MAINTENANCE["maintenance_type"].clean(maintenance_type)
+
+    def check_status(self, status):
+        return MAINTENANCE["maintenance_status"].clean(status)
+
+    def check_date(self, last_date):
+        return MAINTENANCE["last_date_of_maintenance"].clean(last_date)
 
     # Create maintenance record
-    def create_maintenance(self):
-        # Auto-generate Maintenance ID
-        if self.data:
-            last_id = max([int(record["maintenance_id"].replace("MNT", "")) for record in self.data])
-            maintenance_id = f"MNT{last_id + 1:03d}"
-        else:
-            maintenance_id = "MNT001"
+    def create_maintenance(self, vehicle_id, maintenance_type, last_date, status, problem_description=""):
+        vehicle_id = self.check_vehicle_id(vehicle_id)
+        maintenance_type = self.check_type(maintenance_type)
+        last_date = self.check_date(last_date)
+        status = self.check_status(status)
+
+        new_record = MaintenanceRecord(
+            maintenance_id=self.ids.next_id(),
+            vehicle_id=vehicle_id,
+            maintenance_type=maintenance_type,
+            last_date_of_maintenance=last_date,
+            maintenance_status=status,
+            # Problem description only if status is 'not ok'
+            problem_description=problem_description.strip() if status == "not ok" else ""
+        )
+        self.store.put(new_record.maintenance_id, new_record)
+        return new_record
+
+    # Get maintenance details by ID
+    def get_maintenance(self, maintenance_id):
+        record = self.data.get(maintenance_id)
+        if not record:
+            raise ServiceError("not_found", "Maintenance ID not found.")
+        return record
+
+    # Maintenance history of one vehicle, most recent first
+    def vehicle_history(self, vehicle_id):
+        vehicle_id = vehicle_id.strip().upper()
+        records = self.shard_vehicles(vehicle_id).get(vehicle_id, {}).values()
+        return sorted(records, key=lambda r: r.last_date_of_maintenance or "", reverse=True)
+
+    # Overdue, due-soon, "not ok" and never-serviced vehicles as of `today`
+    def due_report(self, today=None, due_soon_days=DUE_SOON_DAYS):
+        today = today or date.today()
+        engine = due_numpy if np is not None else due_python
+        records = list(self.data.values())
+        try:
+            rows, not_ok = engine(records, self.intervals, today, due_soon_days)
+        except ValueError:
+            # A malformed stored date; the plain engine skips it
+            rows, not_ok = due_python(records, self.intervals, today, due_soon_days)
+        rows.sort(key=lambda row: row[4], reverse=True)
+        fields = ("vehicle_id", "maintenance_type", "last_date", "next_due", "days_overdue")
+        rows = [dict(zip(fields, row)) for row in rows]
+        return {
+            "today": today.isoformat(),
+            "overdue": [row for row in rows if row["days_overdue"] > 0],
+            "due_soon": [row for row in rows if row["days_overdue"] <= 0],
+            "not_ok": sorted(not_ok),
+            "never_serviced": self.never_serviced(records),
+        }
+
+    def never_serviced(self, records):
+        # Records hold upper-cased IDs, older vehicles may be keyed lower-case; report the stored keys
+        serviced = {(r.vehicle_id or "").upper() for r in records}
+        return sorted(vid for vid in self.vehicles.refresh() if vid.upper() not in serviced)
+
+    # Scheduled due check: the counts of due_report() as one log line
+    def due_check(self, today=None):
+        report = self.due_report(today)
+        return (f"Maintenance due check ({report['today']}): {len(report['overdue'])} overdue, "
+                f"{len(report['due_soon'])} due soon, {len(report['not_ok'])} not ok.")
+
+    # Get all maintenance records
+    def list_maintenance(self):
+        return list(self.data.values())
+
+    # Lazily yield (maintenance ID, record) pairs matching field=value filters
+    def iter_maintenance(self, after=None, **filters):
+        return iter_records(self.data, filters, after, self.store.sorted_keys())
+
+    # One page of records plus the cursor for the next page (None on the last)
+    def page_maintenance(self, after=None, limit=PAGE_SIZE, **filters):
+        return take_page(self.iter_maintenance(after, **filters), limit)
+
+    # Update maintenance record; None leaves a field unchanged
+    def update_maintenance(self, maintenance_id, maintenance_type=None, last_date=None,
+                           status=None, problem_description=None):
+        record = self.get_maintenance(maintenance_id)
+        changes = {}
+        if maintenance_type is not None:
+            changes['maintenance_type'] = self.check_type(maintenance_type)
+        if last_date is not None:
+            changes['last_date_of_maintenance'] = self.check_date(last_date)
+        if status is not None:
+            changes['maintenance_status'] = self.check_status(status)
+            # Problem description only if status is 'not ok'; 'ok' clears it
+            changes['problem_description'] = (problem_description or "").strip() if changes['maintenance_status'] == "not ok" else ""
+        changes = {field: value for field, value in changes.items() if getattr(record, field) != value}
+        if not changes:
+            return record  # nothing differs, nothing to write
+        self.store.update(maintenance_id, record, changes)
+        return record
+
+    # Delete maintenance record
+    def delete_maintenance(self, maintenance_id):
+        record = self.get_maintenance(maintenance_id)
+        self.store.delete(maintenance_id)
+        return record
+
+
+class MaintenanceManager:
+    COLUMNS = [("Maintenance ID", "maintenance_id", 14), ("Vehicle ID", "vehicle_id", 12),
+               ("Type", "maintenance_type", 8), ("Last Date", "last_date_of_maintenance", 10),
+               ("Status", "maintenance_status", 7), ("Problem", "problem_description", 30)]
+
+    # Local time of the daily due check
+    DUE_CHECK_AT = "06:00"
 
-        print(f"\nGenerated Maintenance ID: {maintenance_id}")
+    def __init__(self, file_path='maintenance_data.json'):
+        self.service = MaintenanceService(file_path)
+        # Held by menu actions and background jobs so they never interleave
+        self.lock = threading.RLock()
+        self.scheduler = None
+
+    # Background jobs; a check missed while no menu was open runs at start-up
+    def due_job(self):
+        with self.lock:
+            print(f"\n[maintenance] {self.service.due_check()}")
+
+    def register_jobs(self, scheduler):
+        scheduler.add("maintenance-due", daily_at(self.DUE_CHECK_AT), self.due_job)
+
+    def start_jobs(self):
+        if self.scheduler is None:
+            self.scheduler = Scheduler()
+            self.register_jobs(self.scheduler)
+            self.scheduler.start()
+
+    # Create maintenance record
+    def create_maintenance(self):
+        service = self.service
 
         # Vehicle ID validation
         while True:
             vehicle_id = input("Enter Vehicle ID: ").strip()
-            if self.is_valid_vehicle(vehicle_id):
+            try:
+                service.check_vehicle_id(vehicle_id)
                 break
-            else:
-                print("Vehicle ID not found in vehicles.json. Please enter a valid Vehicle ID.")
-
-        maintenance_type = input("Enter Maintenance Type (regular/docker): ").lower()
-        if maintenance_type not in ['regular', 'docker']:
-            print("Invalid maintenance type.")
-            return
-
-        last_date = input("Enter Last Maintenance Date (YYYY-MM-DD): ").strip()
+            except ServiceError as e:
+                print(e.message)
 
-        maintenance_status = input("Enter Maintenance Status (ok/not ok): ").lower()
-        if maintenance_status not in ['ok', 'not ok']:
-            print("Invalid maintenance status.")
+        try:
+            maintenance_type = service.check_type(input("Enter Maintenance Type (regular/docker): "))
+            last_date = service.check_date(input("Enter Last Maintenance Date (YYYY-MM-DD): "))
+            maintenance_status = service.check_status(input("Enter Maintenance Status (ok/not ok): "))
+        except ServiceError as e:
+            print(e.message)
             return
 
         # Only ask for problem description if status is 'not ok'
@@ -75,89 +345,121 @@ class MaintenanceManager:
         if maintenance_status == "not ok":
             problem_description = input("Enter problem description: ").strip()
 
-        new_record = {
-            "maintenance_id": maintenance_id,
-            "vehicle_id": vehicle_id,
-            "maintenance_type": maintenance_type,
-            "last_date_of_maintenance": last_date,
-            "maintenance_status": maintenance_status,
-            "problem_description": problem_description
-        }
-
-        self.data.append(new_record)
-        self.save_data()
+        try:
+            record = service.create_maintenance(vehicle_id, maintenance_type, last_date,
+                                                maintenance_status, problem_description)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print(f"\nGenerated Maintenance ID: {record.maintenance_id}")
         print("Maintenance record created successfully.")
 
     # Get maintenance details by ID
     def get_maintenance_details(self):
         maintenance_id = input("Enter Maintenance ID to search: ").strip()
-        found = False
-        for record in self.data:
-            if record["maintenance_id"] == maintenance_id:
-                print("\nMaintenance Record Found:")
-                print(f"  Maintenance ID       : {record['maintenance_id']}")
-                print(f"  Vehicle ID           : {record['vehicle_id']}")
-                print(f"  Maintenance Type     : {record['maintenance_type']}")
-                print(f"  Last Maintenance Date: {record['last_date_of_maintenance']}")
-                print(f"  Maintenance Status   : {record['maintenance_status']}")
-                print(f"  Problem Description  : {record.get('problem_description', 'N/A')}")
-                found = True
-                break
-        if not found:
+        try:
+            record = self.service.get_maintenance(maintenance_id)
+        except ServiceError:
             print("Maintenance record not found.")
+            return
+        print("\nMaintenance Record Found:")
+        print(f"  Maintenance ID       : {record.maintenance_id}")
+        print(f"  Vehicle ID           : {record.vehicle_id}")
+        print(f"  Maintenance Type     : {record.maintenance_type}")
+        print(f"  Last Maintenance Date: {record.last_date_of_maintenance}")
+        print(f"  Maintenance Status   : {record.maintenance_status}")
+        print(f"  Problem Description  : {record.problem_description}")
+
+    # Maintenance history of one vehicle
+    def get_vehicle_history(self):
+        vehicle_id = input("Enter Vehicle ID: ").strip()
+        records = self.service.vehicle_history(vehicle_id)
+        if not records:
+            print("No maintenance records found for this vehicle.")
+            return
+        print(f"\nMaintenance History for {vehicle_id.upper()}:")
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        writer.header()
+        writer.write_all(records)
+        print(writer.rule)
+
+    # Overdue / due-soon report
+    def print_due_report(self, today=None):
+        report = self.service.due_report(today)
+        columns = [("Vehicle ID", "vehicle_id", 12), ("Type", "maintenance_type", 8),
+                   ("Last Date", "last_date", 10), ("Next Due", "next_due", 10), ("Days Overdue", "days_overdue", 12)]
+        print(f"\nMaintenance Due Report ({report['today']})")
+        for title, key in [("Overdue", "overdue"), ("Due Soon", "due_soon")]:
+            print(f"\n{title}: {len(report[key])} vehicles")
+            if report[key]:
+                writer = TableWriter(sys.stdout, columns)
+                show_pages(report[key], writer)
+                print(writer.rule)
+        print(f"\nStatus 'not ok': {len(report['not_ok'])} vehicles")
+        for vid in report['not_ok'][:PAGE_SIZE]:
+            print(f"  {vid}")
+        print(f"Never serviced: {len(report['never_serviced'])} vehicles")
 
     # Get all maintenance records
     def get_maintenance_list(self):
-        if not self.data:
+        if not self.service.data:
             print("No maintenance records found.")
             return
         print("\nAll Maintenance Records:")
-        for record in self.data:
-            print(json.dumps(record, indent=4))
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        show_pages((record for _, record in self.service.iter_maintenance()), writer)
+        print(writer.rule)
 
     # Update maintenance record
     def update_maintenance(self):
         maintenance_id = input("Enter Maintenance ID to update: ").strip()
-        for record in self.data:
-            if record["maintenance_id"] == maintenance_id:
-                print("Leave blank to keep current value.")
-
-                new_type = input(f"New Maintenance Type (current: {record['maintenance_type']}): ").lower().strip()
-                new_date = input(f"New Last Maintenance Date (current: {record['last_date_of_maintenance']}): ").strip()
-                new_status = input(f"New Status (current: {record['maintenance_status']}): ").lower().strip()
-
-                if new_type in ['regular', 'docker']:
-                    record['maintenance_type'] = new_type
-                if new_date:
-                    record['last_date_of_maintenance'] = new_date
-                if new_status in ['ok', 'not ok']:
-                    record['maintenance_status'] = new_status
-                    # Problem description only if status is 'not ok'
-                    if new_status == "not ok":
-                        record['problem_description'] = input("Enter problem description: ").strip()
-                    elif new_status == "ok":
-                        record['problem_description'] = ""  # clear previous description
-
-                self.save_data()
-                print("Maintenance record updated.")
-                return
-        print("Maintenance ID not found.")
+        try:
+            record = self.service.get_maintenance(maintenance_id)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print("Leave blank to keep current value.")
+
+        new_type = input(f"New Maintenance Type (current: {record.maintenance_type}): ").lower().strip()
+        new_date = input(f"New Last Maintenance Date (current: {record.last_date_of_maintenance}): ").strip()
+        new_status = input(f"New Status (current: {record.maintenance_status}): ").lower().strip()
+        problem_description = None
+        if new_status == "not ok":
+            problem_description = input("Enter problem description: ").strip()
+
+        try:
+            self.service.update_maintenance(maintenance_id, new_type or None, new_date or None,
+                                            new_status or None, problem_description)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print("Maintenance record updated.")
 
     # Delete maintenance record
     def delete_maintenance(self):
         maintenance_id = input("Enter Maintenance ID to delete: ").strip()
-        original_len = len(self.data)
-        self.data = [r for r in self.data if r['maintenance_id'] != maintenance_id]
-        if len(self.data) < original_len:
-            self.save_data()
-            print("Record deleted.")
-        else:
-            print("Maintenance ID not found.")
+        try:
+            self.service.delete_maintenance(maintenance_id)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print("Record deleted.")
 
 
 # Main program
 if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "export":
+        # python maintainance.py export <file.jsonl|file.txt|-> [field=value ...]
+        export_command(sys.argv[2:], MaintenanceService().iter_maintenance, MaintenanceManager.COLUMNS, "records")
+        sys.exit()
+    if len(sys.argv) >= 2 and sys.argv[1] == "due":
+        # python maintainance.py due [YYYY-MM-DD]
+        today = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+        MaintenanceManager().print_due_report(today)
+        sys.exit()
+
     manager = MaintenanceManager()
+    manager.start_jobs()
     while True:
         print("\nMaintenance Management Menu:")
         print("1. Create Maintenance")  
@@ -165,22 +467,29 @@ if __name__ == "__main__":
         print("3. Get Maintenance List")
         print("4. Update Maintenance")
         print("5. Delete Maintenance")
-        print("6. Exit")
+        print("6. Vehicle Maintenance History")
+        print("7. Maintenance Due Report")
+        print("8. Exit")
 
         choice = input("Enter your choice: ").strip()
-        if choice == '1':
-            manager.create_maintenance()
-        elif choice == '2':
-            manager.get_maintenance_details()
-        elif choice == '3':
-            manager.get_maintenance_list()
-        elif choice == '4':
-            manager.update_maintenance()
-        elif choice == '5':
-            manager.delete_maintenance()
-        elif choice == '6':
-            print("Exiting the program.")
-            break
-        else:
-            print("Invalid choice. Please try again.")
-
+        with manager.lock:
+            if choice == '1':
+                manager.create_maintenance()
+            elif choice == '2':
+                manager.get_maintenance_details()
+            elif choice == '3':
+                manager.get_maintenance_list()
+            elif choice == '4':
+                manager.update_maintenance()
+            elif choice == '5':
+                manager.delete_maintenance()
+            elif choice == '6':
+                manager.get_vehicle_history()
+            elif choice == '7':
+                manager.print_due_report()
+            elif choice == '8':
+                manager.scheduler.stop()
+                print("Exiting the program.")
+                break
+            else:
+                print("Invalid choice. Please try again.")
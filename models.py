@@ -0,0 +1,155 @@
+import sys
+from dataclasses import dataclass, fields
+
+
+class Record:
+    """Base for the slotted record types kept in the stores.
+
+    Attributes live in __slots__ instead of a per-record dict, so a record
+    costs a fixed-size object rather than a hash table of repeated keys.
+    `KEYS` maps attribute names to their JSON keys where the two differ, and
+    values of the low-cardinality fields in `SHARED` are interned so every
+    record points at one copy. Keys a model does not know are kept in
+    `extra` so they survive a rewrite. No two records in a store may share
+    a value of a field in `UNIQUE`; stores re-check this when they merge
+    in another process's writes.
+    """
+    __slots__ = ()
+    KEYS = {}
+    SHARED = ()
+    UNIQUE = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        record = cls(*[data.get(key, default) for _, key, default in cls._layout])
+        for attr in cls.SHARED:
+            value = getattr(record, attr)
+            if type(value) is str:
+                setattr(record, attr, sys.intern(value))
+        if not cls._attr_of.keys() >= data.keys():
+            record.extra = {k: v for k, v in data.items() if k not in cls._attr_of}
+        return record
+
+    def to_dict(self):
+        data = {key: getattr(self, attr) for attr, key, _ in self._layout}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        """Dict-style read by JSON key, used by filters and table writers."""
+        attr = self._attr_of.get(key)
+        if attr is not None:
+            return getattr(self, attr)
+        return (self.extra or {}).get(key, default)
+
+
+def record(cls):
+    """Make `cls` a slotted dataclass and precompute its JSON layout."""
+    cls = dataclass(slots=True)(cls)
+    # (attribute, json key, default) for every field except `extra`
+    cls._layout = tuple((f.name, cls.KEYS.get(f.name, f.name), f.default)
+                        for f in fields(cls) if f.name != "extra")
+    cls._attr_of = {key: attr for attr, key, _ in cls._layout}
+    return cls
+
+
+# -----------------------------
+# Users
+# -----------------------------
+@record
+class User(Record):
+    SHARED = ("gender", "position")
+    UNIQUE = ("mobile", "email")
+
+    name: str = None
+    mobile: str = None
+    email: str = None
+    gender: str = None
+    dob: str = None
+    age: int = None
+    position: str = None
+    password: str = None
+    extra: dict = None
+
+
+# -----------------------------
+# Vehicles
+# -----------------------------
+DEFAULT_MODEL = "TATA Prima E.28K"
+
+
+@record
+class Vehicle(Record):
+    SHARED = ("manager_name", "manager_id", "driver_assigned", "driver_id", "model")
+    UNIQUE = ("vehicle_number",)
+
+    vehicle_id: str = None
+    vehicle_number: str = "-"
+    engine_number: str = "-"
+    chassis_number: str = "-"
+    # Names are display copies; the IDs are the links (see vehicles.VehicleLinks)
+    manager_name: str = "-"
+    manager_id: str = None
+    driver_assigned: str = "Not Assigned"
+    driver_id: str = None
+    model: str = DEFAULT_MODEL
+    extra: dict = None
+
+
+# -----------------------------
+# Insurance
+# -----------------------------
+@record
+class InsurancePolicy(Record):
+    KEYS = {
+        "insurance_id": "Insurance ID",
+        "vehicle_id": "Vehicle ID",
+        "insurance_type": "Insurance Type",
+        "issue_date": "Issue Date",
+        "expiry_date": "Expiry Date",
+        "status": "Status",
+    }
+    SHARED = ("vehicle_id", "insurance_type", "issue_date", "expiry_date", "status")
+
+    insurance_id: str = None
+    vehicle_id: str = None
+    insurance_type: str = None
+    issue_date: str = None
+    expiry_date: str = None
+    status: str = "ACTIVE"
+    extra: dict = None
+
+
+# -----------------------------
+# Maintenance
+# -----------------------------
+@record
+class MaintenanceRecord(Record):
+    SHARED = ("vehicle_id", "maintenance_type", "last_date_of_maintenance", "maintenance_status")
+
+    maintenance_id: str = None
+    vehicle_id: str = None
+    maintenance_type: str = None
+    last_date_of_maintenance: str = None
+    maintenance_status: str = None
+    problem_description: str = ""
+    extra: dict = None
+
+
+# -----------------------------
+# Incidents
+# -----------------------------
+@record
+class Incident(Record):
+    SHARED = ("vehicle_id", "incident_type", "severity")
+
+    incident_id: str = None
+    vehicle_id: str = None
+    incident_type: str = None
+    occurred_at: str = None  # ISO "YYYY-MM-DDTHH:MM:SS", local time
+    severity: str = "low"
+    description: str = ""
+    extra: dict = None
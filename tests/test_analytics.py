@@ -0,0 +1,33 @@
+"""The NumPy and pure-Python analytics engines agree on the same fleet."""
+import pytest
+
+from benchmark import ANCHOR, FleetGenerator
+from common_function import close_stores
+from insurance import InsuranceService, np
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    FleetGenerator(seed=7).write_files(500)
+    yield InsuranceService()
+    close_stores()
+
+
+@pytest.mark.skipif(np is None, reason="needs NumPy for the vectorized engine")
+def test_engines_agree(service):
+    vectorized = service.analytics(ANCHOR, engine=service.arrays.summary)
+    fallback = service.analytics(ANCHOR, engine=service.summary_from_index)
+    assert vectorized == fallback
+    # Same keys in the same order, zeros included
+    for report in ("expiring", "renewed"):
+        for w in InsuranceService.RENEWAL_WINDOWS:
+            assert list(vectorized[report][w]) == list(fallback[report][w]) == list(vectorized["by_type"])
+
+
+def test_report_shape(service):
+    report = service.analytics(ANCHOR)
+    types = list(report["by_type"])
+    assert types[:len(InsuranceService.TYPES)] == list(InsuranceService.TYPES)
+    assert all(list(report["expiring"][w]) == types for w in InsuranceService.RENEWAL_WINDOWS)
+    assert report["total"] == 500
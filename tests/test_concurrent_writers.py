@@ -0,0 +1,126 @@
+"""Two writers on the same files: merges, conflicts and what reaches disk."""
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from common_function import STORE_BACKENDS, ServiceError, SqliteStore, close_stores
+from models import User, Vehicle
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKENDS = sorted(STORE_BACKENDS)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TIPPER_DB", str(tmp_path / "tipper.db"))
+    monkeypatch.setenv("TIPPER_COMMIT_SECONDS", "60")  # only explicit commits write
+    yield tmp_path
+    close_stores()
+
+
+def user(name, mobile, email):
+    return User(name=name, mobile=mobile, email=email, gender="Female", dob="01-01-1990", age=36,
+                position="Driver", password="x")
+
+
+def writers(backend, *users):
+    """Two independent stores on users.json, both loaded after `users` were written."""
+    store = STORE_BACKENDS[backend]
+    seed = store("users.json", model=User)
+    seed.load()
+    seed.put_many(users)
+    seed.commit()
+    a, b = store("users.json", model=User), store("users.json", model=User)
+    a.load()
+    b.load()
+    return a, b
+
+
+def on_disk(backend, key):
+    fresh = STORE_BACKENDS[backend]("users.json", model=User)
+    return fresh.load()[key]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_changes_to_different_fields_both_persist(workdir, backend):
+    a, b = writers(backend, ("u1", user("Ann", "9876543210", "ann@x.com")))
+    a.update("u1", a.records["u1"], {"name": "Ann A"})
+    b.update("u1", b.records["u1"], {"email": "new@x.com"})
+    a.commit()
+    b.commit()
+    stored = on_disk(backend, "u1")
+    assert (stored.name, stored.email) == ("Ann A", "new@x.com")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_same_field_change_is_a_conflict(workdir, backend):
+    a, b = writers(backend, ("u1", user("Ann", "9876543210", "ann@x.com")))
+    a.update("u1", a.records["u1"], {"name": "Ann A"})
+    b.update("u1", b.records["u1"], {"name": "Ann B"})
+    a.commit()
+    with pytest.raises(ServiceError) as error:
+        b.commit()
+    assert error.value.code == "conflict"
+    assert on_disk(backend, "u1").name == "Ann A"
+    assert b.records["u1"].name == "Ann A"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unique_value_goes_to_the_first_writer(workdir, backend):
+    a, b = writers(backend, ("u1", user("Ann", "9876543210", "ann@x.com")),
+                   ("u2", user("Bina", "9876543211", "bina@x.com")))
+    a.update("u1", a.records["u1"], {"email": "same@x.com"})
+    b.update("u2", b.records["u2"], {"email": "same@x.com"})
+    a.commit()
+    with pytest.raises(ServiceError) as error:
+        b.commit()
+    assert error.value.code == "duplicate"
+    assert on_disk(backend, "u1").email == "same@x.com"
+    assert on_disk(backend, "u2").email == "bina@x.com"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_exit_commits_every_store_after_a_conflict(workdir, backend, monkeypatch):
+    monkeypatch.setenv("TIPPER_STORAGE", backend)
+    writers(backend, ("u1", user("Ann", "9876543210", "ann@x.com")))
+    script = textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {str(ROOT)!r})
+        from common_function import STORE_BACKENDS, open_store
+        from models import User, Vehicle
+        users = open_store("users.json", model=User)
+        users.update("u1", users.records["u1"], {{"name": "Ann A"}})
+        other = STORE_BACKENDS[{backend!r}]("users.json", model=User)  # another writer
+        other.load()
+        other.update("u1", other.records["u1"], {{"name": "Ann B"}})
+        other.commit()
+        open_store("vehicles.json", "vehicle_id", Vehicle).put("VID-000001", Vehicle(vehicle_id="VID-000001"))
+    """)
+    done = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    assert done.returncode == 0
+    assert "Change dropped on exit" in done.stderr
+    assert "Traceback" not in done.stderr
+    assert on_disk(backend, "u1").name == "Ann B"
+    vehicles = STORE_BACKENDS[backend]("vehicles.json", "vehicle_id", Vehicle)
+    assert "VID-000001" in vehicles.load()
+
+
+def test_sqlite_ignores_writes_to_other_tables(workdir):
+    reader = SqliteStore("vehicles.json", "vehicle_id", Vehicle)
+    reader.load()
+    version = reader.version
+    other = SqliteStore("users.json", model=User)
+    other.load()
+    other.put("u1", user("Ann", "9876543210", "ann@x.com"))
+    other.commit()
+    reader.refresh()
+    assert reader.version == version  # not reloaded
+    writer = SqliteStore("vehicles.json", "vehicle_id", Vehicle)
+    writer.load()
+    writer.put("VID-000001", Vehicle(vehicle_id="VID-000001"))
+    writer.commit()
+    assert "VID-000001" in reader.refresh()
@@ -1,301 +1,505 @@
-import json
-import re
 import random
-from datetime import datetime, date
+import sys
+import threading
+from concurrent import futures
+from datetime import date
+
+from common_function import (PAGE_SIZE, ServiceError, TableWriter, export_command, iter_records, open_store,
+                             show_pages, take_page)
+from constant_data import GENDERS, POSITIONS, USER, age_for_position, age_on, parse_dmy
+from credentials import CredentialVerifier
+from models import User
+from vehicles import VehicleService
+
+
+class UserRepository:
+    """In-memory users with hash indexes on user ID, mobile and email."""
+
+    def __init__(self, file="users.json"):
+        self.store = open_store(file, model=User)
+        self.by_mobile = {}
+        self.by_email = {}
+        self._version = None
+        self.refresh()
+
+    @property
+    def users(self):
+        return self.store.records
+
+    def refresh(self):
+        # Rebuild the indexes only if users changed outside this repository
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        self.by_mobile = {}
+        self.by_email = {}
+        for uid, user in self.users.items():
+            self._index(uid, user)
+        self._version = self.store.version
+
+    def _index(self, uid, user):
+        self.by_mobile.setdefault(user.mobile, uid)
+        self.by_email.setdefault(user.email, uid)
+
+    def _unindex(self, uid, user):
+        if self.by_mobile.get(user.mobile) == uid:
+            del self.by_mobile[user.mobile]
+        if self.by_email.get(user.email) == uid:
+            del self.by_email[user.email]
+
+    # Lookups
+    def get(self, uid):
+        return self.users.get(uid)
+
+    def find(self, identifier):
+        """Return (user_id, user) for a user ID or mobile, or (None, None)."""
+        if identifier in self.users:
+            return identifier, self.users[identifier]
+        uid = self.by_mobile.get(identifier)
+        if uid is not None:
+            return uid, self.users[uid]
+        return None, None
+
+    def find_by_email(self, email):
+        uid = self.by_email.get(email)
+        if uid is not None:
+            return uid, self.users[uid]
+        return None, None
+
+    def mobile_taken(self, mobile, exclude=None):
+        uid = self.by_mobile.get(mobile)
+        return uid is not None and uid != exclude
+
+    def email_taken(self, email, exclude=None):
+        uid = self.by_email.get(email)
+        return uid is not None and uid != exclude
+
+    # Mutations keep the indexes in step with the data
+    def add(self, uid, user):
+        self._index(uid, user)
+        self.store.put(uid, user)
+        self._version = self.store.version
+
+    def update(self, uid, **fields):
+        user = self.users[uid]
+        self._unindex(uid, user)
+        self.store.update(uid, user, fields)  # only these fields, if another process changed the user too
+        self._index(uid, user)
+        self._version = self.store.version
+
+    def delete(self, uid):
+        user = self.users[uid]
+        self._unindex(uid, user)
+        self.store.delete(uid)
+        self._version = self.store.version
+
+
+class UserService:
+    """Non-interactive user operations.
+
+    Every method takes plain arguments and returns plain data; invalid input,
+    duplicates, unknown users and failed authentication raise ServiceError.
+    Passwords are stored as KDF hashes; legacy plaintext entries are
+    re-hashed the first time they are verified.
+    """
+    GENDERS = GENDERS
+    POSITIONS = POSITIONS
+    LOGIN_TIMEOUT = 5  # seconds a login may wait for a KDF worker
+
+    def __init__(self, file="users.json", credentials=None):
+        self.repo = UserRepository(file)
+        self.credentials = credentials or CredentialVerifier()
+        self._upgrade_lock = threading.Lock()
+        self._vehicles = None
+
+    # Opened on first use: only renames and deletions need the vehicles
+    def vehicles(self):
+        if self._vehicles is None:
+            self._vehicles = VehicleService()
+        return self._vehicles
+
+    # -----------------------------
+    # Validators
+    # -----------------------------
+    # The rules and messages live in constant_data.USER; only the
+    # duplicate checks need the repository
+    def clean(self, field, value):
+        return USER[field].clean(value)
+
+    def check_name(self, name):
+        return self.clean("name", name)
+
+    def check_mobile(self, mobile, uid=None):
+        mobile = self.clean("mobile", mobile)
+        if self.repo.mobile_taken(mobile, exclude=uid):
+            raise ServiceError("duplicate", "Mobile already registered.", "mobile")
+        return mobile
+
+    def check_email(self, email, uid=None):
+        email = self.clean("email", email)
+        if self.repo.email_taken(email, exclude=uid):
+            raise ServiceError("duplicate", "Email already registered.", "email")
+        return email
+
+    def check_gender(self, gender):
+        return self.clean("gender", gender)
+
+    def check_dob(self, dob):
+        return self.clean("dob", dob)
+
+    def check_position(self, position):
+        return self.clean("position", position)
+
+    def check_password(self, password):
+        return self.clean("password", password)
+
+    def check_row(self, row):
+        """Cleaned user fields from `row`, or ServiceError for the first problem."""
+        clean, errors = USER.validate(row)
+        for field, message in errors.items():
+            raise ServiceError("invalid", message, field)
+        return clean
+
+    # -----------------------------
+    # Operations
+    # -----------------------------
+    def create_user(self, name, mobile, email, gender, dob, position, password):
+        """Register a user and return (user_id, user)."""
+        repo = self.repo
+        repo.refresh()
+        row = self.check_row(dict(name=name, mobile=mobile, email=email, gender=gender, dob=dob,
+                                  position=position, password=password))
+        self.check_mobile(row["mobile"])
+        self.check_email(row["email"])
+        name = row["name"]
+
+        user_id = f"{name.split()[0].lower()}{random.randint(1000,9999)}"
+        while user_id in repo.users:
+            user_id = f"{name.split()[0].lower()}{random.randint(1000,9999)}"
+        user = User(
+            name=name,
+            mobile=row["mobile"],
+            email=row["email"],
+            gender=row["gender"],
+            dob=row["dob"],
+            age=age_on(parse_dmy(row["dob"]), date.today()),
+            position=row["position"],
+            password=self.credentials.hash(password)
+        )
+        repo.add(user_id, user)
+        return user_id, user
+
+    def public_view(self, user):
+        view = user.to_dict()
+        del view["password"]
+        return view
+
+    def get_user(self, identifier):
+        """Find a user by user ID or mobile and return (user_id, user)."""
+        self.repo.refresh()
+        uid, user = self.repo.find(identifier)
+        if user is None:
+            raise ServiceError("not_found", "User not found.")
+        return uid, user
+
+    def list_users(self):
+        self.repo.refresh()
+        return self.repo.users.items()
+
+    def iter_users(self, after=None, **filters):
+        """Lazily yield (user id, public view) pairs; each view carries its user_id."""
+        if "password" in filters:
+            raise ServiceError("invalid", "Users cannot be filtered by password.", "password")
+        self.repo.refresh()
+        pairs = iter_records(self.repo.users, filters, after, self.repo.store.sorted_keys())
+        return ((uid, dict(user_id=uid, **self.public_view(user))) for uid, user in pairs)
+
+    def page_users(self, after=None, limit=PAGE_SIZE, **filters):
+        """(users, cursor) for one page; pass the cursor back as `after`."""
+        return take_page(self.iter_users(after, **filters), limit)
+
+    def update_user(self, uid, **fields):
+        """Update any of name, mobile, email, gender, dob, position.
+
+        All fields are validated before anything is written.
+        """
+        uid, user = self.get_user(uid)
+        changes = {}
+        for field, value in fields.items():
+            if field == "name":
+                changes["name"] = self.check_name(value)
+            elif field == "mobile":
+                changes["mobile"] = self.check_mobile(value, uid)
+            elif field == "email":
+                changes["email"] = self.check_email(value, uid)
+            elif field == "gender":
+                changes["gender"] = self.check_gender(value)
+            elif field == "dob":
+                changes["dob"] = self.check_dob(value)
+                changes["age"] = age_on(parse_dmy(changes["dob"]), date.today())
+            elif field == "position":
+                changes["position"] = self.check_position(value)
+            else:
+                raise ServiceError("invalid", f"Field '{field}' cannot be updated.", field)
+        if "dob" in changes or "position" in changes:
+            problem = age_for_position({"dob": changes.get("dob", user.dob),
+                                        "position": changes.get("position", user.position)})
+            if problem:
+                raise ServiceError("invalid", problem[1], problem[0])
+        # Re-entering the stored value is not a change and costs no write
+        changes = {field: value for field, value in changes.items() if getattr(user, field) != value}
+        if not changes:
+            return user
+        self.repo.update(uid, **changes)
+        # Commit now rather than on the timer: a change dropped as a conflict
+        # must neither reach the vehicles nor be reported as done
+        dropped = None
+        try:
+            self.repo.store.commit()
+        except ServiceError as e:
+            dropped = e
+        stored = self.repo.store.records.get(uid)
+        if "name" in changes and stored is not None and stored.name == changes["name"]:
+            self.vehicles().user_renamed(uid, changes["name"])
+        if dropped:
+            raise dropped
+        return user
+
+    def delete_user(self, uid):
+        uid, user = self.get_user(uid)
+        self.repo.delete(uid)
+        self.vehicles().user_removed(uid)  # unassign them from their vehicles
+        return user
+
+    def upgrade_hash(self, uid, new_hash):
+        # Replaces plaintext or outdated KDF parameters after a successful check
+        with self._upgrade_lock:
+            if uid in self.repo.users:
+                self.repo.update(uid, password=new_hash)
+
+    def verify_password(self, uid, password):
+        user = self.repo.get(uid)
+        ok, new_hash = self.credentials.verify(user.password if user else None, password)
+        if new_hash:
+            self.upgrade_hash(uid, new_hash)
+        return ok
+
+    def authenticate(self, identifier, password, timeout=None):
+        """Return (user_id, user) for valid credentials.
+
+        The KDF runs on the credential worker pool; if no result arrives
+        within `timeout` seconds the login fails with code "busy".
+        """
+        uid, user, future = self.begin_login(identifier, password)
+        try:
+            ok, new_hash = future.result(timeout=timeout or self.LOGIN_TIMEOUT)
+        except futures.TimeoutError:
+            future.cancel()
+            raise ServiceError("busy", "Login is taking too long. Please try again.")
+        self.finish_login(uid, ok, new_hash)
+        return uid, user
+
+    # authenticate() in two halves, for callers that wait on the KDF themselves
+    def begin_login(self, identifier, password):
+        """(user_id, user, Future of (ok, new_hash)); the KDF runs on the pool."""
+        self.repo.refresh()
+        uid, user = self.repo.find(identifier)
+        return uid, user, self.credentials.submit(user.password if user else None, password)
+
+    def finish_login(self, uid, ok, new_hash):
+        if not ok:
+            raise ServiceError("auth", "Invalid credentials.")
+        if new_hash:
+            self.upgrade_hash(uid, new_hash)
+
+    def change_password(self, uid, new_password):
+        uid, user = self.get_user(uid)
+        self.check_password(new_password)
+        self.repo.update(uid, password=self.credentials.hash(new_password))
+
+    def verify_identity(self, mobile, email):
+        """Forgot-password check: mobile and email must belong to the same user."""
+        self.repo.refresh()
+        uid, user = self.repo.find_by_email(email)
+        if user is None or user.mobile != mobile:
+            raise ServiceError("auth", "Verification failed.")
+        return uid
+
+    def reset_password(self, mobile, email, new_password):
+        uid = self.verify_identity(mobile, email)
+        self.change_password(uid, new_password)
+        return uid
 
 
 class UserManagementSystem:
+    COLUMNS = [("User ID", "user_id", 10), ("Name", "name", 20), ("Mobile", "mobile", 10),
+               ("Email", "email", 28), ("Gender", "gender", 6), ("DOB", "dob", 10), ("Position", "position", 10)]
+
     def __init__(self):
         self.file = "users.json"
+        self.service = UserService(self.file)
 
-    def load_users(self):
-        try:
-            with open(self.file, "r") as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
-    def save_users(self, users):
-        with open(self.file, "w") as f:
-            json.dump(users, f, indent=4)
-
-    def validate_name(self, name):
-        return bool(re.match(r"^[A-Za-z ]+$", name)) and len(name) <= 50
-
-    def validate_email(self, email):
-        return bool(re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", email))
-
-    def validate_mobile(self, mobile):
-        return bool(re.match(r"^[6-9]\d{9}$", mobile))
-
-    def validate_password(self, password):
-        if len(password) < 8:
-            print("Password must be at least 8 characters long.")
-            return False
-        if not re.search(r"[A-Z]", password):
-            print("Password must contain an uppercase letter.")
-            return False
-        if not re.search(r"[a-z]", password):
-            print("Password must contain a lowercase letter.")
-            return False
-        if not re.search(r"\d", password):
-            print("Password must contain a digit.")
-            return False
-        if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-            print("Password must contain a special character.")
-            return False
-        return True
-
-    def get_age_from_dob(self, dob):
-        try:
-            dob_date = datetime.strptime(dob, "%d-%m-%Y").date()
-            today = date.today()
-            age = today.year - dob_date.year - ((today.month, today.day) < (dob_date.month, dob_date.day))
-            return age
-        except ValueError:
-            return None
-
-    def verify_password(self, user):
+    def ask(self, label, check):
+        """Prompt until `check` accepts the answer; None if the user types exit."""
+        while True:
+            value = input(label).strip()
+            if value.lower() == "exit":
+                return None
+            try:
+                return check(value)
+            except ServiceError as e:
+                print(e.message)
+
+    def verify_password(self, uid):
         for _ in range(3):
             pwd = input("Enter Password for Verification: ").strip()
-            if pwd == user["password"]:
+            if self.service.verify_password(uid, pwd):
                 return True
             print("Incorrect password.")
         print("Verification failed.")
         return False
 
-    def create_user(self):
-        print("\n=== CREATE USER ===")
-        users = self.load_users()
-
-        while True:
-            name = input("Enter Name: ").strip()
-            if name.lower() == "exit":
-                return
-            if self.validate_name(name):
-                break
-            print("Invalid name! Use only alphabets and spaces (max 50 chars).")
-
+    def ask_new_password(self, label="Create Password: "):
         while True:
-            mobile = input("Enter Mobile (10 digits): ").strip()
-            if mobile.lower() == "exit":
-                return
-            if self.validate_mobile(mobile):
-                if any(u['mobile'] == mobile for u in users.values()):
-                    print("Mobile already registered.")
-                else:
-                    break
-            else:
-                print("Invalid mobile number.")
-
-        while True:
-            email = input("Enter Email: ").strip()
-            if email.lower() == "exit":
-                return
-            if self.validate_email(email):
-                if any(u['email'] == email for u in users.values()):
-                    print("Email already registered.")
-                else:
-                    break
-            else:
-                print("Invalid email format.")
-
-        while True:
-            gender = input("Enter Gender (Male/Female/Other): ").strip().title()
-            if gender.lower() == "exit":
-                return
-            if gender in ["Male", "Female", "Other"]:
-                break
-            print("Invalid gender.")
-
-        while True:
-            dob = input("Enter Date of Birth (DD-MM-YYYY): ").strip()
-            if dob.lower() == "exit":
-                return
-            age = self.get_age_from_dob(dob)
-            if age is None:
-                print("Invalid date format or date.")
-                continue
-            if age < 18:
-                print("User must be at least 18 years old.")
-                continue
-            break
-
-        while True:
-            position = input("Enter Position (Manager/Owner/Driver/Bluecollar): ").strip().title()
-            if position.lower() == "exit":
-                return
-            if position in ["Manager", "Owner", "Driver", "Bluecollar"]:
-                break
-            print("Invalid position!")
-
-        while True:
-            password = input("Create Password: ").strip()
+            password = input(label).strip()
             if password.lower() == "exit":
-                return
-            if not self.validate_password(password):
+                return None
+            problem = USER["password"].check(password)[1]
+            if problem:
+                print(problem)
                 continue
             confirm = input("Confirm Password: ").strip()
             if password != confirm:
                 print("Passwords do not match.")
             else:
-                break
+                return password
+
+    def print_user(self, uid, user):
+        print(f"\nUser ID: {uid}")
+        for k, v in self.service.public_view(user).items():
+            print(f"{k.title()}: {v}")
 
-        # Validate age based on position
-        if position in ["Manager", "Owner"] and not (18 <= age <= 120):
-            print("For Manager/Owner, age must be between 18 and 120.")
+    def create_user(self):
+        print("\n=== CREATE USER ===")
+        service = self.service
+
+        name = self.ask("Enter Name: ", service.check_name)
+        if name is None:
             return
-        elif position in ["Driver", "Bluecollar"] and not (18 <= age <= 60):
-            print("For Driver/Bluecollar, age must be between 18 and 60.")
+        mobile = self.ask("Enter Mobile (10 digits): ", service.check_mobile)
+        if mobile is None:
+            return
+        email = self.ask("Enter Email: ", service.check_email)
+        if email is None:
+            return
+        gender = self.ask("Enter Gender (Male/Female/Other): ", service.check_gender)
+        if gender is None:
+            return
+        dob = self.ask("Enter Date of Birth (DD-MM-YYYY): ", service.check_dob)
+        if dob is None:
+            return
+        position = self.ask("Enter Position (Manager/Owner/Driver/Bluecollar): ", service.check_position)
+        if position is None:
+            return
+        password = self.ask_new_password()
+        if password is None:
             return
 
-        user_id = f"{name.split()[0].lower()}{random.randint(1000,9999)}"
-        users[user_id] = {
-            "name": name,
-            "mobile": mobile,
-            "email": email,
-            "gender": gender,
-            "dob": dob,
-            "age": age,
-            "position": position,
-            "password": password
-        }
-
-        self.save_users(users)
+        try:
+            user_id, _ = service.create_user(name, mobile, email, gender, dob, position, password)
+        except ServiceError as e:
+            print(e.message)
+            return
         print(f"User Registered Successfully! Your User ID: {user_id}")
 
     def get_user_details(self):
-        users = self.load_users()
-        if not users:
+        if not self.service.list_users():
             print("No users found.")
             return
         identifier = input("Enter User ID or Mobile: ").strip()
-        for uid, u in users.items():
-            if uid == identifier or u["mobile"] == identifier:
-                print(f"\nUser ID: {uid}")
-                for k, v in u.items():
-                    if k != "password":
-                        print(f"{k.title()}: {v}")
-                return
-        print("User not found.")
+        try:
+            uid, u = self.service.get_user(identifier)
+        except ServiceError as e:
+            print(e.message)
+            return
+        self.print_user(uid, u)
 
     def get_all_users(self):
-        users = self.load_users()
+        users = self.service.list_users()
         if not users:
             print("No users found.")
             return
-        for uid, u in users.items():
-            print(f"\nUser ID: {uid}")
-            for k, v in u.items():
-                if k != "password":
-                    print(f"{k.title()}: {v}")
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        shown = show_pages((view for _, view in self.service.iter_users()), writer)
+        print(writer.rule)
+        print(f"Shown {shown} of {len(users)} users")
 
     def update_user(self):
         print("\n=== UPDATE USER ===")
-        users = self.load_users()
-        if not users:
+        if not self.service.list_users():
             print("No users found.")
             return
 
         identifier = input("Enter User ID or Mobile to update: ").strip()
-        for uid, user in users.items():
-            if uid == identifier or user["mobile"] == identifier:
-                if not self.verify_password(user):
-                    print("Password verification failed. Cannot update.")
-                    return
-
-                while True:
-                    print("\n1. Name\n2. Mobile\n3. Email\n4. Gender\n5. DOB\n6. Position\n0. Exit Update")
-                    choice = input("Enter field to update: ").strip()
-
-                    if choice == "0":
-                        print("Update session ended.")
-                        break
-
-                    elif choice == "1":
-                        new_name = input("New Name: ").strip()
-                        if self.validate_name(new_name):
-                            user["name"] = new_name
-                            print("Name updated.")
-                        else:
-                            print("Invalid name.")
-
-                    elif choice == "2":
-                        new_mobile = input("New Mobile: ").strip()
-                        if self.validate_mobile(new_mobile):
-                            user["mobile"] = new_mobile
-                            print("Mobile updated.")
-                        else:
-                            print("Invalid mobile.")
-
-                    elif choice == "3":
-                        new_email = input("New Email: ").strip()
-                        if self.validate_email(new_email):
-                            user["email"] = new_email
-                            print("Email updated.")
-                        else:
-                            print("Invalid email format.")
-
-                    elif choice == "4":
-                        new_gender = input("New Gender (Male/Female/Other): ").strip().title()
-                        if new_gender in ["Male", "Female", "Other"]:
-                            user["gender"] = new_gender
-                            print("Gender updated.")
-                        else:
-                            print("Invalid gender.")
-
-                    elif choice == "5":
-                        new_dob = input("New DOB (DD-MM-YYYY): ").strip()
-                        age = self.get_age_from_dob(new_dob)
-                        if age and age >= 18:
-                            user["dob"] = new_dob
-                            user["age"] = age
-                            print("DOB and age updated.")
-                        else:
-                            print("Invalid or underage DOB.")
-
-                    elif choice == "6":
-                        new_pos = input("New Position (Manager/Owner/Driver/Bluecollar): ").strip().title()
-                        if new_pos in ["Manager", "Owner", "Driver", "Bluecollar"]:
-                            user["position"] = new_pos
-                            print("Position updated.")
-                        else:
-                            print("Invalid position.")
-
-                    else:
-                        print("Invalid choice.")
-
-                    self.save_users(users)
-                return
-        print("User not found.")
+        try:
+            uid, user = self.service.get_user(identifier)
+        except ServiceError as e:
+            print(e.message)
+            return
+        if not self.verify_password(uid):
+            print("Password verification failed. Cannot update.")
+            return
+
+        fields = {
+            "1": ("name", "New Name: ", "Name updated."),
+            "2": ("mobile", "New Mobile: ", "Mobile updated."),
+            "3": ("email", "New Email: ", "Email updated."),
+            "4": ("gender", "New Gender (Male/Female/Other): ", "Gender updated."),
+            "5": ("dob", "New DOB (DD-MM-YYYY): ", "DOB and age updated."),
+            "6": ("position", "New Position (Manager/Owner/Driver/Bluecollar): ", "Position updated."),
+        }
+        while True:
+            print("\n1. Name\n2. Mobile\n3. Email\n4. Gender\n5. DOB\n6. Position\n0. Exit Update")
+            choice = input("Enter field to update: ").strip()
+
+            if choice == "0":
+                print("Update session ended.")
+                break
+            if choice not in fields:
+                print("Invalid choice.")
+                continue
+            field, label, done = fields[choice]
+            value = input(label).strip()
+            try:
+                self.service.update_user(uid, **{field: value})
+                print(done)
+            except ServiceError as e:
+                print(e.message)
 
     def delete_user(self):
         print("\n=== DELETE USER ===")
-        users = self.load_users()
-        if not users:
+        if not self.service.list_users():
             print("No users found.")
             return
         identifier = input("Enter User ID or Mobile to delete: ").strip()
-        for uid, u in users.items():
-            if uid == identifier or u["mobile"] == identifier:
-                if not self.verify_password(u):
-                    print("Password verification failed. Cannot delete user.")
-                    return
-                confirm = input(f"Are you sure you want to delete user {u['name']}? (yes/no): ").strip().lower()
-                if confirm == "yes":
-                    del users[uid]
-                    self.save_users(users)
-                    print("User deleted successfully.")
-                    return
-                else:
-                    print("Deletion cancelled.")
-                    return
-        print("User not found.")
+        try:
+            uid, u = self.service.get_user(identifier)
+        except ServiceError as e:
+            print(e.message)
+            return
+        if not self.verify_password(uid):
+            print("Password verification failed. Cannot delete user.")
+            return
+        confirm = input(f"Are you sure you want to delete user {u.name}? (yes/no): ").strip().lower()
+        if confirm == "yes":
+            self.service.delete_user(uid)
+            print("User deleted successfully.")
+        else:
+            print("Deletion cancelled.")
 
     def password_management(self):
         print("\n=== PASSWORD MANAGEMENT ===")
-        users = self.load_users()
-        if not users:
+        if not self.service.list_users():
             print("No users found.")
             return
 
@@ -304,55 +508,47 @@ class UserManagementSystem:
 
         if choice == "1":
             identifier = input("Enter User ID or Mobile: ").strip()
-            for uid, u in users.items():
-                if uid == identifier or u["mobile"] == identifier:
-                    if not self.verify_password(u):
-                        print("Password verification failed.")
-                        return
-                    while True:
-                        new_pwd = input("Enter New Password: ").strip()
-                        if not self.validate_password(new_pwd):
-                            continue
-                        confirm_pwd = input("Confirm Password: ").strip()
-                        if new_pwd == confirm_pwd:
-                            u["password"] = new_pwd
-                            self.save_users(users)
-                            print("Password updated successfully.")
-                            return
-                        print("Passwords do not match.")
-            print("User not found.")
+            try:
+                uid, u = self.service.get_user(identifier)
+            except ServiceError as e:
+                print(e.message)
+                return
+            if not self.verify_password(uid):
+                print("Password verification failed.")
+                return
+            new_pwd = self.ask_new_password("Enter New Password: ")
+            if new_pwd is None:
+                return
+            self.service.change_password(uid, new_pwd)
+            print("Password updated successfully.")
 
         elif choice == "2":
             uid = input("Enter User ID: ").strip()
             mob = input("Enter Mobile: ").strip()
             email = input("Enter Email: ").strip()
-            for u in users.values():
-                if u["email"] == email and u["mobile"] == mob:
-                    while True:
-                        new_pwd = input("Enter New Password: ").strip()
-                        if not self.validate_password(new_pwd):
-                            continue
-                        confirm_pwd = input("Confirm Password: ").strip()
-                        if new_pwd == confirm_pwd:
-                            u["password"] = new_pwd
-                            self.save_users(users)
-                            print("Password reset successfully.")
-                            return
-                        print("Passwords do not match.")
-            print("Verification failed.")
+            try:
+                self.service.verify_identity(mob, email)
+            except ServiceError as e:
+                print(e.message)
+                return
+            new_pwd = self.ask_new_password("Enter New Password: ")
+            if new_pwd is None:
+                return
+            self.service.reset_password(mob, email, new_pwd)
+            print("Password reset successfully.")
 
     def login(self):
-        users = self.load_users()
-        if not users:
+        if not self.service.list_users():
             print("No users found.")
             return
         identifier = input("Enter User ID or Mobile: ").strip()
         pwd = input("Enter Password: ").strip()
-        for uid, u in users.items():
-            if (uid == identifier or u["mobile"] == identifier) and u["password"] == pwd:
-                print(f"Welcome {u['name']}! Login successful.")
-                return
-        print("Invalid credentials.")
+        try:
+            uid, u = self.service.authenticate(identifier, pwd)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print(f"Welcome {u.name}! Login successful.")
 
 
 def main():
@@ -391,4 +587,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) >= 3 and sys.argv[1] == "export":
+        # python user_management.py export <file.jsonl|file.txt|-> [field=value ...]
+        export_command(sys.argv[2:], UserService().iter_users, UserManagementSystem.COLUMNS, "users")
+    else:
+        main()
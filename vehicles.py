@@ -1,273 +1,592 @@
-import json
-import random
-import re
+import sys
+
+from common_function import (PAGE_SIZE, IdAllocator, ServiceError, TableWriter, base36, export_command,
+                             find_key, iter_records, open_store, read_rows, show_pages, take_page)
+from constant_data import CHASSIS_NUMBER, ENGINE_NUMBER, VEHICLE, VEHICLE_NUMBER, group_errors
+from models import DEFAULT_MODEL, User, Vehicle
 
 # -----------------------------
 # User Management
 # -----------------------------
 class UserManagement:
+    """Read-only user directory indexed by role and upper-cased user ID.
+
+    Entries are (user_id, User) pairs pointing at the store's own records,
+    so the directory adds no per-user copies. The indexes are rebuilt only
+    when the users store changes, and the lists handed out are shared
+    views; callers must not modify them.
+    """
     USER_FILE = "users.json"
+    _shared = None
+
+    def __init__(self):
+        self.store = open_store(self.USER_FILE, model=User)
+        self.by_id = {}
+        self.by_role = {}
+        self._version = None
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def refresh(self):
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        by_id, by_role = {}, {}
+        for entry in self.store.records.items():
+            role = (entry[1].position or "").lower()  # map 'position' to 'role'
+            by_id[entry[0].upper()] = entry
+            by_role.setdefault(role, []).append(entry)
+        self.by_id, self.by_role = by_id, by_role
+        self._version = self.store.version
 
     def load_users(self):
-        try:
-            with open(self.USER_FILE, "r") as f:
-                data = json.load(f)
-                users_list = []
-                for uid, details in data.items():
-                    user = details.copy()
-                    user["user_id"] = uid
-                    user["role"] = details.get("position", "").lower()  # map 'position' to 'role'
-                    users_list.append(user)
-                return users_list
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        self.refresh()
+        return list(self.by_id.values())
 
     def list_drivers(self):
-        users = self.load_users()
-        return [{"user_id": u.get("user_id"), "name": u.get("name")}
-                for u in users if u.get("role") == "driver"]
+        self.refresh()
+        return self.by_role.get("driver", [])
 
     def list_managers(self):
-        users = self.load_users()
-        return [{"user_id": u.get("user_id"), "name": u.get("name")}
-                for u in users if u.get("role") == "manager"]
+        self.refresh()
+        return self.by_role.get("manager", [])
 
     def get_user_by_id(self, user_id, role):
-        users = self.load_users()
-        for u in users:
-            if u.get("user_id", "").upper() == user_id.upper() and u.get("role") == role.lower():
-                return u
+        self.refresh()
+        entry = self.by_id.get(user_id.upper())
+        if entry and (entry[1].position or "").lower() == role.lower():
+            return entry
         return None
 
+def user_key(user_id):
+    return (user_id or "").strip().upper()
+
+
+class VehicleLinks:
+    """Reverse index from user ID to the vehicles they manage or drive.
+
+    Rebuilt only when the vehicles store changes under us. After its own
+    writes VehicleService calls `update()` with the vehicles it touched,
+    which re-links just those, so queries, renames and deletions never
+    walk the whole fleet.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.by_manager = {}  # USER ID -> set of vehicle IDs
+        self.by_driver = {}
+        self.links = {}       # vehicle ID -> (manager key, driver key)
+        self._version = None
+
+    def refresh(self):
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        self.by_manager, self.by_driver, self.links = {}, {}, {}
+        for vehicle in self.store.records.values():
+            self.link(vehicle)
+        self._version = self.store.version
+
+    def link(self, vehicle):
+        manager, driver = user_key(vehicle.manager_id), user_key(vehicle.driver_id)
+        if manager:
+            self.by_manager.setdefault(manager, set()).add(vehicle.vehicle_id)
+        if driver:
+            self.by_driver.setdefault(driver, set()).add(vehicle.vehicle_id)
+        self.links[vehicle.vehicle_id] = (manager, driver)
+
+    def unlink(self, vehicle_id):
+        manager, driver = self.links.pop(vehicle_id, ("", ""))
+        for index, key in ((self.by_manager, manager), (self.by_driver, driver)):
+            vehicles = index.get(key)
+            if vehicles is not None:
+                vehicles.discard(vehicle_id)
+                if not vehicles:
+                    del index[key]
+
+    def update(self, vehicle_ids):
+        """Re-link `vehicle_ids` after our own write to the store."""
+        if self._version is None or self.store.version != self._version + 1:
+            # The write also picked up other processes' changes (or compacted)
+            self._version = None
+            self.refresh()
+            return
+        records = self.store.records
+        for vid in vehicle_ids:
+            self.unlink(vid)
+            if vid in records:
+                self.link(records[vid])
+        self._version = self.store.version
+
+    def vehicles_for(self, user_id, role=None):
+        """Vehicles linked to a user; role "manager" or "driver" narrows it."""
+        self.refresh()
+        key = user_key(user_id)
+        vids = set()
+        if role in (None, "manager"):
+            vids |= self.by_manager.get(key, set())
+        if role in (None, "driver"):
+            vids |= self.by_driver.get(key, set())
+        records = self.store.records
+        return [records[vid] for vid in sorted(vids)]
+
+
 # -----------------------------
 # Vehicle Management
 # -----------------------------
-class VehicleManagement:
+def format_vehicle_id(n):
+    return "VID-" + base36(n, 6)
+
+
+class VehicleService:
+    """Non-interactive vehicle operations; failures raise ServiceError."""
     VEHICLE_FILE = "vehicles.json"
+    # 1: every vehicle has an ID; 2: managers are linked by manager_id
+    SCHEMA_VERSION = 2
 
     def __init__(self):
-        self.um = UserManagement()
+        self.um = UserManagement.shared()
+        self.store = open_store(self.VEHICLE_FILE, "vehicle_id", Vehicle)
+        self.ids = IdAllocator(self.store, "vehicle", format_vehicle_id)
+        self.links = VehicleLinks(self.store)
+        self.numbers = set()
+        self._version = None
+        self.migrate_schema()
 
     # -----------------------------
     # Load & Save
     # -----------------------------
     def normalize_vehicles(self, vehicles):
-        updated = False
+        # Missing fields already got the Vehicle defaults on load; only IDs are left
+        missing = [v for v in vehicles if v.vehicle_id is None]
+        for v, vid in zip(missing, self.ids.reserve(len(missing))):
+            v.vehicle_id = vid
+        return bool(missing)
+
+    def link_managers(self, vehicles):
+        """Fill in manager_id from manager_name where exactly one manager has that name.
+
+        Returns the number of vehicles whose manager could not be linked.
+        """
+        ids = {}
+        for uid, user in self.um.list_managers():
+            ids[user.name] = None if user.name in ids else uid  # None: name is ambiguous
+        unlinked = 0
         for v in vehicles:
-            if "vehicle_id" not in v: v["vehicle_id"] = self.generate_vehicle_id(vehicles); updated = True
-            if "vehicle_number" not in v: v["vehicle_number"] = "-"; updated = True
-            if "engine_number" not in v: v["engine_number"] = "-"; updated = True
-            if "chassis_number" not in v: v["chassis_number"] = "-"; updated = True
-            if "manager_name" not in v: v["manager_name"] = "-"; updated = True
-            if "driver_assigned" not in v: v["driver_assigned"] = "Not Assigned"; updated = True
-            if "driver_id" not in v: v["driver_id"] = None; updated = True
-            if "model" not in v: v["model"] = "TATA Prima E.28K"; updated = True
-        return updated
+            if v.manager_id is None and v.manager_name not in ("-", "Not Assigned"):
+                v.manager_id = ids.get(v.manager_name)
+                unlinked += v.manager_id is None
+        return unlinked
+
+    def migrate_schema(self):
+        # Runs once per data file; the stamp keeps later loads read-only
+        version = self.store.get_meta("schema_version", 0)
+        if version >= self.SCHEMA_VERSION:
+            return
+        vehicles = list(self.store.refresh().values())
+        if vehicles:
+            if self.normalize_vehicles(vehicles):
+                print("Some old vehicle records had no ID. New IDs assigned.")
+            if version < 2:
+                unlinked = self.link_managers(vehicles)
+                if unlinked:
+                    print(f"{unlinked} vehicles name a manager that matches no single user. Reassign them to link.")
+            self.save_vehicles(vehicles)  # writes any defaulted fields out once
+        self.store.set_meta("schema_version", self.SCHEMA_VERSION)
+
+    def refresh(self):
+        # Re-parses only when vehicles.json changed since the last read
+        self.store.refresh()
+        if self._version == self.store.version:
+            return
+        self.numbers = {v.vehicle_number for v in self.store.records.values()}
+        self._version = self.store.version
 
     def load_vehicles(self):
-        try:
-            with open(self.VEHICLE_FILE, "r") as f:
-                vehicles = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            vehicles = []
-
-        if self.normalize_vehicles(vehicles):
-            self.save_vehicles(vehicles)
-            print("Some old vehicle records were missing fields. Defaults applied.")
+        self.refresh()
+        return list(self.store.records.values())
 
+    def save_vehicles(self, data):
+        self.store.replace_all({v.vehicle_id: v for v in data})
+
+    def put_vehicle(self, vehicle):
+        self.store.put(vehicle.vehicle_id, vehicle)
+        self._version = self.store.version
+        self.links.update([vehicle.vehicle_id])
+
+    # Vehicles a user manages and/or drives, from the reverse index
+    def vehicles_for_user(self, user_id, role=None):
+        return self.links.vehicles_for(user_id, role)
+
+    def relink(self, user_id, change):
+        """Apply change(as_manager, as_driver) -> {field: value} to a user's vehicles in one write."""
+        key = user_key(user_id)
+        vehicles = self.links.vehicles_for(key)
+        if vehicles:
+            self.store.update_many((v.vehicle_id, v, change(user_key(v.manager_id) == key,
+                                                            user_key(v.driver_id) == key)) for v in vehicles)
+            self.links.update([v.vehicle_id for v in vehicles])
         return vehicles
 
-    def save_vehicles(self, data):
-        with open(self.VEHICLE_FILE, "w") as f:
-            json.dump(data, f, indent=4)
+    # Cascades from user changes; both touch only the user's own vehicles
+    def user_renamed(self, user_id, name):
+        def rename(as_manager, as_driver):
+            changes = {}
+            if as_manager:
+                changes["manager_name"] = name
+            if as_driver:
+                changes["driver_assigned"] = name
+            return changes
+        return self.relink(user_id, rename)
+
+    def user_removed(self, user_id):
+        def unassign(as_manager, as_driver):
+            changes = {}
+            if as_manager:
+                changes.update(manager_id=None, manager_name="Not Assigned")
+            if as_driver:
+                changes.update(driver_id=None, driver_assigned="Not Assigned")
+            return changes
+        return self.relink(user_id, unassign)
 
     # -----------------------------
     # Generate Vehicle ID
     # -----------------------------
-    def generate_vehicle_id(self, vehicles):
-        existing = [v.get("vehicle_id", "") for v in vehicles]
-        while True:
-            vid = "VID-" + "".join(random.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(6))
-            if vid not in existing:
-                return vid
+    def generate_vehicle_id(self):
+        return self.ids.next_id()
 
     # -----------------------------
     # Validators
     # -----------------------------
     def validate_vehicle_number(self, vnum):
-        return re.match(r"^[A-Z]{2}\d{2}[A-Z]{2}\d{4}$", vnum)
+        return VEHICLE_NUMBER.fullmatch(vnum)
 
     def validate_engine_number(self, eng):
-        return re.match(r"^[A-Z]{1}\d{3}[A-Z]{4}\d{5}$", eng)
+        return ENGINE_NUMBER.fullmatch(eng)
 
     def validate_chassis_number(self, ch):
         """Standard VIN validation (17 chars, letters except I/O/Q, digits 0-9)"""
-        return re.match(r"^[A-HJ-NPR-Z0-9]{17}$", ch.upper())
+        return CHASSIS_NUMBER.fullmatch(ch.upper())
+
+    # Field checks return the cleaned value or raise ServiceError
+    def check_vehicle_number(self, vnum):
+        vnum = vnum.strip().upper()
+        if not self.validate_vehicle_number(vnum):
+            raise ServiceError("invalid", "Invalid format! Must match 'MH12AB1234'.", "vehicle_number")
+        self.refresh()
+        if vnum in self.numbers:
+            raise ServiceError("duplicate", "This vehicle number already exists!", "vehicle_number")
+        return vnum
+
+    def check_engine_number(self, eng):
+        eng = eng.strip().upper()
+        if not self.validate_engine_number(eng):
+            raise ServiceError("invalid", "Invalid engine number! Must be 13 chars.", "engine_number")
+        return eng
+
+    def check_chassis_number(self, ch):
+        ch = ch.strip().upper()
+        if not self.validate_chassis_number(ch):
+            raise ServiceError("invalid", "Invalid chassis number! Must be 17 chars VIN.", "chassis_number")
+        return ch
+
+    # Return (user_id, User) for a manager or driver ID
+    def get_manager(self, manager_id):
+        manager = self.um.get_user_by_id(manager_id, "manager")
+        if manager is None:
+            raise ServiceError("not_found", "User not found.", "manager_id")
+        return manager
+
+    def get_driver(self, driver_id):
+        driver = self.um.get_user_by_id(driver_id, "driver")
+        if driver is None:
+            raise ServiceError("not_found", "Invalid Driver ID!", "driver_id")
+        return driver
+
+    # -----------------------------
+    # Operations
+    # -----------------------------
+    def create_vehicle(self, vehicle_number, engine_number, chassis_number,
+                       manager_id=None, driver_id=None, model=DEFAULT_MODEL):
+        vnum = self.check_vehicle_number(vehicle_number)
+        eng = self.check_engine_number(engine_number)
+        ch = self.check_chassis_number(chassis_number)
+        manager = self.get_manager(manager_id) if manager_id else None
+        driver = self.get_driver(driver_id) if driver_id else None
+
+        new_vehicle = Vehicle(
+            vehicle_id=self.generate_vehicle_id(),
+            vehicle_number=vnum,
+            engine_number=eng,
+            chassis_number=ch,
+            manager_name=manager[1].name if manager else "Not Assigned",
+            manager_id=manager[0] if manager else None,
+            driver_assigned=driver[1].name if driver else "Not Assigned",
+            driver_id=driver[0] if driver else None,
+            model=model
+        )
+        self.put_vehicle(new_vehicle)
+        self.numbers.add(vnum)
+        return new_vehicle
+
+    def get_vehicle(self, vehicle_id):
+        self.refresh()
+        key = find_key(self.store, vehicle_id.strip().upper())
+        if key is None:
+            raise ServiceError("not_found", "Vehicle not found!")
+        return self.store.records[key]
+
+    def list_vehicles(self):
+        return self.load_vehicles()
+
+    def iter_vehicles(self, after=None, **filters):
+        """Lazily yield (vehicle id, vehicle) pairs matching `filters`."""
+        self.refresh()
+        return iter_records(self.store.records, filters, after, self.store.sorted_keys())
+
+    def page_vehicles(self, after=None, limit=PAGE_SIZE, **filters):
+        """(vehicles, cursor) for one page; pass the cursor back as `after`."""
+        return take_page(self.iter_vehicles(after, **filters), limit)
+
+    def has_vehicles(self):
+        self.refresh()
+        return bool(self.store.records)
+
+    def update_vehicle(self, vehicle_id, manager_id=None, driver_id=None):
+        """Reassign manager and/or driver; only these fields can change."""
+        found = self.get_vehicle(vehicle_id)
+        manager = self.get_manager(manager_id) if manager_id else None
+        driver = self.get_driver(driver_id) if driver_id else None
+        changes = {}
+        if manager:
+            changes.update(manager_name=manager[1].name, manager_id=manager[0])
+        if driver:
+            changes.update(driver_assigned=driver[1].name, driver_id=driver[0])
+        changes = {field: value for field, value in changes.items() if getattr(found, field) != value}
+        if changes:
+            self.store.update(found.vehicle_id, found, changes)
+            self._version = self.store.version
+            self.links.update([found.vehicle_id])
+        return found
+
+    def delete_vehicle(self, vehicle_id):
+        found = self.get_vehicle(vehicle_id)
+        self.store.delete(found.vehicle_id)
+        self.numbers.discard(found.vehicle_number)
+        self._version = self.store.version
+        self.links.update([found.vehicle_id])
+        return found
+
+    # -----------------------------
+    # Bulk Import
+    # -----------------------------
+    def import_vehicles(self, path):
+        """Import vehicles from a CSV or JSONL file in a single write.
+
+        Columns: vehicle_number, engine_number, chassis_number and optional
+        manager_id, driver_id, model. Every row is validated; rows with
+        problems are skipped and reported. Returns (new vehicle IDs, errors)
+        where errors is a list of (line number, message).
+        """
+        self.refresh()
+        existing = set(self.numbers)
+        accepted = []
+
+        rows = list(read_rows(path))
+        errors = [(line_no, "malformed row") for line_no, row in rows if row is None]
+        rows = [(line_no, row) for line_no, row in rows if row is not None]
+        # Field formats for the whole file in one pass, then the checks that need state
+        valid, invalid = VEHICLE.validate_many(row for _, row in rows)
+        problems = group_errors(invalid)
+
+        for i, clean in valid:
+            vnum = clean["vehicle_number"]
+            manager_id = str(clean.get("manager_id") or "").strip()
+            driver_id = str(clean.get("driver_id") or "").strip()
+            row_problems = []
+            if vnum in existing:
+                row_problems.append(f"vehicle number {vnum} already exists")
+            manager = self.um.get_user_by_id(manager_id, "manager") if manager_id else None
+            if manager_id and manager is None:
+                row_problems.append(f"unknown manager ID '{manager_id}'")
+            driver = self.um.get_user_by_id(driver_id, "driver") if driver_id else None
+            if driver_id and driver is None:
+                row_problems.append(f"unknown driver ID '{driver_id}'")
+            if row_problems:
+                problems[i] = row_problems
+                continue
+
+            existing.add(vnum)  # also catches duplicates inside the file
+            accepted.append((vnum, clean["engine_number"], clean["chassis_number"], manager, driver,
+                             clean.get("model") or DEFAULT_MODEL))
+        errors += [(rows[i][0], "; ".join(messages)) for i, messages in problems.items()]
+        errors.sort()
+
+        new_vehicles = {}
+        for vid, (vnum, eng, ch, manager, driver, model) in zip(self.ids.reserve(len(accepted)), accepted):
+            new_vehicles[vid] = Vehicle(
+                vehicle_id=vid,
+                vehicle_number=vnum,
+                engine_number=eng,
+                chassis_number=ch,
+                manager_name=manager[1].name if manager else "Not Assigned",
+                manager_id=manager[0] if manager else None,
+                driver_assigned=driver[1].name if driver else "Not Assigned",
+                driver_id=driver[0] if driver else None,
+                model=model
+            )
+        if new_vehicles:
+            self.store.put_many(new_vehicles.items())
+            self.numbers = existing
+            self._version = self.store.version
+            self.links.update(list(new_vehicles))
+        return list(new_vehicles), errors
+
+
+class VehicleManagement:
+    COLUMNS = [("ID", "vehicle_id", 12), ("Number", "vehicle_number", 15), ("Engine No", "engine_number", 15),
+               ("Chassis No", "chassis_number", 20), ("Manager", "manager_name", 15), ("Driver", "driver_assigned", 15)]
+
+    def __init__(self):
+        self.service = VehicleService()
+        self.um = self.service.um
+
+    def ask_user(self, label, role, allow_blank):
+        """Prompt for a user ID of `role` until valid; "" if blank is allowed."""
+        lookup = self.service.get_manager if role == "manager" else self.service.get_driver
+        while True:
+            user_id = input(label).strip()
+            if user_id == "" and allow_blank:
+                return ""
+            try:
+                return lookup(user_id)[0]
+            except ServiceError as e:
+                print(f"{e.message} Try again.")
 
     # -----------------------------
     # Create Vehicle
     # -----------------------------
     def create_vehicle(self):
-        vehicles = self.load_vehicles()
+        service = self.service
         print("\n=== CREATE VEHICLE ===")
 
         # Vehicle Number
         while True:
-            vnum = input("Enter vehicle number (e.g., MH12AB1234): ").strip().upper()
-            if not self.validate_vehicle_number(vnum):
-                print("Invalid format! Must match 'MH12AB1234'. Try again.")
-            elif any(v.get("vehicle_number","") == vnum for v in vehicles):
-                print("This vehicle number already exists! Try again.")
-            else:
+            try:
+                vnum = service.check_vehicle_number(input("Enter vehicle number (e.g., MH12AB1234): "))
                 break
+            except ServiceError as e:
+                print(f"{e.message} Try again.")
 
         # Engine Number
         while True:
-            eng = input("Enter engine number (13 chars, e.g., A123BCDE56789): ").strip().upper()
-            if not self.validate_engine_number(eng):
-                print("Invalid engine number! Must be 13 chars. Try again.")
-            else:
+            try:
+                eng = service.check_engine_number(input("Enter engine number (13 chars, e.g., A123BCDE56789): "))
                 break
+            except ServiceError as e:
+                print(f"{e.message} Try again.")
 
         # Chassis Number
         while True:
-            ch = input("Enter chassis number (17 chars VIN, e.g., 1HGCM82633A004352): ").strip().upper()
-            if not self.validate_chassis_number(ch):
-                print("Invalid chassis number! Must be 17 chars VIN. Try again.")
-            else:
+            try:
+                ch = service.check_chassis_number(input("Enter chassis number (17 chars VIN, e.g., 1HGCM82633A004352): "))
                 break
+            except ServiceError as e:
+                print(f"{e.message} Try again.")
 
         # Manager Assignment
+        manager_id = None
         managers = self.um.list_managers()
         if managers:
             print("\nAvailable Managers:")
-            for m in managers:
-                print(f"{m['user_id']}: {m['name']}")
-            while True:
-                manager_id = input("Enter Manager ID: ").strip()
-                manager = self.um.get_user_by_id(manager_id, "manager")
-                if manager:
-                    manager_name = manager["name"]
-                    break
-                else:
-                    print("User not found. Try again.")
+            for uid, m in managers:
+                print(f"{uid}: {m.name}")
+            manager_id = self.ask_user("Enter Manager ID: ", "manager", allow_blank=False)
         else:
             print("No managers found in users.json!")
-            manager_name = "Not Assigned"
 
         # Driver Assignment
+        driver_id = None
         drivers = self.um.list_drivers()
         if drivers:
             print("\nAvailable Drivers:")
-            for d in drivers:
-                print(f"{d['user_id']}: {d['name']}")
-            while True:
-                driver_id = input("Enter Driver ID to assign (blank for 'Not Assigned'): ").strip()
-                if driver_id == "":
-                    driver_name, driver_id_selected = "Not Assigned", None
-                    break
-                driver = self.um.get_user_by_id(driver_id, "driver")
-                if driver:
-                    driver_name, driver_id_selected = driver["name"], driver["user_id"]
-                    break
-                else:
-                    print("Invalid Driver ID! Try again.")
-        else:
-            driver_name, driver_id_selected = "Not Assigned", None
-
-        # Model
-        model = "TATA Prima E.28K"
-
-        # Create new vehicle
-        new_vehicle = {
-            "vehicle_id": self.generate_vehicle_id(vehicles),
-            "vehicle_number": vnum,
-            "engine_number": eng,
-            "chassis_number": ch,
-            "manager_name": manager_name,
-            "driver_assigned": driver_name,
-            "driver_id": driver_id_selected,
-            "model": model
-        }
-
-        vehicles.append(new_vehicle)
-        self.save_vehicles(vehicles)
-        print(f"\nVehicle created successfully with ID: {new_vehicle['vehicle_id']}")
+            for uid, d in drivers:
+                print(f"{uid}: {d.name}")
+            driver_id = self.ask_user("Enter Driver ID to assign (blank for 'Not Assigned'): ", "driver", allow_blank=True)
+
+        try:
+            new_vehicle = service.create_vehicle(vnum, eng, ch, manager_id, driver_id)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print(f"\nVehicle created successfully with ID: {new_vehicle.vehicle_id}")
 
     # -----------------------------
     # Update Vehicle
     # -----------------------------
     def update_vehicle(self):
-        vehicles = self.load_vehicles()
-        if not vehicles:
+        if not self.service.has_vehicles():
             print("No vehicles found!")
             return
 
         vid = input("Enter Vehicle ID to update: ").strip().upper()
-        found = next((v for v in vehicles if v.get("vehicle_id", "").upper() == vid), None)
-        if not found:
-            print("Vehicle not found!")
+        try:
+            found = self.service.get_vehicle(vid)
+        except ServiceError as e:
+            print(e.message)
             return
 
         print("\nOnly Manager Name and Driver Assigned can be updated.\n")
 
         # Manager update
+        manager_id = None
         managers = self.um.list_managers()
         if managers:
             print("\nAvailable Managers:")
-            for m in managers:
-                print(f"{m['user_id']}: {m['name']}")
-            while True:
-                manager_id = input(f"Enter new Manager ID (current: {found.get('manager_name','-')}) or blank to skip: ").strip()
-                if manager_id == "":
-                    break
-                manager = self.um.get_user_by_id(manager_id, "manager")
-                if manager:
-                    found["manager_name"] = manager["name"]
-                    break
-                else:
-                    print("User not found! Try again.")
+            for uid, m in managers:
+                print(f"{uid}: {m.name}")
+            manager_id = self.ask_user(f"Enter new Manager ID (current: {found.manager_name}) or blank to skip: ",
+                                       "manager", allow_blank=True)
 
         # Driver update
+        driver_id = None
         drivers = self.um.list_drivers()
         if drivers:
             print("\nAvailable Drivers:")
-            for d in drivers:
-                print(f"{d['user_id']}: {d['name']}")
-            while True:
-                driver_id = input(f"Enter new Driver ID (current: {found.get('driver_assigned','Not Assigned')}) or blank to skip: ").strip()
-                if driver_id == "":
-                    break
-                driver = self.um.get_user_by_id(driver_id, "driver")
-                if driver:
-                    found["driver_assigned"] = driver["name"]
-                    found["driver_id"] = driver["user_id"]
-                    break
-                else:
-                    print("Invalid Driver ID! Try again.")
-
-        self.save_vehicles(vehicles)
+            for uid, d in drivers:
+                print(f"{uid}: {d.name}")
+            driver_id = self.ask_user(f"Enter new Driver ID (current: {found.driver_assigned}) or blank to skip: ",
+                                      "driver", allow_blank=True)
+
+        try:
+            self.service.update_vehicle(vid, manager_id, driver_id)
+        except ServiceError as e:
+            print(e.message)
+            return
         print(f"Vehicle {vid} updated successfully!")
 
     # -----------------------------
     # Delete Vehicle
     # -----------------------------
     def delete_vehicle(self):
-        vehicles = self.load_vehicles()
-        if not vehicles:
+        if not self.service.has_vehicles():
             print("No vehicles to delete.")
             return
 
         vid = input("Enter Vehicle ID to delete: ").strip().upper()
-        found = next((v for v in vehicles if v.get("vehicle_id", "").upper() == vid), None)
-        if not found:
-            print("Vehicle not found!")
+        try:
+            self.service.get_vehicle(vid)
+        except ServiceError as e:
+            print(e.message)
             return
 
         confirm = input(f"Are you sure you want to delete {vid}? (yes/no): ").strip().lower()
         if confirm == "yes":
-            vehicles.remove(found)
-            self.save_vehicles(vehicles)
+            self.service.delete_vehicle(vid)
             print(f"Vehicle {vid} deleted successfully!")
         else:
             print("Delete cancelled.")
@@ -276,47 +595,69 @@ class VehicleManagement:
     # Get Vehicle by ID
     # -----------------------------
     def get_vehicle_by_id(self):
-        vehicles = self.load_vehicles()
-        if not vehicles:
+        if not self.service.has_vehicles():
             print("No vehicles found.")
             return
 
         vid = input("Enter Vehicle ID to view details: ").strip().upper()
-        found = next((v for v in vehicles if v.get("vehicle_id", "").upper() == vid), None)
-        if found:
-            print("\n=== Vehicle Details ===")
-            print(f"Vehicle ID       : {found.get('vehicle_id','-')}")
-            print(f"Vehicle Number   : {found.get('vehicle_number','-')}")
-            print(f"Engine Number    : {found.get('engine_number','-')}")
-            print(f"Chassis Number   : {found.get('chassis_number','-')}")
-            print(f"Manager Name     : {found.get('manager_name','-')}")
-            print(f"Driver Assigned  : {found.get('driver_assigned','Not Assigned')}")
-            print(f"Model            : {found.get('model','TATA Prima E.28K')}")
-        else:
-            print("Vehicle not found!")
+        try:
+            found = self.service.get_vehicle(vid)
+        except ServiceError as e:
+            print(e.message)
+            return
+        print("\n=== Vehicle Details ===")
+        print(f"Vehicle ID       : {found.vehicle_id}")
+        print(f"Vehicle Number   : {found.vehicle_number}")
+        print(f"Engine Number    : {found.engine_number}")
+        print(f"Chassis Number   : {found.chassis_number}")
+        print(f"Manager Name     : {found.manager_name}")
+        print(f"Manager ID       : {found.manager_id or '-'}")
+        print(f"Driver Assigned  : {found.driver_assigned}")
+        print(f"Driver ID        : {found.driver_id or '-'}")
+        print(f"Model            : {found.model}")
 
     # -----------------------------
     # View All Vehicles
     # -----------------------------
     def get_vehicle_list(self):
-        vehicles = self.load_vehicles()
-        if not vehicles:
+        if not self.service.has_vehicles():
             print("No vehicles found.")
             return
 
         print("\nVehicle List:")
-        print("-" * 100)
-        print(f"{'ID':<12} {'Number':<15} {'Engine No':<15} {'Chassis No':<20} {'Manager':<15} {'Driver':<15}")
-        print("-" * 100)
-        for v in vehicles:
-            print(f"{v.get('vehicle_id','-'):<12} "
-                  f"{v.get('vehicle_number','-'):<15} "
-                  f"{v.get('engine_number','-'):<15} "
-                  f"{v.get('chassis_number','-'):<20} "
-                  f"{v.get('manager_name','-'):<15} "
-                  f"{v.get('driver_assigned','Not Assigned'):<15}")
-        print("-" * 100)
-        print(f"Total Vehicles: {len(vehicles)}")
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        shown = show_pages((v for _, v in self.service.iter_vehicles()), writer)
+        print(writer.rule)
+        print(f"Shown {shown} of {len(self.service.store.records)} vehicles")
+
+    # -----------------------------
+    # Vehicles of a Manager / Driver
+    # -----------------------------
+    def get_vehicles_for_user(self):
+        user_id = input("Enter Manager or Driver ID: ").strip()
+        vehicles = self.service.vehicles_for_user(user_id)
+        if not vehicles:
+            print("No vehicles linked to this user.")
+            return
+        writer = TableWriter(sys.stdout, self.COLUMNS)
+        shown = show_pages(vehicles, writer)
+        print(writer.rule)
+        print(f"Shown {shown} of {len(vehicles)} vehicles")
+
+    # -----------------------------
+    # Bulk Import
+    # -----------------------------
+    def import_vehicles_menu(self, path=None):
+        if path is None:
+            path = input("Enter path of CSV/JSONL file to import: ").strip()
+        try:
+            imported, errors = self.service.import_vehicles(path)
+        except OSError as e:
+            print(f"Cannot read {path}: {e}")
+            return
+        for line_no, message in errors:
+            print(f"Line {line_no}: {message}")
+        print(f"\nImported {len(imported)} vehicles, {len(errors)} rows rejected.")
 
     # -----------------------------
     # Menu
@@ -329,7 +670,9 @@ class VehicleManagement:
             print("3. Delete Vehicle")
             print("4. View Vehicle List")
             print("5. Get Vehicle by ID")
-            print("6. Exit")
+            print("6. Import Vehicles (CSV/JSONL)")
+            print("7. Vehicles of a Manager/Driver")
+            print("8. Exit")
 
             choice = input("Enter your choice: ").strip()
             if choice == "1":
@@ -343,6 +686,10 @@ class VehicleManagement:
             elif choice == "5":
                 self.get_vehicle_by_id()
             elif choice == "6":
+                self.import_vehicles_menu()
+            elif choice == "7":
+                self.get_vehicles_for_user()
+            elif choice == "8":
                 print("Exiting... Goodbye!")
                 break
             else:
@@ -352,5 +699,10 @@ class VehicleManagement:
 # Run Application
 # -----------------------------
 if __name__ == "__main__":
-    VehicleManagement().run()
-
+    if len(sys.argv) == 3 and sys.argv[1] == "import":
+        VehicleManagement().import_vehicles_menu(sys.argv[2])
+    elif len(sys.argv) >= 3 and sys.argv[1] == "export":
+        # python vehicles.py export <file.jsonl|file.txt|-> [field=value ...]
+        export_command(sys.argv[2:], VehicleService().iter_vehicles, VehicleManagement.COLUMNS, "vehicles")
+    else:
+        VehicleManagement().run()